@@ -1,34 +1,65 @@
-from langchain_core.messages import HumanMessage, ToolMessage, AIMessage, SystemMessage
+from langchain_core.messages import HumanMessage, ToolMessage, AIMessage, SystemMessage, message_chunk_to_message
+from langchain_core.runnables import RunnableConfig
+from langchain_core.utils.function_calling import convert_to_openai_tool
 from langgraph.graph import StateGraph, START, END, MessagesState
-from langchain_google_genai import ChatGoogleGenerativeAI
-from dotenv import load_dotenv
-from langgraph.prebuilt import ToolNode, tools_condition
 import os
 import logging
 import asyncio
-import argparse
-import sys
 import uuid
+import json
+import time
+from functools import lru_cache
+from typing import FrozenSet
 from typing_extensions import Literal
 from agent.utils.tools import validate_user_authentication, get_user_profile_data, update_user_profile
-from agent.utils.product_tools import query_db
-from agent.utils.routing_tools import route_to_page
-from agent.utils.cart_tools import get_user_cart_data, add_item_to_cart, update_cart_item
-from agent.utils.prompt import system_prompt
+from agent.utils.tools import _validate_user_authentication, _get_user_profile_data
+from agent.utils.product_tools import query_db, resolve_product, get_catalog_overview, session
+from agent.utils.routing_tools import route_to_page, ROUTE_DEFINITIONS
+from agent.utils.cart_tools import get_user_cart_data, add_item_to_cart, update_cart_item, _get_user_cart_data
+from agent.utils.cart_tools import add_items_to_cart, update_cart_items, find_and_add_to_cart
+from agent.utils.prompt import system_prompt, summary_prompt
 from agent.utils.rag_tool import rag_tool
+from agent.utils.history import HistoryManager, render_transcript, with_summary, estimate_tokens
+from agent.utils.serializers import serialize_tool_result
+from agent.utils.intent import classify_intents, extract_user_id
+from agent.utils.fast_path import match_fast_path, render_navigation_reply, GREETING_TEMPLATE
+from agent.utils.response_cache import response_cache, prompt_version
+from agent.utils.prefetch import prefetch_registry
+from agent.utils.telemetry import span, observe, metrics, start_metrics_server, add_debug_route
+from agent.utils.token_accounting import token_ledger
+from agent.utils.cassette import cassette
+from agent.utils.result_store import result_store
+from agent.utils.product_index import product_index
+from agent.utils.catalog_snapshot import catalog_snapshot
+from agent.utils.catalog_events import catalog_events
+from agent.utils.backend import backend_resilience
+from agent.utils.sql_guard import sql_guard
+from agent.utils.query_stats import query_stats
 
-load_dotenv()
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # LLM Setup
+# The Gemini client (langchain_google_genai) is created on first use rather than at import,
+# which keeps it out of langgraph-api worker startup (see benchmarks/import_time.py)
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
-llm = ChatGoogleGenerativeAI(
-    model="gemini-2.0-flash-lite",
-    api_key=GOOGLE_API_KEY,
-    temperature=0.5,  # Reduced for faster, more focused responses
-    max_tokens=800,  # Increased to allow proper tool calling
-)
+_llm = None
+
+
+def get_llm():
+    """Returns the chat model, creating the Gemini client on first call."""
+    global _llm
+    if _llm is None:
+        from langchain_google_genai import ChatGoogleGenerativeAI
+
+        model = ChatGoogleGenerativeAI(
+            model="gemini-2.0-flash-lite",
+            api_key=GOOGLE_API_KEY,
+            temperature=0.5,  # Reduced for faster, more focused responses
+            max_tokens=800,  # Increased to allow proper tool calling
+        )
+        # Record/replay of LLM I/O (AGENT_CASSETTE_MODE=record|replay), see agent/utils/cassette.py
+        _llm = cassette.wrap_llm(model) if cassette.enabled else model
+    return _llm
 
 # OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
 # llm= ChatLiteLLM(
@@ -44,41 +75,248 @@ tools = [
     validate_user_authentication,
     get_user_profile_data,
     query_db,
+    resolve_product,  # name / slug / product_id lookups without SQL
+    get_catalog_overview,  # precomputed featured products and facets
     route_to_page,  # URL generation and routing logic
     get_user_cart_data,
     add_item_to_cart,
     update_cart_item,
+    add_items_to_cart,  # batch versions of the two cart mutations above
+    update_cart_items,
+    find_and_add_to_cart,  # query_db + add_item_to_cart in one call
     update_user_profile,
     rag_tool,  # RAG tool for retrieving relevant documents
 ]
 tools_by_name = {tool.name: tool for tool in tools}
-llm_with_tools = llm.bind_tools(tools)
+
+# Record/replay of tool I/O (AGENT_CASSETTE_MODE=record|replay), see agent/utils/cassette.py
+if cassette.enabled:
+    tools_by_name = cassette.wrap_tools(tools_by_name)
+
+# Tool subsets bound per intent (see agent/utils/intent.py) so a turn only sends the
+# schemas it can use. Turns whose intent is unknown get the full tool set.
+TOOL_SETS = {
+    "greeting": [route_to_page],
+    "knowledge": [rag_tool, route_to_page],
+    "browse": [query_db, resolve_product, get_catalog_overview, route_to_page],
+    "cart": [
+        validate_user_authentication, get_user_cart_data, add_item_to_cart, update_cart_item,
+        add_items_to_cart, update_cart_items, find_and_add_to_cart, query_db, resolve_product, route_to_page,
+    ],
+    "profile": [validate_user_authentication, get_user_profile_data, update_user_profile, route_to_page],
+    "auth": [validate_user_authentication, route_to_page],
+    "navigation": [validate_user_authentication, resolve_product, route_to_page],
+}
+
+
+def tools_for_intents(intents: FrozenSet[str]) -> list:
+    """Union of the tool sets for the given intents, in the order of the full `tools` list."""
+    if not intents:
+        return tools
+    selected = {tool.name for intent in intents for tool in TOOL_SETS[intent]}
+    return [tool for tool in tools if tool.name in selected]
+
+
+@lru_cache(maxsize=64)
+def get_llm_with_tools(intents: FrozenSet[str]):
+    """Returns the LLM pre-bound to the tool set for these intents (cached per intent set)."""
+    return get_llm().bind_tools(tools_for_intents(intents))
+
+
+@lru_cache(maxsize=64)
+def tool_schema_tokens(intents: FrozenSet[str]) -> int:
+    """Estimated prompt tokens taken by the tool schemas bound for these intents."""
+    return sum(estimate_tokens(json.dumps(convert_to_openai_tool(tool))) for tool in tools_for_intents(intents))
+
+
+def set_llm(model) -> None:
+    """
+    Replaces the chat model used by llm_call and the history summarizer.
+    Used by the offline benchmarks (benchmarks/harness.py) to run the real graph
+    with a scripted model; clears the per-intent bound models.
+    """
+    global _llm
+    _llm = cassette.wrap_llm(model) if cassette.enabled else model
+    get_llm_with_tools.cache_clear()
+
+
+def last_human_text(messages: list) -> str:
+    for message in reversed(messages):
+        if isinstance(message, HumanMessage):
+            return str(message.content)
+    return ""
+
+
+history_manager = HistoryManager()
+PROMPT_VERSION = prompt_version(system_prompt)
+
+
+class AgentState(MessagesState):
+    """Graph state: the message thread plus the rolling summary of older turns."""
+    summary: str
+    summarized_upto: int
+
+
+def summarize_history(previous_summary: str, messages: list) -> str:
+    """Extends the rolling summary with the turns that are being dropped from the window."""
+    request = HumanMessage(
+        content=f"Previous summary:\n{previous_summary or '(none)'}\n\n"
+        f"Transcript to fold in:\n{render_transcript(messages)}"
+    )
+    # "nostream" keeps the summary tokens out of the messages stream shown to the user
+    response = get_llm().with_config(tags=["nostream"]).invoke([SystemMessage(content=summary_prompt), request])
+    token_ledger.record_llm_call(summary_prompt, "", 0, [request], response, kind="summarizer")
+    return str(response.content).strip()
 
 # Nodes
-def llm_call(state: MessagesState):
-    """LLM decides whether to call a tool or not."""
+def fast_path(state: AgentState):
+    """Answers greetings and unambiguous navigation requests without calling the LLM."""
+    last_message = state["messages"][-1]
+    if not isinstance(last_message, HumanMessage):
+        return {}
+    match = match_fast_path(str(last_message.content))
+    if match is None:
+        return {}
+
+    if match["kind"] == "greeting":
+        logger.info("Fast path: greeting")
+        return {"messages": [AIMessage(content=GREETING_TEMPLATE)]}
+
+    route_keyword = match["route_keyword"]
+    user_authenticated = False
+    user_id = extract_user_id(str(last_message.content))
+    if user_id and ROUTE_DEFINITIONS[route_keyword]["auth_required"]:
+        # Through tools_by_name so a cassette records / replays this backend call too
+        auth = tools_by_name[validate_user_authentication.name].invoke({"user_id": user_id})
+        user_authenticated = bool(auth.get("authenticated"))
+
+    args = {"route_keyword": route_keyword, "user_authenticated": user_authenticated}
+    call_id = f"fast_path_{uuid.uuid4().hex}"
+    navigation_result = route_to_page.invoke(args)
+    logger.info(f"Fast path: navigation to {route_keyword}")
     return {
         "messages": [
-            llm_with_tools.invoke(
-                [SystemMessage(content=system_prompt)]
-                + state["messages"]
-            )
+            AIMessage(content="", tool_calls=[{"name": route_to_page.name, "args": args, "id": call_id}]),
+            ToolMessage(content=navigation_result, name=route_to_page.name, tool_call_id=call_id),
+            AIMessage(content=render_navigation_reply(route_keyword, navigation_result)),
         ]
     }
 
-def tool_node(state: dict):
+def after_fast_path(state: AgentState) -> Literal["prefetch", "END"]:
+    """Ends the turn if the fast path answered it, otherwise hands over to the LLM."""
+    if isinstance(state["messages"][-1], AIMessage):
+        return "END"
+    return "prefetch"
+
+def prefetch(state: AgentState):
+    """
+    Starts auth validation (and cart/profile fetches when the message is about them)
+    in the background as soon as a message with a user id arrives. The tools claim
+    these in-flight results instead of calling the backend again.
+    """
+    text = last_human_text(state["messages"])
+    user_id = extract_user_id(text)
+    if not user_id or cassette.mode == "replay":
+        # Replayed tools never claim prefetched results, and replay must not reach the backend
+        return {}
+    intents = classify_intents(text)
+    prefetch_registry.start("auth", user_id, _validate_user_authentication)
+    if "cart" in intents:
+        prefetch_registry.start("cart", user_id, _get_user_cart_data)
+    if "profile" in intents:
+        prefetch_registry.start("profile", user_id, _get_user_profile_data)
+    return {}
+
+async def llm_call(state: AgentState, config: RunnableConfig):
+    """
+    LLM decides whether to call a tool or not.
+    The reply is streamed (astream) so the LangGraph API can forward tokens to the frontend
+    with stream_mode="messages"; chunks are merged so tool calls are assembled correctly.
+    """
+    summary = state.get("summary", "")
+    summarized_upto = state.get("summarized_upto", 0)
+    window, new_summary, new_upto = await asyncio.to_thread(
+        history_manager.prepare, state["messages"], summary, summarized_upto, summarize_history
+    )
+    intents = classify_intents(last_human_text(state["messages"]))
+    logger.debug(f"Binding tools for intents: {sorted(intents) or ['all']}")
+
+    update = {}
+    if new_upto != summarized_upto:
+        update["summary"] = new_summary
+        update["summarized_upto"] = new_upto
+
+    cache_key = response_cache.make_key(
+        PROMPT_VERSION, [tool.name for tool in tools_for_intents(intents)], intents, state["messages"], new_summary
+    )
+    cached = response_cache.get(cache_key)
+    thread_id = config.get("configurable", {}).get("thread_id")
+    if cached is not None:
+        logger.info(f"llm_call: response cache hit (hit rate {response_cache.stats()['hit_rate']:.0%})")
+        token_ledger.record_llm_call(
+            system_prompt, new_summary, tool_schema_tokens(intents), window, cached,
+            thread_id=thread_id, intents=sorted(intents), cache_hit=True,
+        )
+        if not cached.tool_calls:
+            prefetch_registry.release(extract_user_id(last_human_text(state["messages"])))
+        update["messages"] = [cached]
+        return update
+
+    with span("llm_call", intents=",".join(sorted(intents)) or "all", cache_hit=False) as llm_span:
+        started = time.perf_counter()
+        first_token_at = None
+        chunks = None
+        async for chunk in get_llm_with_tools(intents).astream(
+            [SystemMessage(content=with_summary(system_prompt, new_summary))] + window,
+            config,
+        ):
+            if first_token_at is None and (chunk.content or chunk.tool_call_chunks):
+                first_token_at = time.perf_counter()
+            chunks = chunk if chunks is None else chunks + chunk
+        finished = time.perf_counter()
+        response = message_chunk_to_message(chunks) if chunks is not None else AIMessage(content="")
+        llm_span.set("tool_calls", len(response.tool_calls))
+        llm_span.set("bytes", len(str(response.content).encode("utf-8")))
+
+    ttft_ms = ((first_token_at or finished) - started) * 1000
+    total_ms = (finished - started) * 1000
+    observe("agent_llm_time_to_first_token_seconds", ttft_ms / 1000, "Time from request to first streamed token")
+    logger.info(f"llm_call: time to first token {ttft_ms:.0f}ms, total {total_ms:.0f}ms, tool calls {len(response.tool_calls)}")
+
+    token_ledger.record_llm_call(
+        system_prompt, new_summary, tool_schema_tokens(intents), window, response,
+        thread_id=thread_id, intents=sorted(intents),
+    )
+    response_cache.put(cache_key, response)
+    if not response.tool_calls:
+        # End of the turn: drop whatever was prefetched but never used
+        prefetch_registry.release(extract_user_id(last_human_text(state["messages"])))
+    update["messages"] = [response]
+    return update
+
+def tool_node(state: dict, config: RunnableConfig):
     """Performs the tool call with proper error handling."""
     result = []
     for tool_call in state["messages"][-1].tool_calls:
         try:
             tool = tools_by_name[tool_call["name"]]
-            observation = tool.invoke(tool_call["args"])
-            result.append(ToolMessage(content=str(observation), tool_call_id=tool_call["id"]))
-            logger.info(f"Tool {tool_call['name']} executed successfully")
+            with span(f"tool.{tool_call['name']}") as tool_span:
+                # The run config carries the thread_id the tools key per-conversation state on
+                observation = tool.invoke(tool_call["args"], config)
+                content = serialize_tool_result(tool_call["name"], observation)
+                tool_span.set("bytes", len(content.encode("utf-8")))
+                token_ledger.record_tool_output(tool_call["name"], content)
+                if isinstance(observation, dict) and observation.get("success") is False:
+                    tool_span.status = "failed"
+            result.append(ToolMessage(content=content, name=tool_call["name"], tool_call_id=tool_call["id"]))
+            logger.info(
+                f"Tool {tool_call['name']} executed successfully "
+                f"({len(str(observation))} -> {len(content)} chars)"
+            )
         except Exception as e:
             error_msg = f"Error executing tool {tool_call['name']}: {str(e)}"
             logger.error(error_msg)
-            result.append(ToolMessage(content=error_msg, tool_call_id=tool_call["id"]))
+            result.append(ToolMessage(content=error_msg, name=tool_call["name"], tool_call_id=tool_call["id"]))
     return {"messages": result}
 
 def should_continue(state: MessagesState) -> Literal["Action", "END"]:
@@ -94,10 +332,21 @@ def should_continue(state: MessagesState) -> Literal["Action", "END"]:
     return "END"
 
 # Build workflow
-agent_builder = StateGraph(MessagesState)
+agent_builder = StateGraph(AgentState)
+agent_builder.add_node("fast_path", fast_path)
+agent_builder.add_node("prefetch", prefetch)
 agent_builder.add_node("llm_call", llm_call)
 agent_builder.add_node("environment", tool_node)
-agent_builder.add_edge(START, "llm_call")
+agent_builder.add_edge(START, "fast_path")
+agent_builder.add_conditional_edges(
+    "fast_path",
+    after_fast_path,
+    {
+        "prefetch": "prefetch",
+        "END": END,
+    },
+)
+agent_builder.add_edge("prefetch", "llm_call")
 agent_builder.add_conditional_edges(
     "llm_call",
     should_continue,
@@ -108,5 +357,22 @@ agent_builder.add_conditional_edges(
 )
 agent_builder.add_edge("environment", "llm_call")
 
+# Cache/prefetch counters are exported next to the span histograms
+metrics.register_collector("agent_response_cache", response_cache.stats)
+metrics.register_collector("agent_prefetch", prefetch_registry.stats)
+metrics.register_collector("agent_tokens", token_ledger.stats)
+metrics.register_collector("agent_cassette", cassette.stats)
+metrics.register_collector("agent_result_store", result_store.stats)
+metrics.register_collector("agent_product_index", product_index.stats)
+metrics.register_collector("agent_catalog_snapshot", catalog_snapshot.stats)
+metrics.register_collector("agent_sql_guard", sql_guard.stats)
+metrics.register_collector("agent_query_stats", query_stats.stats)
+metrics.register_collector("agent_db_pool", session.stats)
+metrics.register_collector("agent_catalog_events", catalog_events.stats)
+metrics.register_collector("agent_backend", backend_resilience.stats)
+add_debug_route("/debug/tokens", lambda: ("application/json", json.dumps(token_ledger.report(), indent=2)))
+add_debug_route("/debug/queries", lambda: ("application/json", json.dumps(query_stats.report(), indent=2)))
+start_metrics_server()
+
 # Compile the agent (LangGraph API handles persistence automatically)
 agent = agent_builder.compile()
@@ -1 +1,5 @@
 # Agent utilities package
+from agent.utils.config import load_config
+
+# Load .env and configure logging once, before any agent.utils module reads its settings
+load_config()
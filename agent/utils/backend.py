@@ -0,0 +1,244 @@
+import os
+import time
+import logging
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, TimeoutError as FutureTimeout, wait
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+from agent.utils.telemetry import span
+
+# requests is imported on the first backend call, not at agent startup
+if TYPE_CHECKING:
+    import requests
+
+logger = logging.getLogger(__name__)
+
+# Resilience for the backend calls of tools.py and cart_tools.py, per endpoint name:
+# - circuit breaker: after BACKEND_BREAKER_FAILURES consecutive failures (connection errors,
+#   timeouts, 5xx) calls fail immediately with BackendUnavailable for
+#   BACKEND_BREAKER_COOLDOWN_SECONDS; then one trial call decides whether the circuit closes
+# - adaptive timeout (GETs only): BACKEND_TIMEOUT_MULTIPLIER x the observed p99 latency (read
+#   timeouts count at the timeout), at least BACKEND_TIMEOUT_MIN_SECONDS; the timeout a tool
+#   passes is the ceiling, and is used as is until BACKEND_TIMEOUT_MIN_SAMPLES samples have
+#   been seen and for the trial call of a half-open circuit. Writes (cart POST/PATCH/DELETE)
+#   always get the tool's timeout: cutting a slow write short would leave it maybe applied
+# - hedging (opt-in, BACKEND_HEDGE): a GET still running after the endpoint's p95 latency is
+#   sent a second time and the first response wins
+# The tools catch the exceptions and return their usual {"success": False, ...} result.
+BACKEND_BREAKER_FAILURES = int(os.getenv("BACKEND_BREAKER_FAILURES", "5"))
+BACKEND_BREAKER_COOLDOWN_SECONDS = float(os.getenv("BACKEND_BREAKER_COOLDOWN_SECONDS", "30"))
+BACKEND_TIMEOUT_MULTIPLIER = float(os.getenv("BACKEND_TIMEOUT_MULTIPLIER", "3"))
+BACKEND_TIMEOUT_MIN_SECONDS = float(os.getenv("BACKEND_TIMEOUT_MIN_SECONDS", "5"))
+BACKEND_TIMEOUT_MIN_SAMPLES = int(os.getenv("BACKEND_TIMEOUT_MIN_SAMPLES", "20"))
+BACKEND_DEFAULT_TIMEOUT_SECONDS = 60.0  # ceiling when the caller passes no timeout
+BACKEND_CONNECT_TIMEOUT_SECONDS = float(os.getenv("BACKEND_CONNECT_TIMEOUT_SECONDS", "3.05"))
+BACKEND_HEDGE_ENABLED = os.getenv("BACKEND_HEDGE", "false").lower() in ("1", "true", "yes")
+BACKEND_HEDGE_MIN_DELAY_SECONDS = 0.05
+BACKEND_HEDGE_WORKERS = int(os.getenv("BACKEND_HEDGE_WORKERS", "16"))
+BACKEND_LATENCY_WINDOW = 256
+IDEMPOTENT_METHODS = {"GET"}  # safe to send twice (hedging) and to cut short (adaptive timeout)
+
+
+class BackendUnavailable(Exception):
+    """Raised without calling the backend while an endpoint's circuit is open."""
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+class EndpointState:
+    """Latency window and circuit breaker of one backend endpoint."""
+
+    def __init__(self, endpoint: str):
+        self.endpoint = endpoint
+        self.latencies: deque = deque(maxlen=BACKEND_LATENCY_WINDOW)
+        self.state = "closed"  # closed | open | half_open
+        self.failures = 0
+        self.opened_at = 0.0
+        self._lock = threading.Lock()
+        self.counters = {"calls": 0, "failures": 0, "timeouts": 0, "short_circuited": 0, "opened": 0, "hedged": 0, "hedge_wins": 0}
+
+    def allow(self) -> Optional[str]:
+        """
+        Whether a call may go out now: "call" while closed, "trial" for the single call that
+        decides whether an open circuit closes again, None while it is open.
+        """
+        with self._lock:
+            if self.state == "closed":
+                return "call"
+            if self.state == "open" and time.monotonic() - self.opened_at >= BACKEND_BREAKER_COOLDOWN_SECONDS:
+                self.state = "half_open"
+                return "trial"
+            self.counters["short_circuited"] += 1
+            return None
+
+    def retry_in(self) -> float:
+        return max(0.0, BACKEND_BREAKER_COOLDOWN_SECONDS - (time.monotonic() - self.opened_at))
+
+    def record_success(self, latency: float) -> None:
+        with self._lock:
+            self.latencies.append(latency)
+            self.failures = 0
+            if self.state != "closed":
+                logger.info(f"Backend circuit for {self.endpoint} closed")
+            self.state = "closed"
+
+    def record_failure(self, timed_out_after: Optional[float] = None) -> None:
+        """Counts a failure; a read timeout also enters the latency window at the timeout, so a
+        backend that slowed down raises the p99 (and the next timeout) instead of timing out forever."""
+        with self._lock:
+            if timed_out_after is not None:
+                self.latencies.append(timed_out_after)
+            self.failures += 1
+            self.counters["failures"] += 1
+            if self.state == "half_open" or (self.state == "closed" and self.failures >= BACKEND_BREAKER_FAILURES):
+                self.state = "open"
+                self.opened_at = time.monotonic()
+                self.counters["opened"] += 1
+                logger.warning(f"Backend circuit for {self.endpoint} opened after {self.failures} failures")
+
+    def timeout(self, ceiling: float) -> float:
+        """Read timeout for the next call: a multiple of the observed p99, capped by the caller's timeout."""
+        latencies = list(self.latencies)
+        if len(latencies) < BACKEND_TIMEOUT_MIN_SAMPLES:
+            return ceiling
+        return min(ceiling, max(BACKEND_TIMEOUT_MIN_SECONDS, _percentile(latencies, 99) * BACKEND_TIMEOUT_MULTIPLIER))
+
+    def hedge_delay(self) -> Optional[float]:
+        """How long to wait before hedging a call; None until there are enough samples or while the circuit is not closed."""
+        latencies = list(self.latencies)
+        if self.state != "closed" or len(latencies) < BACKEND_TIMEOUT_MIN_SAMPLES:
+            return None
+        return max(BACKEND_HEDGE_MIN_DELAY_SECONDS, _percentile(latencies, 95))
+
+    def stats(self) -> Dict[str, Any]:
+        latencies = list(self.latencies)
+        return {
+            "state": {"closed": 0, "half_open": 1, "open": 2}[self.state],
+            "p99_seconds": _percentile(latencies, 99) if latencies else 0.0,
+            "timeout_seconds": self.timeout(BACKEND_DEFAULT_TIMEOUT_SECONDS),
+            **self.counters,
+        }
+
+
+class BackendResilience:
+    """Per-endpoint states and the worker pool that sends hedged requests."""
+
+    def __init__(self, hedge_enabled: bool = BACKEND_HEDGE_ENABLED, hedge_workers: int = BACKEND_HEDGE_WORKERS):
+        self.hedge_enabled = hedge_enabled
+        self._hedge_workers = hedge_workers
+        self._endpoints: Dict[str, EndpointState] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def endpoint(self, endpoint: str) -> EndpointState:
+        state = self._endpoints.get(endpoint)
+        if state is None:
+            with self._lock:
+                state = self._endpoints.setdefault(endpoint, EndpointState(endpoint))
+        return state
+
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self._hedge_workers, thread_name_prefix="backend-hedge")
+        return self._executor
+
+    def reset(self) -> None:
+        with self._lock:
+            self._endpoints.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        values: Dict[str, Any] = {"open_circuits": sum(state.state != "closed" for state in list(self._endpoints.values()))}
+        for name, state in list(self._endpoints.items()):
+            values.update({f"{name.replace('.', '_')}_{key}": value for key, value in state.stats().items()})
+        return values
+
+
+# Process-wide state shared by all backend tools
+backend_resilience = BackendResilience()
+
+
+def _send(method: str, url: str, state: EndpointState, request_span: Any, **kwargs) -> "requests.Response":
+    """Sends the request, hedged with a second identical one if it is a slow idempotent GET."""
+    import requests
+
+    delay = state.hedge_delay() if backend_resilience.hedge_enabled and method.upper() in IDEMPOTENT_METHODS else None
+    if delay is None:
+        return requests.request(method, url, **kwargs)
+    executor = backend_resilience.executor()
+    first = executor.submit(requests.request, method, url, **kwargs)
+    try:
+        return first.result(timeout=delay)
+    except FutureTimeout:
+        pass
+    state.counters["hedged"] += 1
+    request_span.set("hedged", True)
+    hedge = executor.submit(requests.request, method, url, **kwargs)
+    pending = {first, hedge}
+    error: Optional[BaseException] = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                # The slower request finishes in the background and is discarded
+                if future is hedge:
+                    state.counters["hedge_wins"] += 1
+                return future.result()
+            error = future.exception()
+    raise error
+
+
+def backend_request(method: str, url: str, endpoint: str, **kwargs) -> "requests.Response":
+    """
+    Performs an HTTP call to the backend API inside a `backend.<endpoint>` span, behind the
+    endpoint's circuit breaker and with its adaptive timeout.
+
+    Args:
+        method: HTTP method ("GET", "POST", ...)
+        url: Full backend URL
+        endpoint: Low-cardinality endpoint name used for metrics, e.g. "cart.get"
+        **kwargs: Passed through to requests (json, headers, ...); timeout is the ceiling of the adaptive timeout
+
+    Returns:
+        requests.Response: The backend response (exceptions propagate to the tool, BackendUnavailable
+        without a request while the circuit is open)
+    """
+    import requests
+
+    state = backend_resilience.endpoint(endpoint)
+    admission = state.allow()
+    if admission is None:
+        raise BackendUnavailable(
+            f"the backend is not responding ({endpoint} failed {state.failures} times in a row); "
+            f"retrying in {state.retry_in():.0f}s"
+        )
+    ceiling = float(kwargs.pop("timeout", None) or BACKEND_DEFAULT_TIMEOUT_SECONDS)
+    # The trial after an open circuit gets the caller's full timeout: a backend that is slow
+    # but working closes the circuit instead of timing out against the old p99
+    adaptive = admission == "call" and method.upper() in IDEMPOTENT_METHODS
+    read_timeout = state.timeout(ceiling) if adaptive else ceiling
+    kwargs["timeout"] = (min(BACKEND_CONNECT_TIMEOUT_SECONDS, read_timeout), read_timeout)
+    state.counters["calls"] += 1
+
+    with span(f"backend.{endpoint}", method=method) as s:
+        s.set("timeout", round(read_timeout, 2))
+        try:
+            response = _send(method, url, state, s, **kwargs)
+        except Exception as e:
+            if isinstance(e, requests.Timeout):
+                state.counters["timeouts"] += 1
+            state.record_failure(timed_out_after=read_timeout if isinstance(e, requests.ReadTimeout) else None)
+            s.set("status", "exception")
+            raise
+        s.set("status", response.status_code)
+        s.set("bytes", len(response.content))
+        if response.status_code >= 500:
+            state.record_failure()
+            s.status = "error"
+        else:
+            state.record_success(response.elapsed.total_seconds())
+    return response
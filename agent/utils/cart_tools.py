@@ -1,14 +1,15 @@
-import requests
 import logging
-from typing import Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Callable, List, Optional, Tuple
+from typing_extensions import Required, TypedDict
 import os
-from dotenv import load_dotenv
 from langchain_core.tools import tool
+from agent.utils.prefetch import prefetch_registry
+from agent.utils.backend import backend_request
+from agent.utils.product_tools import resolve_product_reference
 
-load_dotenv()
 
 # Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Base URL for the backend API
@@ -25,6 +26,13 @@ def get_user_cart_data(user_id: str) -> Dict[str, Any]:
     Returns:
         Dict containing cart data and success status
     """
+    prefetched = prefetch_registry.claim("cart", user_id)
+    if prefetched is not None:
+        return prefetched
+    return _get_user_cart_data(user_id)
+
+def _get_user_cart_data(user_id: str) -> Dict[str, Any]:
+    """Calls the backend cart endpoint (also used by the prefetch node)."""
     try:
         if not user_id or user_id == "null" or user_id == "undefined":
             logger.info("No user ID provided for cart data fetch")
@@ -39,7 +47,7 @@ def get_user_cart_data(user_id: str) -> Dict[str, Any]:
         
         # Call the simple backend cart endpoint (no JWT needed)
         url = f"{BACKEND_BASE_URL}/api/cart/user/{user_id}"
-        response = requests.get(url, timeout=60)
+        response = backend_request("GET", url, endpoint="cart.get", timeout=60)
         
         if response.status_code == 200:
             cart_data = response.json()
@@ -89,6 +97,12 @@ def add_item_to_cart(user_id: str, product_id: str, quantity: int = 1) -> Dict[s
     Returns:
         Dict containing updated cart data and success status
     """
+    # The data is about to change, so never serve an older prefetch of it
+    prefetch_registry.invalidate("cart", user_id)
+    return _add_item_to_cart(user_id, product_id, quantity)
+
+def _add_item_to_cart(user_id: str, product_id: str, quantity: int = 1) -> Dict[str, Any]:
+    """Calls the backend add-to-cart endpoint (also used by add_items_to_cart)."""
     try:
         if not user_id or user_id == "null" or user_id == "undefined":
             return {
@@ -124,7 +138,7 @@ def add_item_to_cart(user_id: str, product_id: str, quantity: int = 1) -> Dict[s
             "quantity": quantity
         }
         
-        response = requests.post(url, headers=headers, json=data, timeout=60)
+        response = backend_request("POST", url, endpoint="cart.add", headers=headers, json=data, timeout=60)
         
         if response.status_code == 200:
             cart_data = response.json()
@@ -153,6 +167,74 @@ def add_item_to_cart(user_id: str, product_id: str, quantity: int = 1) -> Dict[s
             "cart_data": None
         }
 
+@tool
+def find_and_add_to_cart(user_id: str, product: str, quantity: int = 1) -> Dict[str, Any]:
+    """
+    Finds a product by name or slug and adds it to the user's cart in one step (no query_db call needed).
+    
+    Args:
+        user_id: The user ID
+        product: The product name (e.g. "Modern Sofa"), slug (e.g. "modern-sofa") or UUID product_id
+        quantity: The quantity to add (default: 1)
+        
+    Returns:
+        Dict containing updated cart data, the product that was added and success status,
+        or the matching candidates when the name is ambiguous or not an exact match
+    """
+    if not user_id or user_id == "null" or user_id == "undefined":
+        return {
+            "success": False,
+            "message": "No user session found. Please log in to add items to your cart.",
+            "user_id": None,
+            "cart_data": None
+        }
+
+    try:
+        match_type, matches = resolve_product_reference(product)
+    except Exception as e:
+        logger.error(f"Error looking up product '{product}': {str(e)}")
+        return {
+            "success": False,
+            "message": f"Error looking up product: {str(e)}",
+            "user_id": user_id,
+            "cart_data": None
+        }
+
+    if not matches:
+        return {
+            "success": False,
+            "message": f"No product matches '{product}'. Search with query_db or ask the user to describe it.",
+            "user_id": user_id,
+            "cart_data": None,
+            "candidates": []
+        }
+    if match_type != "exact":
+        # Only an exact name, slug or product_id is added without asking
+        return {
+            "success": False,
+            "message": f"No exact match for '{product}'. Ask the user to confirm which of these products to add.",
+            "user_id": user_id,
+            "cart_data": None,
+            "candidates": matches
+        }
+    if len(matches) > 1:
+        return {
+            "success": False,
+            "message": f"Several products match '{product}'. Ask the user which one to add.",
+            "user_id": user_id,
+            "cart_data": None,
+            "candidates": matches
+        }
+
+    match = matches[0]
+    logger.info(f"Resolved '{product}' to {match.get('name')} ({match['product_id']})")
+    prefetch_registry.invalidate("cart", user_id)
+    result = _add_item_to_cart(user_id, match["product_id"], quantity)
+    result["product"] = match
+    if result["success"]:
+        result["message"] = f"Successfully added {quantity} x {match.get('name') or match['product_id']} to your cart."
+    return result
+
 @tool
 def update_cart_item(user_id: str, cart_item_id: str, quantity: int = 1, to_be_deleted: bool = False) -> Dict[str, Any]:
     """
@@ -167,6 +249,12 @@ def update_cart_item(user_id: str, cart_item_id: str, quantity: int = 1, to_be_d
     Returns:
         Dict containing updated cart data and success status
     """
+    # The data is about to change, so never serve an older prefetch of it
+    prefetch_registry.invalidate("cart", user_id)
+    return _update_cart_item(user_id, cart_item_id, quantity, to_be_deleted)
+
+def _update_cart_item(user_id: str, cart_item_id: str, quantity: int = 1, to_be_deleted: bool = False) -> Dict[str, Any]:
+    """Calls the backend update/remove cart item endpoints (also used by update_cart_items)."""
     try:
         if not user_id or user_id == "null" or user_id == "undefined":
             return {
@@ -189,7 +277,7 @@ def update_cart_item(user_id: str, cart_item_id: str, quantity: int = 1, to_be_d
             logger.info(f"Removing cart item for user: {user_id}, item: {cart_item_id}")
             
             url = f"{BACKEND_BASE_URL}/api/cart/user/{user_id}/items/{cart_item_id}"
-            response = requests.delete(url, timeout=60)
+            response = backend_request("DELETE", url, endpoint="cart.remove", timeout=60)
             
             if response.status_code == 200:
                 cart_data = response.json()
@@ -232,7 +320,7 @@ def update_cart_item(user_id: str, cart_item_id: str, quantity: int = 1, to_be_d
         headers = {"Content-Type": "application/json"}
         data = {"quantity": quantity}
         
-        response = requests.put(url, headers=headers, json=data, timeout=60)
+        response = backend_request("PUT", url, endpoint="cart.update", headers=headers, json=data, timeout=60)
         
         if response.status_code == 200:
             cart_data = response.json()
@@ -265,4 +353,266 @@ def update_cart_item(user_id: str, cart_item_id: str, quantity: int = 1, to_be_d
             "message": f"Error updating cart item: {str(e)}",
             "user_id": user_id,
             "cart_data": None
-        }
\ No newline at end of file
+        }
+
+
+# --- Batch cart mutations ---
+# One tool call for several items ("add the bed, two nightstands and the dresser").
+# The per-item backend calls run concurrently; when the backend has bulk endpoints
+# (path templates with {user_id}) a single request is made instead:
+#   CART_BULK_ADD_ENDPOINT:    POST  {"items": [{"product_id", "quantity"}]}                  -> cart
+#   CART_BULK_UPDATE_ENDPOINT: PATCH {"items": [{"cart_item_id", "quantity", "to_be_deleted"}]} -> cart
+CART_BATCH_WORKERS = int(os.getenv("CART_BATCH_WORKERS", "4"))
+CART_BATCH_MAX_ITEMS = int(os.getenv("CART_BATCH_MAX_ITEMS", "20"))
+CART_BULK_ADD_ENDPOINT = os.getenv("CART_BULK_ADD_ENDPOINT")
+CART_BULK_UPDATE_ENDPOINT = os.getenv("CART_BULK_UPDATE_ENDPOINT")
+
+# Bulk endpoints that answered 404/405/501; the batch tools stop trying them
+_unsupported_bulk_endpoints = set()
+
+
+class CartAddition(TypedDict):
+    """A product to add to the cart."""
+    product_id: str
+    quantity: int
+
+
+class CartItemChange(TypedDict, total=False):
+    """A change to an existing cart line: a new quantity, or to_be_deleted=True to remove it."""
+    cart_item_id: Required[str]
+    quantity: int
+    to_be_deleted: bool
+
+
+def _run_concurrently(call: Callable[[Dict[str, Any]], Dict[str, Any]], entries: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    if len(entries) == 1:
+        return [call(entries[0])]
+    with ThreadPoolExecutor(max_workers=min(CART_BATCH_WORKERS, len(entries)), thread_name_prefix="cart-batch") as executor:
+        return list(executor.map(call, entries))
+
+
+def _request_not_sent(error: Exception) -> bool:
+    """Whether a failed request provably never reached the backend (no connection was made, or the circuit is open)."""
+    import requests
+    from urllib3.exceptions import NewConnectionError
+    from agent.utils.backend import BackendUnavailable
+
+    if isinstance(error, (BackendUnavailable, requests.ConnectTimeout)):
+        return True
+    # Other ConnectionErrors (e.g. the connection dropped after the body was sent) are ambiguous
+    reason = getattr(error.args[0], "reason", None) if isinstance(error, requests.ConnectionError) and error.args else None
+    return isinstance(reason, NewConnectionError)
+
+
+def _bulk_request(user_id: str, path_template: Optional[str], method: str, endpoint: str, entries: List[Dict[str, Any]], verb: str) -> Optional[Dict[str, Any]]:
+    """
+    Sends the whole batch to a bulk endpoint. Returns None if there is none, or if the request
+    provably did not reach it, so the caller falls back to per-item calls. The bulk POST is not
+    idempotent: when it may have been applied (e.g. a read timeout) the cart is re-read and
+    reported instead of being retried item by item.
+    """
+    if not path_template or path_template in _unsupported_bulk_endpoints:
+        return None
+    url = f"{BACKEND_BASE_URL}{path_template.format(user_id=user_id)}"
+    try:
+        response = backend_request(method, url, endpoint=endpoint, json={"items": entries}, timeout=60)
+    except Exception as e:
+        if _request_not_sent(e):
+            logger.warning(f"Bulk cart request could not be sent, falling back to per-item calls: {str(e)}")
+            return None
+        logger.warning(f"Bulk cart request failed after it may have reached the backend: {str(e)}")
+        cart = _get_user_cart_data(user_id)
+        return {
+            "success": False,
+            "message": (
+                f"The backend did not confirm the change, so it may or may not have been {verb}. "
+                "The current cart is shown; check it before trying again."
+            ),
+            "user_id": user_id,
+            "cart_data": cart.get("cart_data") if cart.get("success") else None,
+            "failed": [],
+        }
+    if response.status_code in (404, 405, 501):
+        logger.warning(f"Bulk cart endpoint {path_template} is not available ({response.status_code}); using per-item calls")
+        _unsupported_bulk_endpoints.add(path_template)
+        return None
+    if response.status_code == 200:
+        return {
+            "success": True,
+            "message": f"Successfully {verb} {len(entries)} item(s).",
+            "user_id": user_id,
+            "cart_data": response.json(),
+            "failed": [],
+        }
+    logger.warning(f"[ERROR] Bulk cart request failed: {response.status_code}")
+    return {
+        "success": False,
+        "message": "Failed to update the cart. Please try again.",
+        "user_id": user_id,
+        "cart_data": None,
+        "failed": entries,
+    }
+
+
+def _batch_result(user_id: str, entries: List[Dict[str, Any]], results: List[Dict[str, Any]], verb: str) -> Dict[str, Any]:
+    """Merges per-item results into one cart state plus the list of entries that failed."""
+    succeeded = [result for result in results if result.get("success")]
+    failed = [
+        {**entry, "message": result.get("message", "")}
+        for entry, result in zip(entries, results)
+        if not result.get("success")
+    ]
+    cart_data = None
+    if len(results) == 1:
+        cart_data = results[0].get("cart_data")
+    elif succeeded:
+        # Responses to concurrent calls are snapshots taken at different times; read the final state once
+        cart = _get_user_cart_data(user_id)
+        cart_data = cart.get("cart_data") if cart.get("success") else succeeded[-1].get("cart_data")
+
+    if not failed:
+        message = f"Successfully {verb} {len(entries)} item(s)."
+    elif succeeded:
+        message = f"{verb.capitalize()} {len(succeeded)} of {len(entries)} item(s); {len(failed)} failed."
+    else:
+        message = f"Failed to update the cart: {failed[0]['message']}"
+    return {
+        "success": not failed,
+        "message": message,
+        "user_id": user_id,
+        "cart_data": cart_data,
+        "failed": failed,
+    }
+
+
+def _invalid_batch(user_id: str, entries: List[Any], action: str) -> Optional[Dict[str, Any]]:
+    if not user_id or user_id == "null" or user_id == "undefined":
+        message = f"No user session found. Please log in to {action}."
+        user_id = None
+    elif not entries:
+        message = "No items were given."
+    elif len(entries) > CART_BATCH_MAX_ITEMS:
+        message = f"At most {CART_BATCH_MAX_ITEMS} items can be changed in one call."
+    else:
+        return None
+    return {"success": False, "message": message, "user_id": user_id, "cart_data": None, "failed": []}
+
+
+def _rejected_entry(entry: Dict[str, Any], id_field: str) -> Optional[str]:
+    """The reason the per-item call would refuse a batch entry, or None if it is valid."""
+    if not entry.get(id_field):
+        return "Product ID is required to add item to cart." if id_field == "product_id" else "Cart item ID is required to update cart item."
+    if entry.get("to_be_deleted") or int(entry.get("quantity", 1)) > 0:
+        return None
+    if id_field == "product_id":
+        return "Quantity must be greater than 0."
+    return "Quantity must be greater than 0. Set to_be_deleted=True to remove items."
+
+
+def _with_rejected(result: Dict[str, Any], rejected: List[Dict[str, Any]], total: int, verb: str) -> Dict[str, Any]:
+    """Adds the entries refused before sending to the result for the ones that were sent."""
+    if not rejected:
+        return result
+    message = result["message"]
+    if result.get("success"):
+        message = f"{verb.capitalize()} {total - len(rejected)} of {total} item(s); {len(rejected)} failed."
+    return {**result, "success": False, "message": message, "failed": rejected + result.get("failed", [])}
+
+
+def _split_batch(user_id: str, items: List[Any], id_field: str) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], Optional[Dict[str, Any]]]:
+    """
+    Validates each entry the way the per-item tools do, so the bulk endpoints never receive
+    entries those would refuse. Returns (valid items, refused entries with their message,
+    the result to return when nothing is left to send).
+    """
+    valid, rejected = [], []
+    for item in items:
+        reason = _rejected_entry(item, id_field)
+        if reason is None:
+            valid.append(item)
+        else:
+            rejected.append({**item, "message": reason})
+    if valid:
+        return valid, rejected, None
+    return valid, rejected, {
+        "success": False,
+        "message": f"Failed to update the cart: {rejected[0]['message']}",
+        "user_id": user_id,
+        "cart_data": None,
+        "failed": rejected,
+    }
+
+
+@tool
+def add_items_to_cart(user_id: str, items: List[CartAddition]) -> Dict[str, Any]:
+    """
+    Adds several products to the user's cart in one call (use instead of repeated add_item_to_cart calls).
+    
+    Args:
+        user_id: The user ID
+        items: The products to add, each with its UUID product_id and a quantity
+        
+    Returns:
+        Dict containing the final cart data, success status and any items that failed
+    """
+    invalid = _invalid_batch(user_id, items, "add items to your cart")
+    if invalid is not None:
+        return invalid
+    valid, rejected, refused = _split_batch(user_id, items, "product_id")
+    if refused is not None:
+        return refused
+    prefetch_registry.invalidate("cart", user_id)
+
+    # The same product listed twice is one addition with the summed quantity
+    quantities: Dict[str, int] = {}
+    for item in valid:
+        quantities[item["product_id"]] = quantities.get(item["product_id"], 0) + int(item.get("quantity", 1))
+    entries = [{"product_id": product_id, "quantity": quantity} for product_id, quantity in quantities.items()]
+    logger.info(f"Adding {len(entries)} products to cart for user: {user_id}")
+
+    result = _bulk_request(user_id, CART_BULK_ADD_ENDPOINT, "POST", "cart.add_bulk", entries, "added")
+    if result is None:
+        results = _run_concurrently(lambda entry: _add_item_to_cart(user_id, entry["product_id"], entry["quantity"]), entries)
+        result = _batch_result(user_id, entries, results, "added")
+    return _with_rejected(result, rejected, len(entries) + len(rejected), "added")
+
+
+@tool
+def update_cart_items(user_id: str, items: List[CartItemChange]) -> Dict[str, Any]:
+    """
+    Updates quantities of, or removes, several cart items in one call (use instead of repeated update_cart_item calls).
+    
+    Args:
+        user_id: The user ID
+        items: The cart lines to change, each with its cart_item_id and either a new quantity or to_be_deleted=True
+        
+    Returns:
+        Dict containing the final cart data, success status and any items that failed
+    """
+    invalid = _invalid_batch(user_id, items, "update your cart")
+    if invalid is not None:
+        return invalid
+    valid, rejected, refused = _split_batch(user_id, items, "cart_item_id")
+    if refused is not None:
+        return refused
+    prefetch_registry.invalidate("cart", user_id)
+
+    # The last change listed for a cart line wins
+    changes: Dict[str, Dict[str, Any]] = {}
+    for item in valid:
+        changes[item["cart_item_id"]] = {
+            "cart_item_id": item["cart_item_id"],
+            "quantity": int(item.get("quantity", 1)),
+            "to_be_deleted": bool(item.get("to_be_deleted", False)),
+        }
+    entries = list(changes.values())
+    logger.info(f"Updating {len(entries)} cart items for user: {user_id}")
+
+    result = _bulk_request(user_id, CART_BULK_UPDATE_ENDPOINT, "PATCH", "cart.update_bulk", entries, "updated")
+    if result is None:
+        results = _run_concurrently(
+            lambda entry: _update_cart_item(user_id, entry["cart_item_id"], entry["quantity"], entry["to_be_deleted"]),
+            entries,
+        )
+        result = _batch_result(user_id, entries, results, "updated")
+    return _with_rejected(result, rejected, len(entries) + len(rejected), "updated")
\ No newline at end of file
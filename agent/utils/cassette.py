@@ -0,0 +1,252 @@
+import os
+import json
+import time
+import uuid
+import asyncio
+import hashlib
+import logging
+import threading
+from collections import defaultdict, deque
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, HumanMessage, message_chunk_to_message
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.runnables.config import ensure_config
+from agent.utils.history import estimate_tokens, message_text
+from agent.utils.intent import strip_user_context
+
+logger = logging.getLogger(__name__)
+
+# Record/replay "cassettes" of LLM and tool I/O.
+# - record: every llm_call request and every tool call in tool_node is passed through to the
+#   real model/tool and appended to the cassette (JSONL) with its output, usage and duration.
+# - replay: outputs are served from the cassette by a hash of the input (bound tools + messages
+#   for the LLM, name + args for tools), so runs are deterministic and cost nothing.
+# benchmarks/cassette_report.py compares two cassettes (round trips, tool calls, tokens, time).
+CASSETTE_MODE = os.getenv("AGENT_CASSETTE_MODE", "off").lower()  # off | record | replay
+CASSETTE_PATH = os.getenv("AGENT_CASSETTE", "cassettes/agent.jsonl")
+CASSETTE_REPLAY_LATENCY = os.getenv("AGENT_CASSETTE_REPLAY_LATENCY", "false").lower() in ("1", "true", "yes")
+
+
+class CassetteMiss(Exception):
+    """Raised in replay mode when the cassette has no recording for an input."""
+
+
+def _message_record(message: BaseMessage) -> List[Any]:
+    # Ids are random per run (tool call ids, cache hits), so only names/args/content are keyed
+    tool_calls = [[call["name"], call["args"]] for call in getattr(message, "tool_calls", None) or []]
+    return [message.type, getattr(message, "name", None), message_text(message), tool_calls]
+
+
+def _digest(payload: Any) -> str:
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def llm_key(tool_names: List[str], messages: List[BaseMessage]) -> str:
+    return _digest(["llm", sorted(tool_names), [_message_record(message) for message in messages]])
+
+
+def tool_key(name: str, args: Any) -> str:
+    return _digest(["tool", name, args])
+
+
+def message_chunks(message: AIMessage) -> Iterator[AIMessageChunk]:
+    """Splits a message into word chunks (then one chunk with the tool calls), like a streamed reply."""
+    words = str(message.content).split(" ") if message.content else []
+    for index, word in enumerate(words):
+        yield AIMessageChunk(content=word + (" " if index < len(words) - 1 else ""))
+    if message.tool_calls or message.usage_metadata:
+        yield AIMessageChunk(
+            content="",
+            tool_call_chunks=[
+                {"name": call["name"], "args": json.dumps(call["args"]), "id": call["id"], "index": index}
+                for index, call in enumerate(message.tool_calls)
+            ],
+            usage_metadata=message.usage_metadata,
+        )
+
+
+def _current_thread_id() -> Optional[str]:
+    return ensure_config().get("configurable", {}).get("thread_id")
+
+
+def _conversation_label(messages: List[BaseMessage]) -> Optional[str]:
+    """The first user message in the request, used to match conversations across runs."""
+    for message in messages:
+        if isinstance(message, HumanMessage):
+            return strip_user_context(message_text(message))[:200]
+    return None
+
+
+class Cassette:
+    """A JSONL file of recorded LLM/tool interactions, in record or replay mode."""
+
+    def __init__(self, path: str = CASSETTE_PATH, mode: str = CASSETTE_MODE, replay_latency: bool = CASSETTE_REPLAY_LATENCY):
+        self.path = path
+        self.mode = mode
+        self.replay_latency = replay_latency
+        self._lock = threading.Lock()
+        self._recordings: Dict[str, deque] = defaultdict(deque)
+        self._last: Dict[str, Dict[str, Any]] = {}
+        self.counters = {"recorded": 0, "replayed": 0, "misses": 0}
+        if mode == "replay":
+            self._load()
+        elif mode == "record":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            logger.info(f"Recording LLM and tool I/O to {path}")
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode in ("record", "replay")
+
+    def _load(self) -> None:
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    self._recordings[entry["key"]].append(entry)
+        logger.info(f"Replaying {sum(len(v) for v in self._recordings.values())} interactions from {self.path}")
+
+    def record(self, entry: Dict[str, Any]) -> None:
+        entry["thread_id"] = _current_thread_id()
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, default=str) + "\n")
+            self.counters["recorded"] += 1
+
+    def replay(self, kind: str, key: str) -> Dict[str, Any]:
+        """
+        Returns the next recording for this input. Identical inputs are served in recorded
+        order; once they run out the last one is repeated.
+        """
+        with self._lock:
+            queue = self._recordings.get(key)
+            if queue:
+                entry = self._last[key] = queue.popleft()
+            else:
+                entry = self._last.get(key)
+            if entry is None:
+                self.counters["misses"] += 1
+                raise CassetteMiss(f"No recorded {kind} interaction for key {key[:12]} in {self.path}")
+            self.counters["replayed"] += 1
+        return entry
+
+    def wrap_llm(self, model: Any) -> "CassetteChatModel":
+        return CassetteChatModel(inner=model if self.mode == "record" else None, cassette=self)
+
+    def wrap_tools(self, tools_by_name: Dict[str, Any]) -> Dict[str, Any]:
+        return {name: CassetteTool(tool, self) for name, tool in tools_by_name.items()}
+
+    def stats(self) -> Dict[str, Any]:
+        return {"mode": self.mode, **self.counters}
+
+
+class CassetteChatModel(BaseChatModel):
+    """Chat model wrapper that records the wrapped model's replies, or replays them."""
+
+    inner: Any = None
+    cassette: Any = None
+    tool_names: List[str] = []
+
+    @property
+    def _llm_type(self) -> str:
+        return "cassette"
+
+    def bind_tools(self, tools: Any, **kwargs: Any) -> "CassetteChatModel":
+        names = [getattr(tool, "name", None) or tool.get("name") for tool in tools]
+        inner = self.inner.bind_tools(tools, **kwargs) if self.inner is not None else None
+        return CassetteChatModel(inner=inner, cassette=self.cassette, tool_names=names)
+
+    def _record(self, key: str, messages: List[BaseMessage], response: AIMessage, duration: float) -> None:
+        self.cassette.record({
+            "kind": "llm",
+            "key": key,
+            "conversation": _conversation_label(messages),
+            "tools": self.tool_names,
+            "started": time.time() - duration,
+            "duration": duration,
+            "output": {
+                "content": response.content,
+                "tool_calls": [{"name": call["name"], "args": call["args"]} for call in response.tool_calls],
+            },
+            "usage": response.usage_metadata,
+            "estimated_input_tokens": sum(estimate_tokens(message_text(message)) for message in messages),
+            "estimated_output_tokens": estimate_tokens(message_text(response)),
+        })
+
+    def _replayed(self, key: str) -> tuple:
+        entry = self.cassette.replay("llm", key)
+        output = entry["output"]
+        tool_calls = [{**call, "id": f"call_{uuid.uuid4().hex}"} for call in output["tool_calls"]]
+        return AIMessage(content=output["content"], tool_calls=tool_calls, usage_metadata=entry.get("usage")), entry["duration"]
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        key = llm_key(self.tool_names, messages)
+        if self.inner is None:
+            response, duration = self._replayed(key)
+            if self.cassette.replay_latency:
+                time.sleep(duration)
+        else:
+            started = time.perf_counter()
+            # No callbacks on the inner run, so streamed tokens are not reported twice
+            response = self.inner.invoke(messages, config={"callbacks": []}, stop=stop, **kwargs)
+            self._record(key, messages, response, time.perf_counter() - started)
+        return ChatResult(generations=[ChatGeneration(message=response)])
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        response = self._generate(messages, stop=stop, **kwargs).generations[0].message
+        for chunk in message_chunks(response):
+            yield ChatGenerationChunk(message=chunk)
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        key = llm_key(self.tool_names, messages)
+        if self.inner is None:
+            response, duration = self._replayed(key)
+            if self.cassette.replay_latency:
+                await asyncio.sleep(duration)
+            for chunk in message_chunks(response):
+                yield ChatGenerationChunk(message=chunk)
+            return
+
+        started = time.perf_counter()
+        merged = None
+        async for chunk in self.inner.astream(messages, config={"callbacks": []}, stop=stop, **kwargs):
+            merged = chunk if merged is None else merged + chunk
+            yield ChatGenerationChunk(message=chunk)
+        response = message_chunk_to_message(merged) if merged is not None else AIMessage(content="")
+        self._record(key, messages, response, time.perf_counter() - started)
+
+
+class CassetteTool:
+    """Wraps a tool from tools_by_name: records its outputs, or replays them without calling it."""
+
+    def __init__(self, tool: Any, cassette: Cassette):
+        self.tool = tool
+        self.name = tool.name
+        self.cassette = cassette
+
+    def invoke(self, tool_input: Any, config: Any = None, **kwargs: Any) -> Any:
+        key = tool_key(self.name, tool_input)
+        if self.cassette.mode == "replay":
+            entry = self.cassette.replay("tool", key)
+            if self.cassette.replay_latency:
+                time.sleep(entry["duration"])
+            if entry.get("error"):
+                raise RuntimeError(entry["error"])
+            return entry["output"]
+
+        started = time.perf_counter()
+        entry = {"kind": "tool", "key": key, "name": self.name, "args": tool_input, "started": time.time()}
+        try:
+            output = self.tool.invoke(tool_input, config, **kwargs)
+        except Exception as e:
+            entry.update(duration=time.perf_counter() - started, output=None, error=str(e))
+            self.cassette.record(entry)
+            raise
+        entry.update(duration=time.perf_counter() - started, output=output)
+        self.cassette.record(entry)
+        return output
+
+
+# Process-wide cassette, configured from AGENT_CASSETTE_MODE / AGENT_CASSETTE
+cassette = Cassette()
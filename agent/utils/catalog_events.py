@@ -0,0 +1,187 @@
+import os
+import json
+import time
+import select
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Catalog change feed for the in-process caches derived from the products and
+# featured_products tables (product_index.py, catalog_snapshot.py). The triggers in
+# sql/catalog_notify.sql NOTIFY CATALOG_NOTIFY_CHANNEL with a JSON payload per changed row
+# ({"table", "op", "product_id", "old_product_id"}); a daemon thread LISTENs on a dedicated
+# connection of ServerSession's engine, collects notifications until none has arrived for
+# CATALOG_LISTENER_DEBOUNCE_SECONDS (a bulk edit becomes one batch), bumps the catalog
+# version and hands the batch to every registered cache on a background worker.
+# After a reconnect a {"op": "RESYNC"} batch is published, since notifications sent while
+# disconnected are lost; caches treat it like TRUNCATE and reload fully. The caches keep their
+# periodic refresh as a backstop. Postgres-only: with other databases nothing is started.
+CATALOG_LISTENER_ENABLED = os.getenv("CATALOG_LISTENER", "true").lower() in ("1", "true", "yes")
+CATALOG_NOTIFY_CHANNEL = os.getenv("CATALOG_NOTIFY_CHANNEL", "catalog_changes")
+CATALOG_LISTENER_DEBOUNCE_SECONDS = float(os.getenv("CATALOG_LISTENER_DEBOUNCE_SECONDS", "0.5"))
+CATALOG_LISTENER_MAX_BATCH = int(os.getenv("CATALOG_LISTENER_MAX_BATCH", "500"))
+CATALOG_LISTENER_POLL_SECONDS = 30.0
+CATALOG_LISTENER_RECONNECT_SECONDS = (1.0, 60.0)  # first and longest wait between reconnects
+
+Change = Dict[str, Any]
+
+
+def parse_notification(payload: str) -> Change:
+    """The change described by a trigger payload; anything unreadable counts as an unspecific change."""
+    try:
+        change = json.loads(payload)
+    except (TypeError, ValueError):
+        return {"table": None, "op": "UNKNOWN"}
+    return change if isinstance(change, dict) else {"table": None, "op": "UNKNOWN"}
+
+
+def product_changes(changes: List[Change], table: str = "products") -> Optional[Tuple[Set[str], Set[str]]]:
+    """
+    The product_ids a batch touched in one table.
+
+    Returns:
+        (upserted ids, deleted ids), or None when a change cannot be pinned to rows
+        (TRUNCATE, RESYNC, a payload without product_id) and the table must be reloaded
+    """
+    upserted: Set[str] = set()
+    deleted: Set[str] = set()
+    for change in changes:
+        if change.get("table") not in (table, None):
+            continue
+        op = str(change.get("op", "")).upper()
+        if op not in ("INSERT", "UPDATE", "DELETE") or not change.get("product_id"):
+            return None
+        product_id = str(change["product_id"])
+        if op == "DELETE":
+            deleted.add(product_id)
+            upserted.discard(product_id)
+            continue
+        upserted.add(product_id)
+        deleted.discard(product_id)
+        if change.get("old_product_id") and str(change["old_product_id"]) != product_id:
+            deleted.add(str(change["old_product_id"]))
+    return upserted, deleted
+
+
+class CatalogEvents:
+    """Catalog version counter, the caches subscribed to it and the LISTEN thread feeding it."""
+
+    def __init__(self, channel: str = CATALOG_NOTIFY_CHANNEL, debounce_seconds: float = CATALOG_LISTENER_DEBOUNCE_SECONDS, enabled: bool = CATALOG_LISTENER_ENABLED):
+        self.channel = channel
+        self.debounce_seconds = debounce_seconds
+        self.enabled = enabled
+        self.version = 0
+        self.listening = False
+        self._subscribers: Dict[str, Callable[[int, List[Change]], None]] = {}
+        self._applied: Dict[str, int] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._listener: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.counters = {"notifications": 0, "batches": 0, "reconnects": 0, "failed": 0}
+
+    def register(self, name: str, on_change: Callable[[int, List[Change]], None]) -> None:
+        """Subscribes a cache; on_change(version, changes) runs on the background worker for every batch."""
+        self._subscribers[name] = on_change
+        self._applied.setdefault(name, self.version)
+
+    def publish(self, changes: List[Change]) -> int:
+        """Bumps the catalog version and dispatches the batch to the registered caches. Returns the new version."""
+        with self._lock:
+            self.version += 1
+            version = self.version
+            if self._executor is None:
+                # One worker: batches are applied in order
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="catalog-events")
+        self.counters["batches"] += 1
+        self._executor.submit(self._dispatch, version, list(changes))
+        return version
+
+    def _dispatch(self, version: int, changes: List[Change]) -> None:
+        for name, on_change in list(self._subscribers.items()):
+            try:
+                on_change(version, changes)
+                self._applied[name] = version
+            except Exception as e:
+                self.counters["failed"] += 1
+                logger.warning(f"Catalog change {version} could not be applied to {name}: {str(e)}")
+
+    # --- LISTEN ---
+    def start(self, engine: Any) -> None:
+        """Starts listening on the engine's database (Postgres only; a no-op otherwise or when disabled)."""
+        if not self.enabled or engine.dialect.name != "postgresql" or self._listener is not None:
+            return
+        with self._lock:
+            if self._listener is None:
+                self._listener = threading.Thread(target=self._listen_forever, args=(engine,), name="catalog-listener", daemon=True)
+                self._listener.start()
+
+    def _connect(self, engine: Any) -> Any:
+        # A dedicated DBAPI connection: a pooled one would be held for good
+        cargs, cparams = engine.dialect.create_connect_args(engine.url)
+        cparams.update(application_name="furniture-catalog-listener", keepalives=1, keepalives_idle=60, keepalives_interval=30, keepalives_count=3)
+        conn = engine.dialect.connect(*cargs, **cparams)
+        conn.autocommit = True
+        cursor = conn.cursor()
+        cursor.execute(f'LISTEN "{self.channel}"')
+        cursor.close()
+        return conn
+
+    @staticmethod
+    def _wait(conn: Any, timeout: float) -> List[str]:
+        """Payloads of the notifications arriving within timeout seconds (psycopg2 and psycopg 3)."""
+        if hasattr(conn, "poll"):
+            if select.select([conn], [], [], timeout) != ([], [], []):
+                conn.poll()
+            payloads = [notify.payload for notify in conn.notifies]
+            del conn.notifies[:]
+            return payloads
+        return [notify.payload for notify in conn.notifies(timeout=timeout, stop_after=CATALOG_LISTENER_MAX_BATCH)]
+
+    def _listen_forever(self, engine: Any) -> None:
+        delay, max_delay = CATALOG_LISTENER_RECONNECT_SECONDS
+        connected_before = False
+        while True:
+            conn = None
+            try:
+                conn = self._connect(engine)
+                self.listening = True
+                delay = CATALOG_LISTENER_RECONNECT_SECONDS[0]
+                logger.info(f"Listening for catalog changes on channel {self.channel}")
+                if connected_before:
+                    self.publish([{"table": None, "op": "RESYNC"}])
+                connected_before = True
+                pending: List[Change] = []
+                while True:
+                    payloads = self._wait(conn, self.debounce_seconds if pending else CATALOG_LISTENER_POLL_SECONDS)
+                    self.counters["notifications"] += len(payloads)
+                    pending.extend(parse_notification(payload) for payload in payloads)
+                    if pending and (not payloads or len(pending) >= CATALOG_LISTENER_MAX_BATCH):
+                        self.publish(pending)
+                        pending = []
+            except Exception as e:
+                self.listening = False
+                self.counters["reconnects"] += 1
+                logger.warning(f"Catalog listener disconnected, reconnecting in {delay:.0f}s: {str(e)}")
+            finally:
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+            time.sleep(delay)
+            delay = min(delay * 2, max_delay)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "version": self.version,
+            "listening": self.listening,
+            **self.counters,
+            **{f"{name}_lag": self.version - applied for name, applied in self._applied.items()},
+        }
+
+
+# Process-wide feed; the caches register themselves, ServerSession starts the listener
+catalog_events = CatalogEvents()
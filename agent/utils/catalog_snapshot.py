@@ -0,0 +1,174 @@
+import os
+import time
+import logging
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+from agent.utils.routing_tools import shop_url
+from agent.utils.telemetry import span
+from agent.utils.catalog_events import catalog_events
+
+logger = logging.getLogger(__name__)
+
+# Precomputed answers to the most common openers ("show me featured products", "what
+# rooms / categories do you have"): the featured products and facet counts (category x
+# room with price ranges, plus price bands), rendered once per refresh so the
+# get_catalog_overview tool returns a ready string instead of going through query_db.
+# The first call loads the snapshot; a daemon thread then reloads it every
+# CATALOG_SNAPSHOT_REFRESH_SECONDS and the previous snapshot is kept if a reload fails.
+# On Postgres a catalog change (catalog_events.py) also triggers a reload right away.
+CATALOG_SNAPSHOT_REFRESH_SECONDS = float(os.getenv("CATALOG_SNAPSHOT_REFRESH_SECONDS", "600"))
+CATALOG_FEATURED_LIMIT = int(os.getenv("CATALOG_FEATURED_LIMIT", "12"))
+# Upper bounds of the price bands, e.g. "10000,25000,50000" -> <10000, 10000-25000, 25000-50000, 50000+
+CATALOG_PRICE_BANDS = [int(bound) for bound in os.getenv("CATALOG_PRICE_BANDS", "10000,25000,50000").split(",") if bound.strip()]
+SECTIONS = ("featured", "facets", "all")
+
+FEATURED_SQL = """
+    SELECT f.product_id, f.name, f.price, p.slug, p.category, p.room
+    FROM featured_products f LEFT JOIN products p ON p.product_id = f.product_id
+    LIMIT :limit
+"""
+FACETS_SQL = """
+    SELECT category, room, COUNT(*) AS products, MIN(price) AS min_price, MAX(price) AS max_price
+    FROM products GROUP BY category, room ORDER BY category, room
+"""
+
+
+def _price_bands_sql(bounds: List[int]) -> str:
+    cases = " ".join(f"WHEN price < {int(bound)} THEN {index}" for index, bound in enumerate(bounds))
+    return f"SELECT CASE {cases} ELSE {len(bounds)} END AS band, COUNT(*) AS products FROM products WHERE price IS NOT NULL GROUP BY band"
+
+
+def _band_label(index: int, bounds: List[int]) -> str:
+    if index == 0:
+        return f"under {bounds[0]}"
+    if index == len(bounds):
+        return f"{bounds[-1]}+"
+    return f"{bounds[index - 1]}-{bounds[index]}"
+
+
+def _cell(value: Any) -> str:
+    if value is None:
+        return ""
+    return str(value).replace("|", "/").replace("\n", " ")
+
+
+def _totals(facets: List[Dict[str, Any]], key: str) -> Dict[str, int]:
+    totals: Dict[str, int] = {}
+    for facet in facets:
+        if facet.get(key):
+            totals[facet[key]] = totals.get(facet[key], 0) + int(facet["products"])
+    return totals
+
+
+def render_featured(featured: List[Dict[str, Any]]) -> str:
+    lines = [f"featured products ({len(featured)}):", "product_id|name|slug|price|category|room"]
+    for product in featured:
+        lines.append("|".join(_cell(product.get(field)) for field in ("product_id", "name", "slug", "price", "category", "room")))
+    return "\n".join(lines)
+
+
+def render_facets(facets: List[Dict[str, Any]], bands: List[Dict[str, Any]]) -> str:
+    lines = ["categories: " + ", ".join(f"{name} ({count}) {shop_url(category=name)}" for name, count in _totals(facets, "category").items())]
+    lines.append("rooms: " + ", ".join(f"{name} ({count}) {shop_url(room=name)}" for name, count in _totals(facets, "room").items()))
+    lines.append("price bands: " + ", ".join(f"{band['label']}: {band['products']}" for band in bands))
+    lines.append("category|room|products|min_price|max_price|shop_url")
+    for facet in facets:
+        lines.append("|".join([
+            _cell(facet["category"]), _cell(facet["room"]), str(facet["products"]),
+            _cell(facet["min_price"]), _cell(facet["max_price"]), shop_url(category=facet["category"], room=facet["room"]),
+        ]))
+    return "\n".join(lines)
+
+
+class CatalogSnapshot:
+    """Featured products and facet counts, loaded from the catalog and pre-rendered for the tool."""
+
+    def __init__(self, refresh_seconds: float = CATALOG_SNAPSHOT_REFRESH_SECONDS, price_bands: Optional[List[int]] = None):
+        self.refresh_seconds = refresh_seconds
+        self.price_bands = price_bands or CATALOG_PRICE_BANDS
+        self.data: Optional[Dict[str, Any]] = None
+        self._rendered: Dict[str, str] = {}
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+        self._scheduler: Optional[threading.Thread] = None
+        self.counters = {"served": 0, "refreshes": 0, "failed": 0}
+
+    def _fetch(self) -> Dict[str, Any]:
+        from sqlalchemy import text
+        from agent.utils.product_tools import session
+
+        def _read(conn):
+            featured = [dict(row._mapping) for row in conn.execute(text(FEATURED_SQL), {"limit": CATALOG_FEATURED_LIMIT})]
+            facets = [dict(row._mapping) for row in conn.execute(text(FACETS_SQL))]
+            counts = {int(row.band): int(row.products) for row in conn.execute(text(_price_bands_sql(self.price_bands)))}
+            return featured, facets, counts
+
+        featured, facets, counts = session.read(_read, "catalog_snapshot")
+        for product in featured:
+            product["product_id"] = str(product["product_id"])
+        bands = [
+            {"label": _band_label(index, self.price_bands), "products": counts.get(index, 0)}
+            for index in range(len(self.price_bands) + 1)
+        ]
+        return {"featured": featured, "facets": facets, "price_bands": bands}
+
+    def refresh(self) -> None:
+        """Reloads the snapshot and swaps in the newly rendered sections."""
+        with span("catalog_snapshot.refresh") as refresh_span:
+            data = self._fetch()
+            refreshed = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M UTC")
+            featured = render_featured(data["featured"])
+            facets = render_facets(data["facets"], data["price_bands"])
+            refresh_span.set("featured", len(data["featured"]))
+            refresh_span.set("facets", len(data["facets"]))
+        self._rendered = {
+            "featured": f"{featured}\n(catalog snapshot {refreshed})",
+            "facets": f"{facets}\n(catalog snapshot {refreshed})",
+            "all": f"{featured}\n\n{facets}\n(catalog snapshot {refreshed})",
+        }
+        self.data = data
+        self._loaded_at = time.monotonic()
+        self.counters["refreshes"] += 1
+
+    def on_catalog_change(self, version: int, changes: List[Dict[str, Any]]) -> None:
+        """Reloads after a catalog change; the aggregates are recomputed whatever rows changed."""
+        if self._rendered:
+            self.refresh()
+
+    def _refresh_forever(self) -> None:
+        while True:
+            time.sleep(self.refresh_seconds)
+            try:
+                self.refresh()
+            except Exception as e:
+                self.counters["failed"] += 1
+                logger.warning(f"Catalog snapshot refresh failed, serving the previous one: {str(e)}")
+
+    def get(self, section: str = "all") -> Optional[str]:
+        """The pre-rendered section ("featured", "facets" or "all"); None if the catalog could not be loaded."""
+        if not self._rendered:
+            with self._lock:
+                if not self._rendered:
+                    try:
+                        self.refresh()
+                    except Exception as e:
+                        self.counters["failed"] += 1
+                        logger.warning(f"Catalog snapshot unavailable: {str(e)}")
+                        return None
+                if self._scheduler is None:
+                    self._scheduler = threading.Thread(target=self._refresh_forever, name="catalog-snapshot", daemon=True)
+                    self._scheduler.start()
+        self.counters["served"] += 1
+        return self._rendered.get(section if section in SECTIONS else "all")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "age_seconds": time.monotonic() - self._loaded_at if self._rendered else 0.0,
+            **self.counters,
+        }
+
+
+# Process-wide snapshot served by get_catalog_overview
+catalog_snapshot = CatalogSnapshot()
+catalog_events.register("catalog_snapshot", catalog_snapshot.on_catalog_change)
@@ -0,0 +1,20 @@
+import os
+import logging
+from dotenv import load_dotenv
+
+# Single place where the environment and logging are set up.
+# It runs when the agent.utils package is first imported (see agent/utils/__init__.py),
+# i.e. before any module reads its settings with os.getenv at import time.
+# LOG_LEVEL sets the root log level (default INFO).
+
+_loaded = False
+
+
+def load_config() -> None:
+    """Loads .env into the environment and configures logging (only the first call does anything)."""
+    global _loaded
+    if _loaded:
+        return
+    _loaded = True
+    load_dotenv()
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper())
@@ -0,0 +1,172 @@
+import os
+import time
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional, TypeVar
+from agent.utils.telemetry import span
+
+logger = logging.getLogger(__name__)
+
+# Read routing over the primary database and the read replicas in SUPABASE_READ_REPLICA_URLS
+# (comma-separated SQLAlchemy URLs, see ServerSession). Each read goes to the healthy engine
+# with the fewest reads in flight (ties: the one that served the fewest so far). If an engine
+# cannot be reached, or its connection drops mid-query, it is marked down and the read is
+# retried on the next one; errors from the SQL itself are not retried. The primary serves
+# reads only with DB_READ_FROM_PRIMARY, when there are no replicas, or when every replica is down.
+# While replicas are configured a daemon thread probes all engines with SELECT 1 every
+# DB_HEALTH_CHECK_SECONDS, so a down engine rejoins once it answers again; one that serves a
+# read successfully rejoins right away. A lone primary is never marked down, since there is
+# nothing to fail over to.
+DB_HEALTH_CHECK_SECONDS = float(os.getenv("DB_HEALTH_CHECK_SECONDS", "10"))
+DB_READ_FROM_PRIMARY = os.getenv("DB_READ_FROM_PRIMARY", "false").lower() in ("1", "true", "yes")
+
+T = TypeVar("T")
+
+
+def _is_disconnect(error: Exception) -> bool:
+    """Whether a query failed because the connection was lost (SQLAlchemy invalidates it) rather than because of the SQL."""
+    from sqlalchemy.exc import DBAPIError
+
+    return isinstance(error, DBAPIError) and error.connection_invalidated
+
+
+class EngineTarget:
+    """One engine of the read pool with its load and health."""
+
+    def __init__(self, name: str, engine: Any, primary: bool = False):
+        self.name = name
+        self.engine = engine
+        self.primary = primary
+        self.healthy = True
+        self.outstanding = 0
+        self.last_error: Optional[str] = None
+        self.counters = {"reads": 0, "errors": 0, "marked_down": 0}
+
+
+class ReadPool:
+    """Least-outstanding-reads balancing with failover across a primary and its read replicas."""
+
+    def __init__(self, primary: EngineTarget, replicas: List[EngineTarget], read_from_primary: bool = DB_READ_FROM_PRIMARY, health_check_seconds: float = DB_HEALTH_CHECK_SECONDS):
+        self.primary = primary
+        self.replicas = replicas
+        self.targets = [primary] + replicas
+        self.read_from_primary = read_from_primary or not replicas
+        self.health_check_seconds = health_check_seconds
+        self._lock = threading.Lock()
+        self._checker: Optional[threading.Thread] = None
+        self.counters = {"reads": 0, "failovers": 0, "exhausted": 0, "health_checks": 0}
+
+    def _order(self) -> List[EngineTarget]:
+        """Engines to try for one read: healthy readers by load, then the other healthy ones (the primary), then those marked down."""
+        with self._lock:
+            readers = [target for target in self.targets if target.healthy and (self.read_from_primary or not target.primary)]
+            readers.sort(key=lambda target: (target.outstanding, target.counters["reads"]))
+            others = [target for target in self.targets if target not in readers]
+            others.sort(key=lambda target: (not target.healthy, not target.primary))
+            return readers + others
+
+    def _mark_down(self, target: EngineTarget, error: Exception) -> None:
+        target.counters["errors"] += 1
+        target.last_error = str(error).splitlines()[0][:200] if str(error) else type(error).__name__
+        if target.healthy and len(self.targets) > 1:
+            target.healthy = False
+            target.counters["marked_down"] += 1
+            logger.warning(f"Database {target.name} marked down: {str(error)}")
+
+    def _mark_up(self, target: EngineTarget) -> None:
+        if not target.healthy:
+            target.healthy = True
+            logger.info(f"Database {target.name} is back up")
+
+    def run(self, work: Callable[[Any], T], name: str = "query_db") -> T:
+        """
+        Runs work(connection) on the least busy healthy engine, failing over to the next one
+        when the engine is unreachable or the connection drops. work must only read, since it
+        may run more than once.
+
+        Args:
+            work: Function of an open SQLAlchemy connection
+            name: Span prefix; the checkout is timed as `<name>.checkout`
+
+        Returns:
+            Whatever work returns
+        """
+        from sqlalchemy.exc import TimeoutError as PoolTimeout
+
+        self._ensure_health_checks()
+        self.counters["reads"] += 1
+        last_error: Optional[Exception] = None
+        for attempt, target in enumerate(self._order()):
+            if attempt:
+                self.counters["failovers"] += 1
+            with self._lock:
+                target.outstanding += 1
+                target.counters["reads"] += 1
+            try:
+                try:
+                    # Pool checkout is timed separately so pool waits show up in the metrics
+                    with span(f"{name}.checkout") as checkout_span:
+                        checkout_span.set("engine", target.name)
+                        conn = target.engine.connect()
+                except PoolTimeout as e:
+                    # Pool exhausted: the engine is busy, not down
+                    last_error = e
+                    continue
+                except Exception as e:
+                    self._mark_down(target, e)
+                    last_error = e
+                    continue
+                with conn:
+                    try:
+                        result = work(conn)
+                    except Exception as e:
+                        if not _is_disconnect(e):
+                            raise
+                        self._mark_down(target, e)
+                        last_error = e
+                        continue
+                self._mark_up(target)
+                return result
+            finally:
+                with self._lock:
+                    target.outstanding -= 1
+        self.counters["exhausted"] += 1
+        raise last_error
+
+    def check_health(self) -> None:
+        """Probes every engine with SELECT 1; engines that answer are marked healthy, the others down."""
+        from sqlalchemy import text
+
+        self.counters["health_checks"] += 1
+        for target in self.targets:
+            try:
+                with target.engine.connect() as conn:
+                    conn.execute(text("SELECT 1"))
+            except Exception as e:
+                self._mark_down(target, e)
+                continue
+            self._mark_up(target)
+
+    def _check_forever(self) -> None:
+        while True:
+            time.sleep(self.health_check_seconds)
+            try:
+                self.check_health()
+            except Exception as e:
+                logger.warning(f"Database health check failed: {str(e)}")
+
+    def _ensure_health_checks(self) -> None:
+        if self._checker is not None or not self.replicas:
+            return
+        with self._lock:
+            if self._checker is None:
+                self._checker = threading.Thread(target=self._check_forever, name="db-health-check", daemon=True)
+                self._checker.start()
+
+    def stats(self) -> Dict[str, Any]:
+        values: Dict[str, Any] = {"engines": len(self.targets), "healthy": sum(target.healthy for target in self.targets), **self.counters}
+        for target in self.targets:
+            values[f"{target.name}_healthy"] = target.healthy
+            values[f"{target.name}_outstanding"] = target.outstanding
+            values.update({f"{target.name}_{key}": value for key, value in target.counters.items()})
+        return values
@@ -0,0 +1,128 @@
+import re
+from typing import Any, Dict, Optional
+from agent.utils.intent import strip_user_context
+from agent.utils.routing_tools import ROUTE_DEFINITIONS, route_for_phrase
+
+# Deterministic fast path for turns that do not need the LLM:
+# plain greetings and unambiguous "take me to <page>" requests.
+# Anything that is not a whole-message, high-confidence match goes to llm_call.
+
+GREETINGS = {
+    "hi", "hii", "hello", "hey", "hey there", "hi there", "hello there", "namaste",
+    "good morning", "good afternoon", "good evening", "yo", "howdy",
+}
+
+NAVIGATION_VERBS = [
+    "take me to", "take me", "bring me to", "go back to", "go to", "go", "navigate to", "open",
+    "show me", "show", "view", "visit", "i want to go to", "can you take me to", "can you open",
+]
+
+# "show my cart" / "show me my profile" ask for the contents (cart/profile tools), not just the page
+DISPLAY_VERBS = {"show me", "show", "view"}
+
+# Route keywords that are too vague to act on without the LLM
+EXCLUDED_ROUTE_KEYWORDS = {
+    "furniture", "dhurba", "furniture store", "start", "beginning", "welcome", "items", "merchandise",
+    "what do you have", "join", "store", "shopping", "who am i", "my info", "my details",
+    "what's in my cart", "cart items",
+}
+
+GREETING_TEMPLATE = """👋 **Hello!** Welcome to Dhurba Furniture Store!
+
+I'm your **furniture shopping assistant** here to help you with:
+- 🛋️ *Browse our furniture collection*
+- 🛒 *Manage your shopping cart*
+- 👤 *Handle your profile & account*
+- ❓ *Answer questions about our store*
+
+*How can I assist you today?*"""
+
+NAVIGATION_TEMPLATE = """📄 **{title}**
+
+*Sure! Taking you there now.*
+
+---
+> ✅ *I have navigated to the 🌐 {url} to view the {title_lower}.*"""
+
+LOGIN_REQUIRED_TEMPLATE = """# ❌ Authentication Required
+
+*You need to be logged in to view the {title_lower}.*
+
+🔐 *Please log in to continue.*
+
+---
+> 🔐 *I have navigated to the 🌐 {url} so you can sign in.*"""
+
+
+def _route_for_target(target: str) -> Optional[str]:
+    """
+    The route a navigation target names: a whole route keyword, optionally followed by
+    "page" or preceded by "my". Keyword conflicts are settled by ROUTE_PRIORITIES.
+    """
+    page = target.removesuffix(" page")
+    for phrase in dict.fromkeys((target, f"my {target}", page, f"my {page}")):
+        if phrase in EXCLUDED_ROUTE_KEYWORDS:
+            continue
+        route_keyword = route_for_phrase(phrase)
+        if route_keyword is not None:
+            # product-details needs a slug, which only the LLM + query_db can resolve
+            return None if route_keyword == "product-details" else route_keyword
+    return None
+
+
+_NAVIGATION_PATTERN = re.compile(
+    r"^(?:please\s+)?(?P<verb>"
+    + "|".join(re.escape(v) for v in sorted(NAVIGATION_VERBS, key=len, reverse=True))
+    + r")\s+(?:the\s+|my\s+)?(?P<target>.+?)(?:\s+please)?$"
+)
+
+
+def normalize_utterance(text: str) -> str:
+    query = strip_user_context(text)
+    query = re.sub(r"[!?.,;:]+", " ", query)
+    return " ".join(query.split())
+
+
+def match_fast_path(text: str) -> Optional[Dict[str, Any]]:
+    """
+    Matches a user message against the high-confidence greeting/navigation patterns.
+
+    Args:
+        text: The raw user message
+
+    Returns:
+        Dict with "kind" ("greeting" or "navigation") and, for navigation, "route_keyword";
+        None when the message should go to the LLM.
+    """
+    query = normalize_utterance(text)
+    if not query:
+        return None
+
+    if query in GREETINGS:
+        return {"kind": "greeting"}
+
+    verb = None
+    match = _NAVIGATION_PATTERN.match(query)
+    if match:
+        verb, target = match.group("verb"), match.group("target")
+    else:
+        # bare page names: "cart", "my profile", "login"
+        target = query
+
+    target = target.removeprefix("the ")
+    route_keyword = _route_for_target(target)
+    if route_keyword is None:
+        return None
+    if verb in DISPLAY_VERBS and ROUTE_DEFINITIONS[route_keyword]["auth_required"]:
+        return None
+    return {"kind": "navigation", "route_keyword": route_keyword}
+
+
+def render_navigation_reply(route_keyword: str, navigation_result: str) -> str:
+    """Builds the markdown reply for a fast-path navigation from the route_to_page result."""
+    url = navigation_result.rsplit("🌐", 1)[-1].strip()
+    route_info = ROUTE_DEFINITIONS[route_keyword]
+    title = route_info["title"]
+    if route_info["auth_required"] and url == ROUTE_DEFINITIONS["login"]["path"]:
+        return LOGIN_REQUIRED_TEMPLATE.format(title_lower=title.lower(), url=url)
+    return NAVIGATION_TEMPLATE.format(title=title, title_lower=title.lower(), url=url)
@@ -0,0 +1,169 @@
+import os
+import logging
+from typing import Callable, List, Optional, Tuple
+from langchain_core.messages import BaseMessage, HumanMessage, AIMessage, ToolMessage
+
+logger = logging.getLogger(__name__)
+
+# History window settings (tokens are estimated, see estimate_tokens)
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "6000"))
+HISTORY_KEEP_TURNS = int(os.getenv("HISTORY_KEEP_TURNS", "3"))
+HISTORY_SUMMARY_AFTER_TURNS = int(os.getenv("HISTORY_SUMMARY_AFTER_TURNS", "8"))
+TOOL_STUB_CHARS = 120
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token for Gemini/English text)."""
+    if not text:
+        return 0
+    return max(1, len(text) // 4)
+
+
+def message_text(message: BaseMessage) -> str:
+    """Returns the plain text content of a message (Gemini may return content parts)."""
+    content = message.content
+    if isinstance(content, str):
+        return content
+    parts = []
+    for part in content:
+        if isinstance(part, str):
+            parts.append(part)
+        elif isinstance(part, dict) and part.get("type") == "text":
+            parts.append(part.get("text", ""))
+    return "".join(parts)
+
+
+def message_tokens(message: BaseMessage) -> int:
+    """Estimated tokens for a single message, including any tool call arguments."""
+    tokens = estimate_tokens(message_text(message))
+    for tool_call in getattr(message, "tool_calls", None) or []:
+        tokens += estimate_tokens(f"{tool_call['name']}{tool_call['args']}")
+    return tokens
+
+
+def split_turns(messages: List[BaseMessage]) -> List[List[BaseMessage]]:
+    """
+    Splits a thread into turns. A turn starts at a HumanMessage and holds every
+    AI/tool message that followed it, so tool calls always stay next to their results.
+    """
+    turns: List[List[BaseMessage]] = []
+    for message in messages:
+        if isinstance(message, HumanMessage) or not turns:
+            turns.append([message])
+        else:
+            turns[-1].append(message)
+    return turns
+
+
+def stub_tool_message(message: ToolMessage) -> ToolMessage:
+    """Collapses a verbose tool output into a one-line stub (keeps the tool_call_id pairing)."""
+    text = message_text(message).strip()
+    if len(text) <= TOOL_STUB_CHARS:
+        return message
+    first_line = text.splitlines()[0][:TOOL_STUB_CHARS]
+    label = message.name or "tool"
+    return ToolMessage(
+        content=f"[{label} result elided from history: {first_line} ...]",
+        tool_call_id=message.tool_call_id,
+        name=message.name,
+    )
+
+
+def render_transcript(messages: List[BaseMessage]) -> str:
+    """Renders messages as a compact plain-text transcript for the summarizer."""
+    lines = []
+    for message in messages:
+        if isinstance(message, HumanMessage):
+            lines.append(f"User: {message_text(message)}")
+        elif isinstance(message, AIMessage):
+            text = message_text(message).strip()
+            if text:
+                lines.append(f"Assistant: {text}")
+            for tool_call in message.tool_calls:
+                lines.append(f"Assistant called {tool_call['name']}({tool_call['args']})")
+        elif isinstance(message, ToolMessage):
+            lines.append(f"Tool {message.name or ''}: {message_text(stub_tool_message(message))}")
+    return "\n".join(lines)
+
+
+class HistoryManager:
+    """
+    Builds the message window sent to the LLM on each turn.
+
+    - The last `keep_turns` turns are sent verbatim.
+    - Older turns are sent with their tool outputs collapsed into short stubs.
+    - Once there are more than `summarize_after_turns` turns in the window, or the
+      window exceeds `token_budget`, the older turns are folded into a rolling summary.
+      Only the newly folded turns are summarized (together with the previous summary),
+      so the summary is extended incrementally rather than recomputed every turn.
+    """
+
+    def __init__(
+        self,
+        token_budget: int = HISTORY_TOKEN_BUDGET,
+        keep_turns: int = HISTORY_KEEP_TURNS,
+        summarize_after_turns: int = HISTORY_SUMMARY_AFTER_TURNS,
+    ):
+        self.token_budget = token_budget
+        self.keep_turns = max(1, keep_turns)
+        self.summarize_after_turns = max(self.keep_turns, summarize_after_turns)
+
+    def _window(self, turns: List[List[BaseMessage]]) -> List[BaseMessage]:
+        window: List[BaseMessage] = []
+        recent_start = len(turns) - self.keep_turns
+        for index, turn in enumerate(turns):
+            for message in turn:
+                if index < recent_start and isinstance(message, ToolMessage):
+                    window.append(stub_tool_message(message))
+                else:
+                    window.append(message)
+        return window
+
+    def prepare(
+        self,
+        messages: List[BaseMessage],
+        summary: str = "",
+        summarized_upto: int = 0,
+        summarizer: Optional[Callable[[str, List[BaseMessage]], str]] = None,
+    ) -> Tuple[List[BaseMessage], str, int]:
+        """
+        Args:
+            messages: The full thread from the graph state
+            summary: The current rolling summary (empty if none yet)
+            summarized_upto: Number of leading messages already folded into the summary
+            summarizer: Callable(previous_summary, new_messages) -> updated summary
+
+        Returns:
+            Tuple of (messages to send, updated summary, updated summarized_upto)
+        """
+        active = messages[summarized_upto:]
+        turns = split_turns(active)
+        window = self._window(turns)
+        window_tokens = sum(message_tokens(m) for m in window)
+
+        over_turns = len(turns) > self.summarize_after_turns
+        over_budget = window_tokens > self.token_budget and len(turns) > self.keep_turns
+        if summarizer is None or not (over_turns or over_budget):
+            return window, summary, summarized_upto
+
+        folded_turns = turns[: len(turns) - self.keep_turns]
+        folded = [message for turn in folded_turns for message in turn]
+        try:
+            new_summary = summarizer(summary, folded)
+        except Exception as e:
+            logger.warning(f"History summarization failed, sending stubbed window: {str(e)}")
+            return window, summary, summarized_upto
+
+        kept_turns = turns[len(folded_turns):]
+        logger.info(
+            f"Folded {len(folded)} messages into history summary "
+            f"(window was ~{window_tokens} tokens over {len(turns)} turns)"
+        )
+        return self._window(kept_turns), new_summary, summarized_upto + len(folded)
+
+
+def with_summary(system_prompt: str, summary: str) -> str:
+    """Appends the rolling summary to the system prompt (Gemini accepts a single system instruction)."""
+    if not summary:
+        return system_prompt
+    return f"{system_prompt}\n\n## CONVERSATION SUMMARY (earlier turns)\n{summary}"
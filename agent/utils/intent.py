@@ -0,0 +1,68 @@
+import re
+from typing import Dict, FrozenSet, List, Optional
+from agent.utils.keyword_matcher import KeywordMatcher
+
+# Pattern the frontend appends to every message, e.g. "[User ID: c545333r-...]"
+USER_ID_PATTERN = re.compile(r"\[\s*User ID:\s*([^\]]*)\]", re.IGNORECASE)
+
+# Keyword lists used to pick the tool set bound for a turn.
+# A message can match several intents; it then gets the union of their tool sets.
+# Messages that match nothing (e.g. "yes please") fall back to the full tool set.
+# "address" alone is ambiguous: "my address" is the user's profile, "your/store address" the store's.
+INTENT_KEYWORDS: Dict[str, List[str]] = {
+    "greeting": ["hi", "hello", "hey", "namaste", "good morning", "good afternoon", "good evening",
+                 "thanks", "thank you", "bye", "goodbye", "who are you", "what can you do", "help"],
+    "knowledge": ["founded", "founder", "history", "established", "policy", "policies", "return", "refund",
+                  "warranty", "guarantee", "delivery", "deliver", "shipping", "installation", "customize",
+                  "customization", "custom", "care", "clean", "maintenance", "material", "wood", "fabric",
+                  "contact", "business hours", "opening hours", "location", "located", "about the store",
+                  "about your store", "about the company", "specialize", "faq", "your address", "store address",
+                  "shop address", "showroom"],
+    "browse": ["show me", "find", "search", "looking for", "recommend", "bed", "sofa", "couch", "table", "chair",
+               "desk", "wardrobe", "dresser", "nightstand", "cabinet", "shelf", "bookshelf", "mattress",
+               "price", "cheap", "cheapest", "expensive", "budget", "featured", "category", "categories",
+               "room", "bedroom", "living room", "dining", "office", "outdoor", "product", "furniture",
+               "details", "tell me more"],
+    "cart": ["cart", "basket", "add", "remove", "delete", "quantity", "checkout", "buy", "purchase", "order"],
+    "profile": ["profile", "my name", "my email", "my address", "my phone", "my info", "my details",
+                "account", "change my name", "update my", "who am i", "first name", "last name"],
+    "auth": ["logged in", "log in", "login", "sign in", "signin", "sign up", "signup", "register",
+             "authenticated", "logout", "log out", "session"],
+    "navigation": ["take me", "go to", "open", "navigate", "page", "home", "homepage", "shop", "catalog"],
+}
+
+_INTENT_MATCHER = KeywordMatcher(INTENT_KEYWORDS, plurals=True)
+
+
+def extract_user_id(text: str) -> Optional[str]:
+    """Returns the user id from the [User ID: ...] marker, or None if missing/"null"/"undefined"."""
+    match = USER_ID_PATTERN.search(text or "")
+    if not match:
+        return None
+    user_id = match.group(1).strip()
+    if not user_id or user_id in ("null", "undefined", "None"):
+        return None
+    return user_id
+
+
+def strip_user_context(text: str) -> str:
+    """Removes the [User ID: ...] marker and normalizes whitespace/case."""
+    return " ".join(USER_ID_PATTERN.sub(" ", text or "").lower().split())
+
+
+def classify_intents(text: str) -> FrozenSet[str]:
+    """
+    Classifies a user message into zero or more intents using keyword matching.
+
+    Args:
+        text: The raw user message (the [User ID: ...] marker is ignored)
+
+    Returns:
+        frozenset: Matched intent names (empty when nothing matched)
+    """
+    query = strip_user_context(text)
+    matched = _INTENT_MATCHER.labels(query)
+    # A greeting combined with a real request ("hi, show me beds") is handled by the request's tools
+    if len(matched) > 1:
+        matched.discard("greeting")
+    return frozenset(matched)
@@ -0,0 +1,108 @@
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+def _trie_pattern(keywords: Iterable[str]) -> str:
+    """
+    Builds a regex alternation factored as a trie ("cart|cart items|catalog" ->
+    "ca(?:rt(?: items)?|talog)"). At each position the regex engine then branches on
+    one character at a time instead of trying every keyword, so the cost of a scan does
+    not grow with the number of keywords. Optional tails are greedy, which gives
+    longest-match semantics.
+    """
+    trie: Dict[str, dict] = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node: Dict[str, dict]) -> str:
+        is_end = "" in node
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char != ""]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if is_end:
+            return f"(?:{body})?"
+        return body
+
+    return build(trie)
+
+
+class KeywordMatcher:
+    """
+    Matches text against labeled keyword tables using one compiled regex.
+
+    - Keywords only match on word boundaries ("cart" does not match "cartoon").
+    - Overlapping matches are all reported, and at each position the longest keyword wins.
+    - When the same keyword appears under several labels, the label with the highest
+      priority owns it; `best()` also ranks matches by priority (then keyword length)
+      instead of dictionary order.
+
+    Args:
+        table: Mapping of label -> keywords
+        priorities: Mapping of label -> priority (higher wins, default 0)
+        plurals: Also match keywords followed by "s"/"es"
+    """
+
+    def __init__(self, table: Dict[str, Iterable[str]], priorities: Optional[Dict[str, int]] = None, plurals: bool = False):
+        self.priorities = dict(priorities or {})
+        self._owner: Dict[str, str] = {}
+        for label, keywords in table.items():
+            for keyword in keywords:
+                keyword = keyword.lower().strip()
+                if not keyword:
+                    continue
+                current = self._owner.get(keyword)
+                if current is None or self.priorities.get(label, 0) > self.priorities.get(current, 0):
+                    self._owner[keyword] = label
+
+        suffix = "(?:es|s)?" if plurals else ""
+        # Zero-width lookahead so overlapping keywords ("shopping cart" / "cart") are all found
+        self._pattern = re.compile(r"(?=(?<!\w)(" + _trie_pattern(self._owner) + suffix + r")(?!\w))")
+        self._plurals = plurals
+
+    def __len__(self) -> int:
+        return len(self._owner)
+
+    def _label_for(self, matched: str) -> Optional[Tuple[str, str]]:
+        if matched in self._owner:
+            return matched, self._owner[matched]
+        if self._plurals:
+            for cut in (1, 2):
+                stem = matched[:-cut]
+                if stem in self._owner:
+                    return stem, self._owner[stem]
+        return None
+
+    def find_all(self, text: str) -> List[Tuple[str, str]]:
+        """Returns (label, keyword) for every keyword occurrence in the (lowercased) text."""
+        matches = []
+        for match in self._pattern.finditer(text.lower()):
+            found = self._label_for(match.group(1))
+            if found is not None:
+                matches.append((found[1], found[0]))
+        return matches
+
+    def labels(self, text: str) -> set:
+        """Returns the set of labels with at least one keyword in the text."""
+        return {label for label, _ in self.find_all(text)}
+
+    def match_whole(self, text: str) -> Optional[str]:
+        """Returns the label of the keyword that makes up the whole text, or None."""
+        text = text.lower().strip()
+        match = self._pattern.match(text)
+        # At position 0 the longest keyword wins, so a whole-text keyword is the one found
+        if match is None or match.group(1) != text:
+            return None
+        found = self._label_for(text)
+        return found[1] if found is not None else None
+
+    def best(self, text: str) -> Optional[str]:
+        """Returns the label of the highest-priority match (longer keyword breaks ties), or None."""
+        matches = self.find_all(text)
+        if not matches:
+            return None
+        label, _ = max(matches, key=lambda m: (self.priorities.get(m[0], 0), len(m[1])))
+        return label
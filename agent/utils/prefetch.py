@@ -0,0 +1,107 @@
+import os
+import time
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Speculative prefetch of user data at the start of authenticated turns
+PREFETCH_ENABLED = os.getenv("AGENT_PREFETCH", "true").lower() in ("1", "true", "yes")
+PREFETCH_TTL_SECONDS = float(os.getenv("AGENT_PREFETCH_TTL", "30"))
+PREFETCH_WORKERS = int(os.getenv("AGENT_PREFETCH_WORKERS", "8"))
+PREFETCH_WAIT_SECONDS = 60  # same as the backend timeout of the tools themselves
+
+
+class PrefetchRegistry:
+    """
+    In-flight backend fetches keyed by (kind, user_id), e.g. ("cart", "c545...").
+
+    The graph starts fetches as soon as a message with a user id arrives; the tools then
+    `claim()` the in-flight result instead of making a new request. Unclaimed fetches are
+    cancelled (or counted as unused if already finished) when the turn ends, and cart /
+    profile mutations `invalidate()` their kind so a stale prefetch is never served.
+    """
+
+    def __init__(self, ttl_seconds: float = PREFETCH_TTL_SECONDS, max_workers: int = PREFETCH_WORKERS, enabled: bool = PREFETCH_ENABLED):
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled
+        self._max_workers = max_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._entries: Dict[Tuple[str, str], Tuple[float, Future]] = {}
+        self._lock = threading.Lock()
+        self.counters = {"started": 0, "used": 0, "unused": 0, "cancelled": 0, "expired": 0, "failed": 0, "invalidated": 0}
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self._max_workers, thread_name_prefix="prefetch")
+        return self._executor
+
+    def start(self, kind: str, user_id: str, fetch: Callable[[str], Any]) -> None:
+        """Starts `fetch(user_id)` in the background unless a fresh fetch is already in flight."""
+        if not self.enabled or not user_id:
+            return
+        key = (kind, user_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] < self.ttl_seconds:
+                return
+            self._entries[key] = (time.monotonic(), self._get_executor().submit(fetch, user_id))
+            self.counters["started"] += 1
+        logger.debug(f"Prefetch started: {kind}")
+
+    def claim(self, kind: str, user_id: str) -> Optional[Any]:
+        """
+        Returns the prefetched result for (kind, user_id), waiting for it if still in flight.
+        Returns None if there is no usable prefetch; the caller then fetches normally.
+        """
+        if not user_id:
+            return None
+        with self._lock:
+            entry = self._entries.pop((kind, user_id), None)
+        if entry is None:
+            return None
+        started_at, future = entry
+        if time.monotonic() - started_at > self.ttl_seconds:
+            future.cancel()
+            self.counters["expired"] += 1
+            return None
+        try:
+            result = future.result(timeout=PREFETCH_WAIT_SECONDS)
+        except Exception as e:
+            logger.warning(f"Prefetch {kind} failed, fetching again: {str(e)}")
+            self.counters["failed"] += 1
+            return None
+        self.counters["used"] += 1
+        logger.info(f"Served {kind} from prefetch")
+        return result
+
+    def invalidate(self, kind: str, user_id: str) -> None:
+        """Drops any prefetch of this kind for the user (call after mutating that data)."""
+        with self._lock:
+            entry = self._entries.pop((kind, user_id), None)
+        if entry is not None:
+            entry[1].cancel()
+            self.counters["invalidated"] += 1
+
+    def release(self, user_id: str) -> None:
+        """Ends the turn for this user: cancels or counts every prefetch that was never claimed."""
+        if not user_id:
+            return
+        with self._lock:
+            keys = [key for key in self._entries if key[1] == user_id]
+            entries = [self._entries.pop(key) for key in keys]
+        for (kind, _), (_, future) in zip(keys, entries):
+            if future.cancel():
+                self.counters["cancelled"] += 1
+            else:
+                self.counters["unused"] += 1
+            logger.debug(f"Prefetch {kind} was not used this turn")
+
+    def stats(self) -> Dict[str, Any]:
+        return {"in_flight": len(self._entries), **self.counters}
+
+
+# Process-wide registry shared by the graph and the tools
+prefetch_registry = PrefetchRegistry()
@@ -0,0 +1,238 @@
+import os
+import time
+import difflib
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+from agent.utils.routing_tools import normalize_product_name, slugify
+from agent.utils.telemetry import span
+from agent.utils.catalog_events import catalog_events, product_changes
+
+logger = logging.getLogger(__name__)
+
+# Process-wide index of the catalog for converting between product names, slugs and UUID
+# product_ids without running SQL. Exact lookups are dict hits on the normalized name
+# (normalize_product_name), slug (slugify) or product_id; otherwise all-words containment
+# and then difflib similarity over the names are tried.
+# The index loads on first use and refreshes in the background once older than
+# PRODUCT_INDEX_REFRESH_SECONDS: incrementally (rows whose PRODUCT_INDEX_UPDATED_COLUMN is
+# newer than the last load) when the products table has that column, and with a full
+# reload every PRODUCT_INDEX_FULL_RELOAD_SECONDS so deleted products drop out.
+# On Postgres the catalog change feed (catalog_events.py) also re-reads exactly the products
+# staff edit, within about a second, and drops deleted ones.
+PRODUCT_INDEX_ENABLED = os.getenv("PRODUCT_INDEX", "true").lower() in ("1", "true", "yes")
+PRODUCT_INDEX_REFRESH_SECONDS = float(os.getenv("PRODUCT_INDEX_REFRESH_SECONDS", "300"))
+PRODUCT_INDEX_FULL_RELOAD_SECONDS = float(os.getenv("PRODUCT_INDEX_FULL_RELOAD_SECONDS", "3600"))
+PRODUCT_INDEX_UPDATED_COLUMN = os.getenv("PRODUCT_INDEX_UPDATED_COLUMN", "updated_at")
+PRODUCT_INDEX_FUZZY_CUTOFF = float(os.getenv("PRODUCT_INDEX_FUZZY_CUTOFF", "0.75"))
+PRODUCT_INDEX_RETRY_SECONDS = 30  # after a failed first load, callers fall back to SQL for this long
+INDEX_COLUMNS = ("product_id", "name", "slug", "price", "category", "room")
+
+
+def _words(text: str) -> List[str]:
+    # "chairs" should find "Dining Chair"
+    return [word[:-1] if len(word) > 3 and word.endswith("s") else word for word in slugify(text).split("-") if word]
+
+
+def _compact(row: Dict[str, Any]) -> Dict[str, Any]:
+    record = {column: row.get(column) for column in INDEX_COLUMNS}
+    record["product_id"] = str(record["product_id"])
+    return record
+
+
+class _Snapshot:
+    """Immutable lookup tables; a refresh builds a new one and swaps it in."""
+
+    def __init__(self, records: Dict[str, Dict[str, Any]]):
+        self.records = records
+        self.by_slug: Dict[str, str] = {}
+        self.by_name: Dict[str, List[str]] = {}
+        for product_id, record in records.items():
+            if record.get("slug"):
+                self.by_slug[slugify(record["slug"])] = product_id
+            self.by_name.setdefault(normalize_product_name(record.get("name") or ""), []).append(product_id)
+        self.name_keys = list(self.by_name)
+
+
+class ProductIndex:
+    """name / slug / product_id -> compact product record, loaded from the products table."""
+
+    def __init__(self, refresh_seconds: float = PRODUCT_INDEX_REFRESH_SECONDS, full_reload_seconds: float = PRODUCT_INDEX_FULL_RELOAD_SECONDS, enabled: bool = PRODUCT_INDEX_ENABLED):
+        self.refresh_seconds = refresh_seconds
+        self.full_reload_seconds = full_reload_seconds
+        self.enabled = enabled
+        self._snapshot: Optional[_Snapshot] = None
+        self._refreshed_at = 0.0
+        self._full_reload_at = 0.0
+        self._high_water: Any = None  # newest PRODUCT_INDEX_UPDATED_COLUMN value seen
+        self._has_updated_column: Optional[bool] = None
+        self._refresh_lock = threading.Lock()
+        self._load_lock = threading.Lock()  # one refresh at a time, so no update is lost
+        self._refreshing = False
+        self._retry_at = 0.0
+        self.counters = {"exact": 0, "fuzzy": 0, "misses": 0, "full_reloads": 0, "incremental_refreshes": 0, "rows_updated": 0, "change_batches": 0, "failed": 0}
+
+    # --- loading ---
+    def _fetch(self, since: Any = None, product_ids: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        from sqlalchemy import inspect, text
+        from agent.utils.product_tools import session
+
+        session._ensure_connected()
+        if self._has_updated_column is None:
+            columns = {column["name"] for column in inspect(session.engine).get_columns("products")}
+            self._has_updated_column = PRODUCT_INDEX_UPDATED_COLUMN in columns
+        selected = list(INDEX_COLUMNS) + ([PRODUCT_INDEX_UPDATED_COLUMN] if self._has_updated_column else [])
+        sql = f"SELECT {', '.join(selected)} FROM products"
+        params: Dict[str, Any] = {}
+        if since is not None:
+            # >= so rows committed with the same timestamp after the last load are not missed
+            sql += f" WHERE {PRODUCT_INDEX_UPDATED_COLUMN} >= :since"
+            params["since"] = since
+        elif product_ids is not None:
+            params.update({f"id{index}": product_id for index, product_id in enumerate(product_ids)})
+            sql += f" WHERE product_id IN ({', '.join(f':id{index}' for index in range(len(product_ids)))})"
+        # On the primary: a lagging replica could hide rows at or below the high-water mark for good
+        with session.engine.connect() as conn:
+            return [dict(row._mapping) for row in conn.execute(text(sql), params)]
+
+    def refresh(self, full: bool = False) -> None:
+        """Loads the catalog (full) or the rows changed since the last load, and swaps in a new snapshot."""
+        with self._load_lock:
+            self._refresh(full)
+
+    def _refresh(self, full: bool) -> None:
+        incremental = not full and self._snapshot is not None and self._has_updated_column and self._high_water is not None
+        with span("product_index.refresh") as refresh_span:
+            rows = self._fetch(self._high_water if incremental else None)
+            records = dict(self._snapshot.records) if incremental else {}
+            for row in rows:
+                records[str(row["product_id"])] = _compact(row)
+                updated = row.get(PRODUCT_INDEX_UPDATED_COLUMN)
+                if updated is not None and (self._high_water is None or updated > self._high_water):
+                    self._high_water = updated
+            refresh_span.set("rows", len(rows))
+            refresh_span.set("mode", "incremental" if incremental else "full")
+        now = time.monotonic()
+        if incremental:
+            self.counters["incremental_refreshes"] += 1
+        else:
+            self.counters["full_reloads"] += 1
+            self._full_reload_at = now
+        self.counters["rows_updated"] += len(rows)
+        if incremental and not rows:
+            self._refreshed_at = now
+            return
+        self._snapshot = _Snapshot(records)
+        self._refreshed_at = now
+        logger.info(f"Product index {'updated' if incremental else 'loaded'}: {len(rows)} rows, {len(records)} products")
+
+    def on_catalog_change(self, version: int, changes: List[Dict[str, Any]]) -> None:
+        """Applies a batch from the catalog change feed: changed products are re-read, deleted ones dropped."""
+        if self._snapshot is None:
+            return  # not loaded yet; the first lookup loads the current catalog
+        touched = product_changes(changes)
+        if touched is None:
+            self.refresh(full=True)
+            return
+        upserted, deleted = touched
+        if not upserted and not deleted:
+            return
+        with self._load_lock:
+            with span("product_index.apply_changes") as apply_span:
+                rows = self._fetch(product_ids=sorted(upserted)) if upserted else []
+                apply_span.set("rows", len(rows))
+            records = dict(self._snapshot.records)
+            # Upserted rows that are gone again were deleted after the notification
+            for product_id in deleted | upserted:
+                records.pop(product_id, None)
+            for row in rows:
+                records[str(row["product_id"])] = _compact(row)
+            self._snapshot = _Snapshot(records)
+            self.counters["change_batches"] += 1
+            self.counters["rows_updated"] += len(rows)
+        logger.info(f"Product index at catalog version {version}: {len(rows)} products re-read, {len(deleted)} deleted")
+
+    def _background_refresh(self, full: bool) -> None:
+        try:
+            self.refresh(full=full)
+        except Exception as e:
+            self.counters["failed"] += 1
+            logger.warning(f"Product index refresh failed, keeping the current one: {str(e)}")
+        finally:
+            self._refreshing = False
+
+    def _current(self) -> Optional[_Snapshot]:
+        """The snapshot to serve: loads synchronously the first time, then refreshes in the background when stale."""
+        if not self.enabled:
+            return None
+        if self._snapshot is None:
+            if time.monotonic() < self._retry_at:
+                return None
+            with self._refresh_lock:
+                if self._snapshot is None:
+                    try:
+                        self.refresh(full=True)
+                    except Exception as e:
+                        self.counters["failed"] += 1
+                        self._retry_at = time.monotonic() + PRODUCT_INDEX_RETRY_SECONDS
+                        logger.warning(f"Product index unavailable: {str(e)}")
+                        return None
+            return self._snapshot
+        now = time.monotonic()
+        if now - self._refreshed_at >= self.refresh_seconds:
+            with self._refresh_lock:
+                if self._refreshing:
+                    return self._snapshot
+                self._refreshing = True
+            full = now - self._full_reload_at >= self.full_reload_seconds
+            threading.Thread(target=self._background_refresh, args=(full,), name="product-index", daemon=True).start()
+        return self._snapshot
+
+    # --- lookups ---
+    def lookup(self, reference: str, limit: int = 5) -> Optional[Tuple[str, List[Dict[str, Any]]]]:
+        """
+        Resolves a product name, slug or product_id.
+
+        Returns:
+            ("exact" | "fuzzy" | "none", matching records), or None if the index could not be loaded
+        """
+        snapshot = self._current()
+        if snapshot is None:
+            return None
+        reference = str(reference or "").strip()
+        if not reference:
+            return "none", []
+
+        product_ids: List[str] = []
+        if reference.lower() in snapshot.records:
+            product_ids = [reference.lower()]
+        elif slugify(reference) in snapshot.by_slug:
+            product_ids = [snapshot.by_slug[slugify(reference)]]
+        elif normalize_product_name(reference) in snapshot.by_name:
+            product_ids = snapshot.by_name[normalize_product_name(reference)]
+        if product_ids:
+            self.counters["exact"] += 1
+            return "exact", [snapshot.records[product_id] for product_id in product_ids]
+
+        words = _words(reference)
+        keys = [key for key in snapshot.name_keys if words and all(word in key for word in words)]
+        if not keys:
+            keys = difflib.get_close_matches(normalize_product_name(reference), snapshot.name_keys, n=limit, cutoff=PRODUCT_INDEX_FUZZY_CUTOFF)
+        if not keys:
+            self.counters["misses"] += 1
+            return "none", []
+        self.counters["fuzzy"] += 1
+        return "fuzzy", [snapshot.records[product_id] for key in keys for product_id in snapshot.by_name[key]][:limit]
+
+    def stats(self) -> Dict[str, Any]:
+        snapshot = self._snapshot
+        return {
+            "products": len(snapshot.records) if snapshot else 0,
+            "age_seconds": time.monotonic() - self._refreshed_at if snapshot else 0.0,
+            **self.counters,
+        }
+
+
+# Process-wide index used by resolve_product, find_and_add_to_cart and route_to_page
+product_index = ProductIndex()
+catalog_events.register("product_index", product_index.on_catalog_change)
@@ -1,20 +1,63 @@
-from sqlalchemy import create_engine, text, Engine
-import pandas as pd
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
 from langchain_core.tools import tool
-from dotenv import load_dotenv
+from agent.utils.telemetry import span
+from agent.utils.result_store import current_thread_id, result_store
+from agent.utils.product_index import INDEX_COLUMNS, product_index
+from agent.utils.catalog_snapshot import catalog_snapshot
+from agent.utils.sql_guard import sql_guard
+from agent.utils.query_stats import query_stats
+from agent.utils.db_pool import EngineTarget, ReadPool
+from agent.utils.catalog_events import catalog_events
 import os
-load_dotenv()
+import re
+import time
+
+# pandas and SQLAlchemy are imported on first use of the tool, not at agent startup
+if TYPE_CHECKING:
+    import pandas as pd
+    from sqlalchemy import Engine
 
 
 
 # --- ServerSession and DB Tools ---
+def engine_options(database_url: str) -> dict:
+    """Pool and driver options for create_engine.
+    The Postgres-only ones (libpq connect_args, READ COMMITTED) are skipped for other dialects,
+    so a local SQLite catalog can be used by the offline benchmarks.
+    """
+    from sqlalchemy import make_url
+
+    if make_url(database_url).get_backend_name() != "postgresql":
+        return {"pool_pre_ping": True}
+    return {
+        "pool_size": 2,          # Reduced pool size for faster startup
+        "max_overflow": 2,       # Reduced overflow
+        "pool_timeout": 5,       # Reduced timeout
+        "pool_recycle": 1800,
+        "pool_pre_ping": True,
+        "pool_use_lifo": True,
+        "isolation_level": "READ COMMITTED",
+        "connect_args": {
+            "application_name": "furniture",
+            "connect_timeout": 5,  # an unreachable replica fails over instead of hanging the read
+            "options": "-c statement_timeout=10000",  # Reduced timeout
+            "keepalives": 1,
+            "keepalives_idle": 60,
+            "keepalives_interval": 30,
+            "keepalives_count": 3
+        },
+    }
+
 class ServerSession:
     """A session for server-side state management and operations.
-    In practice, this would be a separate service from where the agent is running and the agent would communicate with it using a REST API. In this simplified example, we use it to persist the db engine and data returned from the query_db tool.
+    In practice, this would be a separate service from where the agent is running and the agent would communicate with it using a REST API. In this simplified example, we use it to persist the db engine.
+    Rows returned by the query_db tool are kept per conversation in agent/utils/result_store.py.
+    `engine` is the primary; catalog reads go through `read()`, which spreads them over the
+    primary and the read replicas in SUPABASE_READ_REPLICA_URLS (agent/utils/db_pool.py).
     """
     def __init__(self):
-        self.engine: Engine = None
-        self.df: pd.DataFrame = None
+        self.engine: "Engine" = None
+        self.pool: Optional[ReadPool] = None
         # Lazy initialization - don't connect until needed
         self._initialized = False
     
@@ -24,44 +67,92 @@ class ServerSession:
             return
             
         try:
+            from sqlalchemy import create_engine
+
             supabase_url = os.getenv("SUPABASE_URL")
             print(f"Connecting to database at {supabase_url}")
-            self.engine = create_engine(
-                supabase_url,
-                pool_size=2,          # Reduced pool size for faster startup
-                max_overflow=2,       # Reduced overflow
-                pool_timeout=5,       # Reduced timeout
-                pool_recycle=1800,
-                pool_pre_ping=True,
-                pool_use_lifo=True,
-                connect_args={
-                    "application_name": "furniture",
-                    "options": "-c statement_timeout=10000",  # Reduced timeout
-                    "keepalives": 1,
-                    "keepalives_idle": 60,
-                    "keepalives_interval": 30,
-                    "keepalives_count": 3
-                }
-            )
+            self.engine = create_engine(supabase_url, **engine_options(supabase_url))
+            replica_urls = [url.strip() for url in os.getenv("SUPABASE_READ_REPLICA_URLS", "").split(",") if url.strip()]
+            replicas = [
+                EngineTarget(f"replica_{index}", create_engine(url, **engine_options(url)))
+                for index, url in enumerate(replica_urls, 1)
+            ]
+            self.pool = ReadPool(EngineTarget("primary", self.engine, primary=True), replicas)
+            # Catalog caches are invalidated by NOTIFY from the primary (sql/catalog_notify.sql)
+            catalog_events.start(self.engine)
             self._initialized = True
-            print("✅ Database connection established")
+            print(f"✅ Database connection established ({len(replicas)} read replicas)")
         except Exception as e:
             print(f"❌ Database connection failed: {e}")
             raise
 
+    def read(self, work, name: str = "query_db"):
+        """Runs a read-only work(connection) on the primary or a read replica, failing over on connection errors."""
+        self._ensure_connected()
+        return self.pool.run(work, name)
+
+    def stats(self) -> Dict[str, Any]:
+        return self.pool.stats() if self.pool else {}
+
 # Create a global instance of the ServerSession
 session = ServerSession()
 
+# Above QUERY_DB_SUMMARY_THRESHOLD rows query_db returns aggregates (counts by category and
+# room, price min/median/max) and one page of QUERY_DB_PAGE_SIZE rows instead of every row,
+# so the next llm_call stays the same size however many products match.
+QUERY_DB_SUMMARY_THRESHOLD = int(os.getenv("QUERY_DB_SUMMARY_THRESHOLD", "25"))
+QUERY_DB_PAGE_SIZE = int(os.getenv("QUERY_DB_PAGE_SIZE", "10"))
+SUMMARY_MAX_GROUPS = 10
+
+def _sorted_rows(df: "pd.DataFrame", sort_by: Optional[str]) -> Tuple["pd.DataFrame", str]:
+    """Sorts by "column" or "column desc"; returns the frame and a description of the order used."""
+    if not sort_by:
+        return df, "in query order"
+    column, _, direction = sort_by.strip().partition(" ")
+    if column not in df.columns:
+        return df, f"in query order, there is no column '{column}' to sort by"
+    descending = direction.strip().lower() == "desc"
+    return df.sort_values(column, ascending=not descending, kind="stable"), f"sorted by {column} {'desc' if descending else 'asc'}"
+
+def _result_summary(df: "pd.DataFrame", page: int, pages: int, first: int, last: int, order: str) -> str:
+    import pandas as pd
+
+    lines = [
+        f"[RESULT SUMMARY]: {len(df)} rows matched, so only rows {first}-{last} are listed below "
+        f"(page {page} of {pages}, {order}). Summarize the totals for the user instead of listing everything."
+    ]
+    for column in ("category", "room"):
+        if column in df.columns:
+            counts = df[column].value_counts()
+            groups = ", ".join(f"{name} {count}" for name, count in counts.head(SUMMARY_MAX_GROUPS).items())
+            more = f", +{len(counts) - SUMMARY_MAX_GROUPS} more" if len(counts) > SUMMARY_MAX_GROUPS else ""
+            lines.append(f"- by {column}: {groups}{more}")
+    if "price" in df.columns:
+        prices = pd.to_numeric(df["price"], errors="coerce").dropna()
+        if not prices.empty:
+            lines.append(f"- price: min {prices.min():g}, median {prices.median():g}, max {prices.max():g}")
+    if page < pages:
+        lines.append(f"- more rows: call query_db with the same query and page={page + 1}")
+    return "\n".join(lines)
+
 @tool
-def query_db(query: str) -> str:
+def query_db(query: str, page: int = 1, sort_by: Optional[str] = None) -> str:
     """Query the database using Postgres SQL - ONLY for products and featured_products tables.
     Args:
         query: The SQL query to execute. Must be a valid postgres SQL string that can be executed directly.
                ONLY queries on 'products' and 'featured_products' tables are allowed.
+        page: Page of rows to list when the result is large and returned as a summary (default: 1).
+        sort_by: Order of the listed rows for large results, a column name optionally followed by
+                 "desc", e.g. "price" or "price desc" (default: the query's own order).
     Returns:
-        str: Raw query results that the LLM will format appropriately.
+        str: Raw query results that the LLM will format appropriately. Large results come as a
+             [RESULT SUMMARY] (counts by category and room, price range) plus one page of rows.
     """
+    tracked = None
     try:
+        import pandas as pd
+        from sqlalchemy import text
+
         # Ensure database connection is established
         session._ensure_connected()
         
@@ -79,24 +170,65 @@ def query_db(query: str) -> str:
         if not has_allowed_table:
             return "Error: Query must reference 'products' or 'featured_products' tables."
         
-        with session.engine.connect().execution_options(
-            isolation_level="READ COMMITTED"
-        ) as conn:
-            result = conn.execute(text(query))
-            columns = list(result.keys())
-            rows = result.fetchall()
-            df = pd.DataFrame(rows, columns=columns)            # Store the raw results including slug for LLM internal use
-            session.df = pd.DataFrame(rows, columns=columns)
-            
+        # Per-fingerprint statistics (see query_stats.py and /debug/queries)
+        tracked = query_stats.start(query)
+
+        def _read(conn):
+            # EXPLAIN cost check: too expensive -> error for the model, too many rows -> LIMIT added
+            with span("query_db.guard") as guard_span:
+                decision = sql_guard.check(conn, query)
+                guard_span.set("action", decision["action"])
+            if decision["action"] == "reject":
+                return decision, [], []
+            started = time.perf_counter()
+            try:
+                with span("query_db.execute"):
+                    result = conn.execute(text(decision["query"]))
+                with span("query_db.fetch") as fetch_span:
+                    columns = list(result.keys())
+                    rows = result.fetchall()
+                    fetch_span.set("rows", len(rows))
+            finally:
+                # Also for failed queries: a statement timeout is the slowest query of all
+                tracked["execution_seconds"] = time.perf_counter() - started
+            return decision, columns, rows
+
+        # On the least busy of the primary and read replicas; a lost connection is retried on the next one
+        decision, columns, rows = session.read(_read)
+        tracked["cached"] = decision["cached"]
+        if decision["action"] == "reject":
+            query_stats.finish(tracked, rejected=True)
+            return decision["message"]
+        df = pd.DataFrame(rows, columns=columns)
+
+        with span("query_db.format") as format_span:
+            summary = None
+            if len(df) > QUERY_DB_SUMMARY_THRESHOLD:
+                # Large result: aggregates plus one page of rows (the LLM never sees every row)
+                ordered, order = _sorted_rows(df, sort_by)
+                pages = -(-len(df) // QUERY_DB_PAGE_SIZE)
+                page = min(max(int(page or 1), 1), pages)
+                start = (page - 1) * QUERY_DB_PAGE_SIZE
+                summary = _result_summary(df, page, pages, start + 1, min(start + QUERY_DB_PAGE_SIZE, len(df)), order)
+                df = ordered.iloc[start:start + QUERY_DB_PAGE_SIZE]
+                format_span.set("mode", "summary")
+                format_span.set("matched", len(rows))
+            # Compact product records for this conversation's follow-ups ("add this one"), listed rows first
+            shown = set(df.index)
+            order_stored = list(df.index) + [index for index in range(len(rows)) if index not in shown]
+            result_store.put(current_thread_id(), (dict(zip(columns, rows[index])) for index in order_stored))
+
             # Create user-friendly display without image_url (keep product_id for cart operations)
             display_fields = ['image_url']  # Only hide image_url, keep product_id for cart tools
             df_display = df.drop(columns=[col for col in display_fields if col in df.columns])
             
-            conn.close()
-            
             # Return both display format and internal data
             display_result = df_display.to_markdown(index=False)
-              # Add slug and product_id information as hidden metadata for LLM routing and cart operations
+            if summary:
+                display_result = f"{summary}\n\n{display_result}"
+            if decision["action"] == "rewrite":
+                display_result = f"{decision['message']}\n{display_result}"
+            # Add slug and product_id information as hidden metadata for LLM routing and cart operations
             if 'slug' in df.columns and not df.empty:
                 slug_info = "\n\n[INTERNAL_SLUG_DATA]:"
                 for _, row in df.iterrows():
@@ -111,7 +243,151 @@ def query_db(query: str) -> str:
                     if 'name' in row and 'product_id' in row:
                         product_id_info += f"\n- {row['name']}: {row['product_id']}"
                 display_result += product_id_info
+            format_span.set("rows", len(df))
+            format_span.set("bytes", len(display_result.encode("utf-8")))
             
-            return display_result
+        query_stats.finish(tracked, rows=len(rows), bytes_out=len(display_result.encode("utf-8")))
+        return display_result
     except Exception as e:
-        return f"Error executing query: {str(e)}"
\ No newline at end of file
+        if tracked is not None:
+            query_stats.finish(tracked, error=str(e))
+        return f"Error executing query: {str(e)}"
+
+
+# --- Product lookup for the cart tools ---
+# find_and_add_to_cart takes whatever the model has at hand (a product name, a slug or the
+# UUID) and resolves it here: first against the products query_db recently returned in this
+# conversation (result_store), then in the catalog index (product_index.py), and with one
+# parameterized query on the products table only if the index is unavailable.
+UUID_PATTERN = re.compile(r"^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$", re.IGNORECASE)
+PRODUCT_LOOKUP_LIMIT = int(os.getenv("PRODUCT_LOOKUP_LIMIT", "5"))
+LOOKUP_COLUMNS = ("product_id", "name", "slug", "price")
+
+
+def _normalize_reference(value: Any) -> str:
+    """'King-Size-Bed', 'king size bed' and 'King Size Bed' all become 'king size bed'."""
+    return re.sub(r"[^a-z0-9]+", " ", str(value or "").lower()).strip()
+
+
+def _reference_words(reference: str) -> List[str]:
+    # "chairs" should find "Dining Chair"
+    return [word[:-1] if len(word) > 3 and word.endswith("s") else word for word in _normalize_reference(reference).split()]
+
+
+def _exact_matches(reference: str, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    key = _normalize_reference(reference)
+    return [
+        row for row in rows
+        if key and key in (_normalize_reference(row.get("product_id")), _normalize_reference(row.get("slug")), _normalize_reference(row.get("name")))
+    ]
+
+
+def _rank_matches(reference: str, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Rows whose product_id, slug or name equals the reference; failing that, rows whose name contains all of its words."""
+    exact = _exact_matches(reference, rows)
+    if exact:
+        return exact
+    words = _reference_words(reference)
+    return [row for row in rows if all(word in _normalize_reference(row.get("name")) for word in words)]
+
+
+def _lookup_row(row: Dict[str, Any]) -> Dict[str, Any]:
+    return {column: (str(row[column]) if column == "product_id" else row[column]) for column in LOOKUP_COLUMNS if column in row}
+
+
+def _query_products(reference: str) -> List[Dict[str, Any]]:
+    from sqlalchemy import text
+
+    words = _reference_words(reference)[:6]
+    params: Dict[str, Any] = {"slug": "-".join(_normalize_reference(reference).split()), "limit": PRODUCT_LOOKUP_LIMIT}
+    conditions = ["slug = :slug"]
+    if words:
+        params.update({f"word{index}": f"%{word}%" for index, word in enumerate(words)})
+        conditions.append("(" + " AND ".join(f"LOWER(name) LIKE :word{index}" for index in range(len(words))) + ")")
+    if UUID_PATTERN.match(reference):
+        params["product_id"] = reference
+        conditions.append("product_id = :product_id")
+    sql = f"SELECT product_id, name, slug, price FROM products WHERE {' OR '.join(conditions)} LIMIT :limit"
+    with span("product_lookup.db") as lookup_span:
+        rows = session.read(lambda conn: [dict(row._mapping) for row in conn.execute(text(sql), params)], "product_lookup")
+        lookup_span.set("rows", len(rows))
+    return rows
+
+
+def resolve_product_reference(reference: str) -> Tuple[str, List[Dict[str, Any]]]:
+    """
+    Resolves a product name, slug or product_id to catalog rows.
+
+    Args:
+        reference: What the user or model called the product
+
+    Returns:
+        Tuple[str, List[Dict[str, Any]]]: "exact" when the product_id, slug or name matched as
+        given, "fuzzy" for partial or misspelled matches the user has to confirm, or "none";
+        and the matching products (product_id, name, slug, price)
+    """
+    reference = str(reference or "").strip()
+    if not reference:
+        return "none", []
+    rows = {row["product_id"]: row for row in result_store.get(current_thread_id()) if row.get("product_id")}
+    exact = _exact_matches(reference, list(rows.values()))
+    if exact:
+        return "exact", [_lookup_row(row) for row in exact]
+    # Partial matches among recent results may miss a better one in the catalog
+    indexed = product_index.lookup(reference, limit=PRODUCT_LOOKUP_LIMIT)
+    if indexed is not None:
+        return indexed[0], [_lookup_row(row) for row in indexed[1]]
+    for row in _query_products(reference):
+        rows.setdefault(str(row["product_id"]), row)
+    exact = _exact_matches(reference, list(rows.values()))
+    if exact:
+        return "exact", [_lookup_row(row) for row in exact]
+    ranked = _rank_matches(reference, list(rows.values()))
+    return ("fuzzy" if ranked else "none"), [_lookup_row(row) for row in ranked]
+
+
+@tool
+def resolve_product(product: str) -> Dict[str, Any]:
+    """Looks up a product by name, slug or product_id in the catalog index, without running SQL.
+    Args:
+        product: The product name (e.g. "King Size Bed"), slug (e.g. "king-size-bed") or UUID product_id.
+                 Misspelled or partial names ("kng bed", "dining chairs") return the closest products.
+    Returns:
+        Dict: match ("exact", "fuzzy" or "none") and the matching products with product_id, name, slug and price.
+    """
+    try:
+        indexed = product_index.lookup(product, limit=PRODUCT_LOOKUP_LIMIT)
+        if indexed is None:
+            # Index unavailable: the same lookup as find_and_add_to_cart, backed by the DB
+            match, records = resolve_product_reference(product)
+        else:
+            match, records = indexed
+        records = [{column: record.get(column) for column in INDEX_COLUMNS} for record in records]
+        # Follow-ups in this conversation ("add it", "open it") resolve from the result store
+        result_store.put(current_thread_id(), records)
+        return {
+            "success": bool(records),
+            "message": f"{match} match for '{product}'" if records else f"No product matches '{product}'",
+            "match": match,
+            "products": records,
+        }
+    except Exception as e:
+        return {"success": False, "message": f"Error resolving product: {str(e)}", "match": "none", "products": []}
+
+
+@tool
+def get_catalog_overview(section: str = "all") -> str:
+    """Featured products and catalog facets from a precomputed snapshot - instant, no SQL.
+    Args:
+        section: "featured" for the featured products, "facets" for categories, rooms (with product
+                 counts, price ranges and ready /shop filter URLs) and price bands, or "all" for both.
+    Returns:
+        str: Compact rows; facet rows end with the shop URL to pass on to the user or route_to_page.
+    """
+    overview = catalog_snapshot.get(section)
+    if overview is None:
+        return "Error: catalog overview is unavailable right now. Use query_db instead."
+    if section != "facets":
+        # "add the first one" after the featured list resolves from the result store
+        result_store.put(current_thread_id(), catalog_snapshot.data["featured"])
+    return overview
\ No newline at end of file
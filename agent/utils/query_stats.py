@@ -0,0 +1,142 @@
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict, deque
+from typing import Any, Dict, List, Optional
+from agent.utils.sql_guard import fingerprint, fingerprint_id
+
+logger = logging.getLogger(__name__)
+
+# Rolling statistics per query fingerprint (sql_guard.fingerprint: literals stripped) for the
+# SQL query_db runs: calls, p50/p95 execution time over the last QUERY_STATS_WINDOW calls,
+# rows returned, bytes formatted for the LLM, error/rejection rate and how often the EXPLAIN
+# estimate came from the guard's cache. Served as JSON on /debug/queries.
+# Queries slower than QUERY_SLOW_MS are logged with their plan (at most once per fingerprint
+# every QUERY_SLOW_PLAN_INTERVAL seconds; the plan is fetched off the request path).
+QUERY_STATS_WINDOW = int(os.getenv("QUERY_STATS_WINDOW", "256"))
+QUERY_STATS_MAX_FINGERPRINTS = int(os.getenv("QUERY_STATS_MAX_FINGERPRINTS", "500"))
+QUERY_SLOW_MS = float(os.getenv("QUERY_SLOW_MS", "500"))
+QUERY_SLOW_PLAN_INTERVAL = float(os.getenv("QUERY_SLOW_PLAN_INTERVAL", "3600"))
+PLAN_PREFIXES = {"postgresql": "EXPLAIN", "sqlite": "EXPLAIN QUERY PLAN"}
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def _outcome(error: Optional[str], rows: int) -> str:
+    return f"failed: {error.splitlines()[0][:200]}" if error else f"{rows} rows"
+
+
+class QueryStats:
+    """Per-fingerprint counters and a window of execution times, bounded LRU over fingerprints."""
+
+    def __init__(self, window: int = QUERY_STATS_WINDOW, max_fingerprints: int = QUERY_STATS_MAX_FINGERPRINTS, slow_ms: float = QUERY_SLOW_MS):
+        self.window = window
+        self.max_fingerprints = max_fingerprints
+        self.slow_ms = slow_ms
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._plan_logged: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self.counters = {"calls": 0, "errors": 0, "slow": 0, "evicted": 0}
+
+    def start(self, query: str) -> Dict[str, Any]:
+        """Begins tracking one query_db call; pass the returned dict to finish()."""
+        return {"query": query, "fingerprint": fingerprint(query), "execution_seconds": 0.0, "cached": False}
+
+    def finish(self, tracked: Dict[str, Any], rows: int = 0, bytes_out: int = 0, error: Optional[str] = None, rejected: bool = False) -> None:
+        """Records one call; failed calls count as errors and, if they ran long enough (e.g. statement timeouts), as slow."""
+        key = tracked["fingerprint"]
+        tracked["error"] = error
+        duration_ms = tracked["execution_seconds"] * 1000
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                entry = {
+                    "id": fingerprint_id(tracked["query"]), "fingerprint": key, "example": tracked["query"][:500],
+                    "calls": 0, "errors": 0, "rejected": 0, "rows": 0, "bytes": 0, "cache_hits": 0,
+                    "total_ms": 0.0, "error_ms": 0.0, "durations": deque(maxlen=self.window),
+                }
+            self._entries[key] = entry
+            while len(self._entries) > self.max_fingerprints:
+                self._entries.popitem(last=False)
+                self.counters["evicted"] += 1
+            entry["calls"] += 1
+            entry["errors"] += error is not None
+            if error is not None:
+                entry["error_ms"] += duration_ms  # time spent in failed queries, e.g. until statement_timeout
+            entry["rejected"] += rejected
+            entry["rows"] += rows
+            entry["bytes"] += bytes_out
+            entry["cache_hits"] += bool(tracked["cached"])
+            if error is None and not rejected:
+                entry["total_ms"] += duration_ms
+                entry["durations"].append(duration_ms)
+            self.counters["calls"] += 1
+            self.counters["errors"] += error is not None
+            slow = duration_ms >= self.slow_ms
+            log_plan = slow and time.monotonic() - self._plan_logged.get(key, float("-inf")) >= QUERY_SLOW_PLAN_INTERVAL
+            if log_plan:
+                self._plan_logged[key] = time.monotonic()
+        if slow:
+            self.counters["slow"] += 1
+            if log_plan:
+                threading.Thread(target=self._log_plan, args=(tracked, duration_ms, rows), name="slow-query-plan", daemon=True).start()
+            else:
+                logger.warning(f"Slow query {entry['id']} ({duration_ms:.0f} ms, {_outcome(error, rows)}): {key}")
+
+    def _log_plan(self, tracked: Dict[str, Any], duration_ms: float, rows: int) -> None:
+        from sqlalchemy import text
+        from agent.utils.product_tools import session
+
+        plan = "(no plan available for this database)"
+        prefix = PLAN_PREFIXES.get(session.engine.dialect.name)
+        try:
+            if prefix:
+                with session.engine.connect() as conn:
+                    result = conn.execute(text(f"{prefix} {tracked['query'].strip().rstrip(';')}"))
+                    plan = "\n".join(" | ".join(str(value) for value in row) for row in result)
+        except Exception as e:
+            plan = f"(plan unavailable: {str(e)})"
+        logger.warning(
+            f"Slow query {fingerprint_id(tracked['query'])} ({duration_ms:.0f} ms, {_outcome(tracked.get('error'), rows)}): {tracked['fingerprint']}\n{plan}"
+        )
+
+    def report(self) -> List[Dict[str, Any]]:
+        """Per-fingerprint statistics, the fingerprints with the most total execution time first."""
+        with self._lock:
+            entries = [dict(entry, durations=list(entry["durations"])) for entry in self._entries.values()]
+        report = []
+        for entry in entries:
+            calls = entry["calls"]
+            durations = entry.pop("durations")
+            report.append({
+                **{key: entry[key] for key in ("id", "fingerprint", "example", "calls", "errors", "rejected")},
+                "total_ms": round(entry["total_ms"], 1),
+                "error_ms": round(entry["error_ms"], 1),
+                "p50_ms": round(_percentile(durations, 50), 1),
+                "p95_ms": round(_percentile(durations, 95), 1),
+                "mean_rows": round(entry["rows"] / calls, 1),
+                "mean_bytes": round(entry["bytes"] / calls, 1),
+                "error_rate": round(entry["errors"] / calls, 3),
+                "cache_hit_rate": round(entry["cache_hits"] / calls, 3),
+            })
+        return sorted(report, key=lambda item: item["total_ms"], reverse=True)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._plan_logged.clear()
+            for key in self.counters:
+                self.counters[key] = 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {"fingerprints": len(self._entries), **self.counters}
+
+
+# Process-wide statistics recorded by query_db
+query_stats = QueryStats()
@@ -1,17 +1,18 @@
 import os
-from dotenv import load_dotenv
 from langchain_core.tools import tool
+from agent.utils.telemetry import span
 
-load_dotenv()
 
-# Global variable to store the initialized tool
-_rag_tool_instance = None
+# Global variables to store the initialized embeddings and vector store
+_embeddings = None
+_vectorstore = None
 _initialization_failed = False
+RAG_TOP_K = 5  # Get more relevant docs
 
 @tool
 def rag_tool(query: str) -> str:
     """Searches and returns relevant information about Dhurba Furniture Store including furniture FAQs, policies, customization options, history, delivery, warranty, and general furniture-related questions."""
-    global _rag_tool_instance, _initialization_failed
+    global _embeddings, _vectorstore, _initialization_failed
     
     # If initialization previously failed, return fallback message
     if _initialization_failed:
@@ -37,13 +38,12 @@ Please contact our customer support team directly - they'll have all the detaile
 **How can I help you shop for furniture today?** Try asking "show me bedroom furniture" or "find dining tables"."""
     
     # If not initialized yet, try to initialize
-    if _rag_tool_instance is None:
+    if _vectorstore is None:
         try:
             # Import here to avoid hanging during module import
             from langchain_pinecone import PineconeVectorStore
             # Use the legacy import that matches your working notebook
             from langchain_huggingface import HuggingFaceEmbeddings
-            from langchain_core.tools import create_retriever_tool
             
             PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
             
@@ -65,21 +65,24 @@ Please contact our customer support team directly - they'll have all the detaile
                 pinecone_api_key=PINECONE_API_KEY
             )
             
-            retriever = vectorstore.as_retriever(search_kwargs={"k": 5})  # Get more relevant docs
-            
-            _rag_tool_instance = create_retriever_tool(
-                retriever,
-                "search_furniture_knowledge_base",
-                "Searches Dhurba Furniture Store's knowledge base for information about furniture care, policies, customization, delivery, warranty, FAQs, and general furniture information."
-            )
+            # Embedding and search are run separately (instead of through a retriever tool)
+            # so each phase can be timed on its own
+            _embeddings = embeddings
+            _vectorstore = vectorstore
             
         except Exception as e:
             _initialization_failed = True
             return f"I'm sorry, but I cannot access our knowledge database right now. The system encountered an error: {str(e)}. I can still help you with product searches and navigation. Please ask about specific products or let me know how else I can assist you."
     
-    # Use the initialized tool
+    # Use the initialized embeddings and vector store
     try:
-        result = _rag_tool_instance.invoke(query)
+        with span("rag.embed") as embed_span:
+            query_vector = _embeddings.embed_query(query)
+            embed_span.set("bytes", len(query.encode("utf-8")))
+        with span("rag.search") as search_span:
+            documents = _vectorstore.similarity_search_by_vector(query_vector, k=RAG_TOP_K)
+            search_span.set("rows", len(documents))
+        result = "\n\n".join(document.page_content for document in documents)
         
         # If no relevant results found, provide helpful fallback
         if not result or len(str(result).strip()) < 20:
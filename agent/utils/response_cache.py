@@ -0,0 +1,168 @@
+import os
+import json
+import time
+import uuid
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional
+from langchain_core.messages import BaseMessage, HumanMessage, AIMessage, ToolMessage
+from agent.utils.intent import strip_user_context
+from agent.utils.history import message_text
+
+logger = logging.getLogger(__name__)
+
+# Opt-in exact-match cache for llm_call responses on user-independent turns
+LLM_RESPONSE_CACHE_ENABLED = os.getenv("LLM_RESPONSE_CACHE", "false").lower() in ("1", "true", "yes")
+LLM_RESPONSE_CACHE_TTL = int(os.getenv("LLM_RESPONSE_CACHE_TTL", "3600"))
+LLM_RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("LLM_RESPONSE_CACHE_MAX_ENTRIES", "512"))
+
+# Tools whose inputs/outputs depend on the [User ID: ...] of the message
+USER_DEPENDENT_TOOLS = {
+    "validate_user_authentication",
+    "get_user_profile_data",
+    "update_user_profile",
+    "get_user_cart_data",
+    "add_item_to_cart",
+    "update_cart_item",
+    "find_and_add_to_cart",
+    "add_items_to_cart",
+    "update_cart_items",
+}
+
+# Only turns classified into these intents are cached; a turn with no intent
+# ("yes please", "the second one") depends on earlier turns and is never cached
+CACHEABLE_INTENTS = {"greeting", "knowledge", "browse"}
+
+
+def prompt_version(system_prompt: str) -> str:
+    """Short hash identifying the system prompt, so prompt edits invalidate cached responses."""
+    return hashlib.sha256(system_prompt.encode("utf-8")).hexdigest()[:16]
+
+
+def _turn_suffix(messages: List[BaseMessage]) -> List[BaseMessage]:
+    for index in range(len(messages) - 1, -1, -1):
+        if isinstance(messages[index], HumanMessage):
+            return messages[index:]
+    return []
+
+
+def _previous_turn(messages: List[BaseMessage]) -> List[BaseMessage]:
+    """The completed turn before the current one: its user message up to the current user message."""
+    current = len(messages) - len(_turn_suffix(messages))
+    for index in range(current - 1, -1, -1):
+        if isinstance(messages[index], HumanMessage):
+            return messages[index:current]
+    return []
+
+
+def _calls_user_tools(message: BaseMessage) -> bool:
+    return any(call["name"] in USER_DEPENDENT_TOOLS for call in getattr(message, "tool_calls", None) or [])
+
+
+class ResponseCache:
+    """
+    LRU + TTL cache of LLM responses keyed on (prompt version, bound tool set, conversation
+    summary, previous turn, normalized turn suffix).
+
+    The turn suffix is the last user message (with the [User ID: ...] marker stripped and
+    whitespace/case normalized) plus any tool calls/results already made in this turn.
+    Follow-ups like "the cheapest one" depend on what came before, so the summary and the
+    previous turn are part of the key: a reply is only reused in the same context.
+    Turns that involve a user-dependent tool (in this turn or the previous one) are never
+    cached, and responses that call one are never stored.
+    """
+
+    def __init__(self, max_entries: int = LLM_RESPONSE_CACHE_MAX_ENTRIES, ttl_seconds: int = LLM_RESPONSE_CACHE_TTL, enabled: bool = LLM_RESPONSE_CACHE_ENABLED):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.skipped = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def make_key(self, version: str, tool_names: Iterable[str], intents: Iterable[str], messages: List[BaseMessage], summary: str = "") -> Optional[str]:
+        """Returns the cache key for this turn, or None when the turn must not be cached."""
+        if not self.enabled:
+            return None
+        intents = set(intents)
+        suffix = _turn_suffix(messages)
+        if not intents or not intents <= CACHEABLE_INTENTS or not suffix:
+            self.skipped += 1
+            return None
+
+        parts: List[Any] = []
+        for message in _previous_turn(messages) + suffix:
+            if isinstance(message, HumanMessage):
+                parts.append(["human", strip_user_context(message_text(message))])
+            elif isinstance(message, AIMessage):
+                if _calls_user_tools(message):
+                    self.skipped += 1
+                    return None
+                parts.append(["ai", message_text(message), [[c["name"], c["args"]] for c in message.tool_calls]])
+            elif isinstance(message, ToolMessage):
+                if message.name in USER_DEPENDENT_TOOLS:
+                    self.skipped += 1
+                    return None
+                parts.append(["tool", message.name, message_text(message)])
+
+        payload = json.dumps([version, sorted(tool_names), summary or "", parts], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: Optional[str]) -> Optional[AIMessage]:
+        if key is None:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] < time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            message = entry[1]
+
+        # Fresh message/tool call ids so the cached reply does not collide with earlier ones in the thread
+        tool_calls = [{**call, "id": f"call_{uuid.uuid4().hex}"} for call in message.tool_calls]
+        return AIMessage(content=message.content, tool_calls=tool_calls, response_metadata={"cache_hit": True})
+
+    def put(self, key: Optional[str], message: AIMessage) -> None:
+        if key is None or _calls_user_tools(message):
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, message)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "skipped": self.skipped,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+# Process-wide cache used by llm_call
+response_cache = ResponseCache()
@@ -0,0 +1,118 @@
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional
+from langchain_core.runnables.config import ensure_config
+
+logger = logging.getLogger(__name__)
+
+# Per-conversation store of the products recently shown by query_db, keyed by LangGraph
+# thread id. Follow-ups ("add this one", "show details of the second") resolve against it
+# without another query. Only compact records are kept, a bounded number per thread, and
+# threads are evicted least-recently-used or after RESULT_STORE_TTL seconds idle.
+RESULT_STORE_MAX_THREADS = int(os.getenv("RESULT_STORE_MAX_THREADS", "1000"))
+RESULT_STORE_MAX_RECORDS = int(os.getenv("RESULT_STORE_MAX_RECORDS", "50"))
+RESULT_STORE_TTL = float(os.getenv("RESULT_STORE_TTL", "3600"))
+RECORD_FIELDS = ("product_id", "name", "slug", "price", "category", "room")
+
+
+def current_thread_id() -> Optional[str]:
+    """The thread_id of the graph run the caller is in (tools get it from tool_node's config)."""
+    return ensure_config().get("configurable", {}).get("thread_id")
+
+
+def compact_record(row: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Keeps the RECORD_FIELDS of a result row; rows without a product_id or slug are not stored."""
+    record = {field: row[field] for field in RECORD_FIELDS if row.get(field) is not None}
+    if "product_id" in record:
+        record["product_id"] = str(record["product_id"])
+    if not record.get("product_id") and not record.get("slug"):
+        return None
+    if hasattr(record.get("price"), "item"):
+        record["price"] = record["price"].item()  # numpy scalars from pandas rows
+    return record
+
+
+class ResultStore:
+    """Bounded LRU/TTL map of thread_id -> recent product records (newest first)."""
+
+    def __init__(self, max_threads: int = RESULT_STORE_MAX_THREADS, max_records: int = RESULT_STORE_MAX_RECORDS, ttl_seconds: float = RESULT_STORE_TTL):
+        self.max_threads = max_threads
+        self.max_records = max_records
+        self.ttl_seconds = ttl_seconds
+        self._threads: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.counters = {"stored": 0, "hits": 0, "misses": 0, "evicted": 0, "expired": 0}
+
+    def _expire(self, now: float) -> None:
+        while self._threads:
+            thread_id, entry = next(iter(self._threads.items()))
+            if now - entry["updated"] < self.ttl_seconds:
+                break
+            del self._threads[thread_id]
+            self.counters["expired"] += 1
+
+    def put(self, thread_id: Optional[str], rows: Iterable[Dict[str, Any]]) -> int:
+        """
+        Adds result rows for a thread; records already stored for the same product move to the front.
+        Returns the number of records stored (0 outside of a graph run, where there is no thread id).
+        """
+        records = [record for record in (compact_record(row) for row in rows) if record is not None]
+        if not thread_id or not records:
+            return 0
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            entry = self._threads.pop(thread_id, None)
+            merged: Dict[Any, Dict[str, Any]] = {}
+            for record in records + (entry["records"] if entry else []):
+                merged.setdefault(record.get("product_id") or record.get("slug"), record)
+            self._threads[thread_id] = {"updated": now, "records": list(merged.values())[:self.max_records]}
+            while len(self._threads) > self.max_threads:
+                self._threads.popitem(last=False)
+                self.counters["evicted"] += 1
+            self.counters["stored"] += len(records)
+        return len(records)
+
+    def get(self, thread_id: Optional[str]) -> List[Dict[str, Any]]:
+        """The thread's records, newest first (empty if unknown or expired)."""
+        if not thread_id:
+            return []
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            entry = self._threads.get(thread_id)
+            if entry is not None and now - entry["updated"] >= self.ttl_seconds:
+                del self._threads[thread_id]
+                self.counters["expired"] += 1
+                entry = None
+            if entry is None:
+                self.counters["misses"] += 1
+                return []
+            # Access counts as activity: refreshing "updated" with the move keeps the order by
+            # position the same as the order by age, which _expire relies on
+            entry["updated"] = now
+            self._threads.move_to_end(thread_id)
+            self.counters["hits"] += 1
+            return list(entry["records"])
+
+    def clear(self, thread_id: Optional[str] = None) -> None:
+        with self._lock:
+            if thread_id is None:
+                self._threads.clear()
+            else:
+                self._threads.pop(thread_id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "threads": len(self._threads),
+                "records": sum(len(entry["records"]) for entry in self._threads.values()),
+                **self.counters,
+            }
+
+
+# Process-wide store shared by query_db and the tools that resolve products
+result_store = ResultStore()
@@ -1,6 +1,8 @@
 import re
 from langchain_core.tools import tool
-from typing import Dict, Any
+from typing import Dict, Any, Iterable, Optional
+from agent.utils.keyword_matcher import KeywordMatcher
+from agent.utils.result_store import current_thread_id, result_store
 
 # Route definitions with keywords for intelligent LLM routing
 ROUTE_DEFINITIONS: Dict[str, Dict[str, Any]] = {
@@ -73,6 +75,32 @@ def slugify(text: str) -> str:
     text = re.sub(r'\s+', '-', text)
     return text.strip('-')
 
+def shop_url(category: str = None, room: str = None) -> str:
+    """The /shop URL with optional category/room filters (used by route_to_page and the catalog snapshot)."""
+    params = []
+    if category:
+        params.append(f"category={category.replace(' ', '+')}")
+    if room:
+        params.append(f"room={room.replace(' ', '+')}")
+    path = ROUTE_DEFINITIONS['shop']['path']
+    return f"{path}?{'&'.join(params)}" if params else path
+
+def resolve_slug(reference: str) -> str:
+    """
+    Maps a product name ("Modern Sofa") to its slug, using the products query_db returned in
+    this thread, then the catalog index. Unknown references are returned unchanged.
+    """
+    from agent.utils.product_index import product_index
+
+    key = slugify(reference)
+    for record in result_store.get(current_thread_id()):
+        if record.get("slug") and key in (record["slug"], slugify(record.get("name") or "")):
+            return record["slug"]
+    indexed = product_index.lookup(reference)
+    if indexed is not None and indexed[0] == "exact" and len(indexed[1]) == 1 and indexed[1][0].get("slug"):
+        return indexed[1][0]["slug"]
+    return reference
+
 def normalize_product_name(text: str) -> str:
     """
     Minimal normalization for LLM-powered product matching.
@@ -94,48 +122,38 @@ def normalize_product_name(text: str) -> str:
     text = text.strip('-')                # Remove leading/trailing hyphens
     return text
 
-def match_query_to_route_keyword(query: str) -> str:
+# Explicit priorities for keyword conflicts (higher wins), e.g. "products" -> shop rather than products
+ROUTE_PRIORITIES: Dict[str, int] = {
+    "cart": 80,
+    "profile": 70,
+    "login": 60,
+    "signup": 50,
+    "product-details": 40,
+    "home": 35,
+    "shop": 30,
+    "products": 20,
+}
+
+def build_route_matcher(routes: Dict[str, Iterable[str]]) -> KeywordMatcher:
+    """Compiles route -> keywords into one regex automaton; a keyword listed under several routes belongs to the one with the highest ROUTE_PRIORITIES entry."""
+    return KeywordMatcher(routes, ROUTE_PRIORITIES)
+
+# Route keyword table compiled once at import
+ROUTE_MATCHER = build_route_matcher(
+    {route_keyword: route_info.get("keywords", []) for route_keyword, route_info in ROUTE_DEFINITIONS.items()}
+)
+
+def route_for_phrase(phrase: str) -> Optional[str]:
     """
-    Intelligent matching of user queries to route keywords using LLM-friendly keyword matching.
-    This helps the LLM agent automatically determine the best route_keyword for user requests.
-    
+    Resolves a phrase that is exactly one route keyword ("cart", "my profile") to its route.
+
     Args:
-        query (str): User's query or request
-        
+        phrase (str): The whole phrase, e.g. the target of "take me to <phrase>"
+
     Returns:
-        str: Best matching route_keyword or "shop" as default
+        Optional[str]: The owning route_keyword, or None if the phrase is not a keyword
     """
-    if not query:
-        return "shop"
-    
-    query_lower = query.lower().strip()
-    
-    # Direct keyword matching for each route
-    for route_keyword, route_info in ROUTE_DEFINITIONS.items():
-        if "keywords" in route_info:
-            for keyword in route_info["keywords"]:
-                if keyword.lower() in query_lower:
-                    return route_keyword
-    
-    # Fallback patterns for common requests
-    profile_patterns = ["who am i", "my info", "my details", "user info"]
-    cart_patterns = ["cart", "basket", "my items"]
-    login_patterns = ["login", "log in", "sign in"]
-    
-    for pattern in profile_patterns:
-        if pattern in query_lower:
-            return "profile"
-    
-    for pattern in cart_patterns:
-        if pattern in query_lower:
-            return "cart"
-    
-    for pattern in login_patterns:
-        if pattern in query_lower:
-            return "login"
-    
-    # Default to shop for product-related or general queries
-    return "shop"
+    return ROUTE_MATCHER.match_whole(phrase)
 
 @tool
 def route_to_page(route_keyword: str = None, slug: str = None, user_authenticated: bool = False, category: str = None, room: str = None) -> str:
@@ -197,21 +215,15 @@ def route_to_page(route_keyword: str = None, slug: str = None, user_authenticate
                 final_url = ROUTE_DEFINITIONS['shop']['path']
                 navigation_msg = "📦 No specific product provided, showing all products"
             else:
+                slug = resolve_slug(slug)
                 final_url = f"/product/{slug}"
                 navigation_msg = f"🛋️ Opening product details for {slug}"
         elif route_keyword in ["shop", "products"]:
             # Handle shop with filters
-            shop_url = ROUTE_DEFINITIONS['shop']['path']
-            params = []
-            if category:
-                params.append(f"category={category.replace(' ', '+')}")
-            if room:
-                params.append(f"room={room.replace(' ', '+')}")
-            if params:
-                final_url = f"{shop_url}?{'&'.join(params)}"
+            final_url = shop_url(category, room)
+            if category or room:
                 navigation_msg = f"🏪 Browsing {category or room or 'products'}"
             else:
-                final_url = shop_url
                 navigation_msg = "🏪 Opening product catalog"
         else:
             # Standard route
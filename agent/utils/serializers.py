@@ -0,0 +1,207 @@
+import json
+from typing import Any, Callable, Dict, List, Optional
+
+# Compact output shapes for tool results.
+# tool_node used to send str(observation), i.e. a Python dict repr of the whole backend
+# response. Each tool with a structured result declares a compact text shape here instead:
+#   - cart tools:    status line, totals line, then `cart_item_id|name|qty|price` rows
+#                    (batch cart tools add a `failed:` line per entry that failed,
+#                    find_and_add_to_cart a `product:` line or `candidate:` rows);
+#                    a cart payload of unknown shape is passed on as compact JSON
+#   - profile tools: status line, then only the profile fields the prompt allows
+#   - auth tool:     a single status line
+#   - resolve_product: status line, then `product_id|name|slug|price|category|room` rows
+# Tools without a declared shape fall back to compact JSON (strings pass through unchanged).
+
+# Same fields the system prompt allows the agent to disclose (names, email and address)
+PROFILE_FIELDS = ("first_name", "last_name", "email", "address")
+CART_ROW_HEADER = "cart_item_id|name|qty|price"
+PRODUCT_FIELDS = ("product_id", "name", "slug", "price", "category", "room")
+
+
+def _status_line(result: Dict[str, Any]) -> str:
+    status = "ok" if result.get("success") else "error"
+    return f"{status}: {result.get('message', '')}".rstrip()
+
+
+def _first(mapping: Dict[str, Any], *keys: str) -> Any:
+    for key in keys:
+        value = mapping.get(key)
+        if value not in (None, ""):
+            return value
+    return None
+
+
+def _cell(value: Any) -> str:
+    if value is None:
+        return ""
+    return str(value).replace("|", "/").replace("\n", " ")
+
+
+def _cart_items(cart_data: Any) -> Optional[List[Dict[str, Any]]]:
+    """Finds the list of cart lines in the backend cart payload; None if the shape is not recognised."""
+    if isinstance(cart_data, list):
+        return [item for item in cart_data if isinstance(item, dict)]
+    if not isinstance(cart_data, dict):
+        return None
+    for key in ("items", "cart_items", "cartItems"):
+        if isinstance(cart_data.get(key), list):
+            return [item for item in cart_data[key] if isinstance(item, dict)]
+    for key in ("cart", "data"):
+        if isinstance(cart_data.get(key), (dict, list)):
+            return _cart_items(cart_data[key])
+    return None
+
+
+def _cart_row(item: Dict[str, Any]) -> Dict[str, Any]:
+    product = item.get("product") or item.get("products") or {}
+    if not isinstance(product, dict):
+        product = {}
+    return {
+        "cart_item_id": _first(item, "cart_item_id", "id", "item_id"),
+        "name": _first(item, "name", "product_name") or product.get("name"),
+        "qty": _first(item, "quantity", "qty"),
+        "price": _first(item, "price", "unit_price") or product.get("price"),
+    }
+
+
+def _as_number(value: Any) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _format_number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else f"{value:.2f}"
+
+
+def serialize_cart_result(result: Dict[str, Any]) -> str:
+    """`get_user_cart_data` / `add_item_to_cart` / `update_cart_item` -> status, totals and rows."""
+    lines = [_status_line(result)]
+    cart_data = result.get("cart_data")
+    if not result.get("success") or cart_data is None:
+        return "\n".join(lines)
+
+    items = _cart_items(cart_data)
+    if items is None:
+        # Unknown backend shape: pass it on rather than report an empty cart
+        lines.append(f"cart: {serialize_default(cart_data)}")
+        return "\n".join(lines)
+    rows = [_cart_row(item) for item in items]
+    quantities = [_as_number(row["qty"]) or 0 for row in rows]
+    total = None
+    if isinstance(cart_data, dict):
+        total = _first(cart_data, "total", "total_price", "total_amount", "subtotal")
+    if total is None:
+        prices = [_as_number(row["price"]) for row in rows]
+        if rows and all(price is not None for price in prices):
+            total = _format_number(sum(p * q for p, q in zip(prices, quantities)))
+
+    lines.append(f"cart: {len(rows)} lines, {_format_number(sum(quantities))} items, total {total if total is not None else 'n/a'}")
+    if rows:
+        lines.append(CART_ROW_HEADER)
+        for row in rows:
+            lines.append("|".join(_cell(row[key]) for key in ("cart_item_id", "name", "qty", "price")))
+    return "\n".join(lines)
+
+
+def serialize_cart_batch_result(result: Dict[str, Any]) -> str:
+    """`add_items_to_cart` / `update_cart_items` -> cart result plus one line per failed entry."""
+    lines = [serialize_cart_result(result)]
+    for entry in result.get("failed") or []:
+        target = entry.get("product_id") or entry.get("cart_item_id") or "bulk request"
+        lines.append(f"failed: {target}: {entry.get('message', '')}".rstrip())
+    return "\n".join(lines)
+
+
+def serialize_cart_lookup_result(result: Dict[str, Any]) -> str:
+    """`find_and_add_to_cart` -> cart result plus the resolved product, or the candidates to choose from."""
+    lines = [serialize_cart_result(result)]
+    product = result.get("product")
+    if product:
+        lines.append(f"product: {_cell(product.get('product_id'))}|{_cell(product.get('name'))}|{_cell(product.get('price'))}")
+    for candidate in result.get("candidates") or []:
+        lines.append(f"candidate: {_cell(candidate.get('product_id'))}|{_cell(candidate.get('name'))}|{_cell(candidate.get('price'))}")
+    return "\n".join(lines)
+
+
+def _profile_fields(profile_data: Any) -> Dict[str, Any]:
+    if not isinstance(profile_data, dict):
+        return {}
+    for key in ("profile", "data", "user"):
+        if isinstance(profile_data.get(key), dict):
+            return _profile_fields(profile_data[key])
+    return {field: profile_data[field] for field in PROFILE_FIELDS if profile_data.get(field) not in (None, "")}
+
+
+def serialize_profile_result(result: Dict[str, Any]) -> str:
+    """`get_user_profile_data` / `update_user_profile` -> status plus allowed profile fields only."""
+    lines = [_status_line(result)]
+    updates = result.get("updates_made")
+    if updates:
+        lines.append("updated: " + ", ".join(f"{key}={value}" for key, value in updates.items()))
+    for field, value in _profile_fields(result.get("profile_data")).items():
+        lines.append(f"{field}: {value}")
+    return "\n".join(lines)
+
+
+def serialize_auth_result(result: Dict[str, Any]) -> str:
+    """`validate_user_authentication` -> single status line."""
+    state = "authenticated" if result.get("authenticated") else "not authenticated"
+    return f"{_status_line(result)} (auth: {state})"
+
+
+def serialize_product_lookup(result: Dict[str, Any]) -> str:
+    """`resolve_product` -> status line, then one row per matching product."""
+    lines = [_status_line(result)]
+    products = result.get("products") or []
+    if products:
+        lines.append("|".join(PRODUCT_FIELDS))
+        for product in products:
+            lines.append("|".join(_cell(product.get(field)) for field in PRODUCT_FIELDS))
+    return "\n".join(lines)
+
+
+def serialize_default(observation: Any) -> str:
+    if isinstance(observation, str):
+        return observation
+    try:
+        return json.dumps(observation, separators=(",", ":"), ensure_ascii=False, default=str)
+    except (TypeError, ValueError):
+        return str(observation)
+
+
+TOOL_OUTPUT_SERIALIZERS: Dict[str, Callable[[Dict[str, Any]], str]] = {
+    "validate_user_authentication": serialize_auth_result,
+    "get_user_profile_data": serialize_profile_result,
+    "update_user_profile": serialize_profile_result,
+    "get_user_cart_data": serialize_cart_result,
+    "add_item_to_cart": serialize_cart_result,
+    "update_cart_item": serialize_cart_result,
+    "find_and_add_to_cart": serialize_cart_lookup_result,
+    "add_items_to_cart": serialize_cart_batch_result,
+    "update_cart_items": serialize_cart_batch_result,
+    "resolve_product": serialize_product_lookup,
+}
+
+
+def serialize_tool_result(tool_name: str, observation: Any) -> str:
+    """
+    Serializes a tool observation into the compact ToolMessage content for that tool.
+
+    Args:
+        tool_name: Name of the tool that produced the observation
+        observation: The raw tool return value
+
+    Returns:
+        str: Compact text for the ToolMessage
+    """
+    serializer = TOOL_OUTPUT_SERIALIZERS.get(tool_name)
+    if serializer is not None and isinstance(observation, dict):
+        try:
+            return serializer(observation)
+        except Exception:
+            # Never lose a tool result because of an unexpected backend shape
+            return serialize_default(observation)
+    return serialize_default(observation)
@@ -0,0 +1,192 @@
+import os
+import re
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Cost guard for the LLM-written SQL of query_db. Before a query runs, its EXPLAIN estimate
+# (total cost and rows) is checked:
+# - cost above SQL_GUARD_MAX_COST          -> rejected with hints for a cheaper query
+#   (cross joins, ILIKE over many text columns), so the model retries instead of holding a
+#   pooled connection until statement_timeout
+# - rows above SQL_GUARD_MAX_ROWS, no LIMIT -> rewritten to return at most SQL_GUARD_ROW_LIMIT rows
+# Estimates are cached per query fingerprint (literals stripped) for SQL_GUARD_CACHE_TTL
+# seconds, so repeated query shapes cost no extra round trip. EXPLAIN (FORMAT JSON) is
+# Postgres-only; other dialects (the SQLite catalog of the offline benchmarks) are not guarded.
+SQL_GUARD_MODE = os.getenv("SQL_GUARD_MODE", "enforce").lower()  # enforce | warn | off
+SQL_GUARD_MAX_COST = float(os.getenv("SQL_GUARD_MAX_COST", "10000"))
+SQL_GUARD_MAX_ROWS = int(os.getenv("SQL_GUARD_MAX_ROWS", "2000"))
+SQL_GUARD_ROW_LIMIT = int(os.getenv("SQL_GUARD_ROW_LIMIT", "500"))
+SQL_GUARD_CACHE_TTL = float(os.getenv("SQL_GUARD_CACHE_TTL", "600"))
+SQL_GUARD_CACHE_SIZE = int(os.getenv("SQL_GUARD_CACHE_SIZE", "1000"))
+
+_COMMENTS = re.compile(r"--[^\n]*|/\*.*?\*/", re.DOTALL)
+_STRINGS = re.compile(r"'(?:[^']|'')*'")
+_NUMBERS = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LISTS = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+_COMMAS = re.compile(r"\s*,\s*")
+_PARENTHESES = re.compile(r"\(\s+|\s+\)")
+_OPERATORS = re.compile(r"\s*(<=|>=|<>|!=|=|<|>)\s*")
+_TRAILING_LIMIT = re.compile(r"\blimit\s+\d+(\s+offset\s+\d+)?\s*$", re.IGNORECASE)
+
+
+def fingerprint(sql: str) -> str:
+    """
+    Normalizes a statement to its shape: comments dropped, string and number literals
+    replaced by ?, IN lists collapsed, whitespace (also around commas, parentheses and comparison operators) and case folded.
+    "SELECT * FROM products WHERE price < 5000 AND name ILIKE '%bed%'" and the same query
+    with other values share the fingerprint "select * from products where price < ? and name ilike ?".
+    """
+    normalized = _COMMENTS.sub(" ", sql)
+    normalized = _STRINGS.sub("?", normalized)
+    normalized = _NUMBERS.sub("?", normalized)
+    normalized = _IN_LISTS.sub("(?)", normalized)
+    normalized = _COMMAS.sub(", ", normalized)
+    normalized = _OPERATORS.sub(r" \1 ", normalized)
+    normalized = _PARENTHESES.sub(lambda match: match.group(0).strip(), normalized)
+    return _WHITESPACE.sub(" ", normalized).strip().rstrip(";").strip().lower()
+
+
+def fingerprint_id(sql: str) -> str:
+    """Short stable id of the fingerprint, for logs and metrics."""
+    return hashlib.sha1(fingerprint(sql).encode("utf-8")).hexdigest()[:12]
+
+
+def _plan_nodes(node: Dict[str, Any]) -> List[Dict[str, Any]]:
+    nodes = [node]
+    for child in node.get("Plans", []):
+        nodes.extend(_plan_nodes(child))
+    return nodes
+
+
+def plan_hints(plan: Dict[str, Any]) -> List[str]:
+    """Why a plan is expensive, phrased as what to change in the query."""
+    hints = []
+    nodes = _plan_nodes(plan)
+    for node in nodes:
+        if node.get("Node Type") == "Nested Loop" and not node.get("Join Filter"):
+            if not any("Index Cond" in child for child in _plan_nodes(node)[1:]):
+                hints.append("it joins tables without a join condition (a cross join); join on product_id or query one table")
+                break
+    for node in nodes:
+        if node.get("Node Type") == "Seq Scan" and str(node.get("Filter", "")).count("~~*") >= 3:
+            hints.append("it ILIKE-scans many text columns; match on name and category only")
+            break
+    if not hints:
+        hints.append("it reads too many rows; add a WHERE on category, room or price, or a LIMIT")
+    return hints
+
+
+def estimate_from_plan(explain_output: Any) -> Dict[str, Any]:
+    """Cost, rows and hints from `EXPLAIN (FORMAT JSON)` output."""
+    if isinstance(explain_output, str):
+        explain_output = json.loads(explain_output)
+    plan = explain_output[0]["Plan"]
+    return {"cost": float(plan.get("Total Cost", 0.0)), "rows": int(plan.get("Plan Rows", 0)), "plan": plan}
+
+
+class SqlGuard:
+    """EXPLAIN-based admission check for query_db, with estimates cached per fingerprint."""
+
+    def __init__(self, mode: str = SQL_GUARD_MODE, max_cost: float = SQL_GUARD_MAX_COST, max_rows: int = SQL_GUARD_MAX_ROWS, row_limit: int = SQL_GUARD_ROW_LIMIT, cache_ttl: float = SQL_GUARD_CACHE_TTL, cache_size: int = SQL_GUARD_CACHE_SIZE):
+        self.mode = mode
+        self.max_cost = max_cost
+        self.max_rows = max_rows
+        self.row_limit = row_limit
+        self.cache_ttl = cache_ttl
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.counters = {"checked": 0, "cache_hits": 0, "explains": 0, "rejected": 0, "rewritten": 0, "explain_errors": 0}
+
+    def _cached(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None or time.monotonic() - entry[0] >= self.cache_ttl:
+                return None
+            self._cache.move_to_end(key)
+            self.counters["cache_hits"] += 1
+            return entry[1]
+
+    def _store(self, key: str, estimate: Dict[str, Any]) -> None:
+        with self._lock:
+            self._cache[key] = (time.monotonic(), estimate)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def estimate(self, conn: Any, query: str) -> Dict[str, Any]:
+        """The EXPLAIN estimate for a query's fingerprint (cost, rows, hints, cached), from the cache when fresh."""
+        from sqlalchemy import text
+
+        key = fingerprint(query)
+        cached = self._cached(key)
+        if cached is not None:
+            return {**cached, "cached": True}
+        self.counters["explains"] += 1
+        explain_output = conn.execute(text(f"EXPLAIN (FORMAT JSON) {query.strip().rstrip(';')}")).scalar()
+        estimate = estimate_from_plan(explain_output)
+        estimate["hints"] = plan_hints(estimate.pop("plan"))
+        self._store(key, estimate)
+        return {**estimate, "cached": False}
+
+    def check(self, conn: Any, query: str) -> Dict[str, Any]:
+        """
+        Decides whether query_db may run a query.
+
+        Returns:
+            Dict with action "allow", "rewrite" (query holds the rewritten SQL) or "reject"
+            (message holds the error for the model), plus the cost and rows estimate and
+            whether it came from the cache
+        """
+        decision = {"action": "allow", "query": query, "message": None, "cost": None, "rows": None, "cached": False}
+        if self.mode == "off" or conn.dialect.name != "postgresql":
+            return decision
+        self.counters["checked"] += 1
+        try:
+            estimate = self.estimate(conn, query)
+        except Exception as e:
+            # Invalid SQL fails here just as it would on execution; let query_db report it.
+            # The failed EXPLAIN aborted the transaction, so roll back before the query runs.
+            self.counters["explain_errors"] += 1
+            logger.debug(f"EXPLAIN failed for query {fingerprint_id(query)}: {str(e)}")
+            conn.rollback()
+            return decision
+        decision.update(cost=estimate["cost"], rows=estimate["rows"], cached=estimate["cached"])
+
+        if estimate["cost"] > self.max_cost:
+            message = (
+                f"Error: query rejected as too expensive (estimated cost {estimate['cost']:.0f} > {self.max_cost:.0f}, "
+                f"~{estimate['rows']} rows): {'; '.join(estimate['hints'])}. Retry with a cheaper query."
+            )
+            logger.warning(f"SQL guard: query {fingerprint_id(query)} over the cost limit ({estimate['cost']:.0f})")
+            if self.mode == "enforce":
+                self.counters["rejected"] += 1
+                decision.update(action="reject", message=message)
+            return decision
+
+        statement = query.strip().rstrip(";").strip()
+        if estimate["rows"] > self.max_rows and not _TRAILING_LIMIT.search(statement):
+            logger.info(f"SQL guard: limiting query {fingerprint_id(query)} (~{estimate['rows']} rows) to {self.row_limit} rows")
+            if self.mode == "enforce":
+                self.counters["rewritten"] += 1
+                decision.update(
+                    action="rewrite",
+                    query=f"SELECT * FROM ({statement}) AS guarded LIMIT {self.row_limit}",
+                    message=f"Note: the query matched about {estimate['rows']} rows; only the first {self.row_limit} were read.",
+                )
+        return decision
+
+    def stats(self) -> Dict[str, Any]:
+        return {"cached_fingerprints": len(self._cache), **self.counters}
+
+
+# Process-wide guard used by query_db
+sql_guard = SqlGuard()
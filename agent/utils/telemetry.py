@@ -0,0 +1,237 @@
+import os
+import sys
+import time
+import bisect
+import logging
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Latency/size instrumentation for the agent.
+# - `span(name, **attributes)` times a block (llm_call, each tool, query_db phases,
+#   backend HTTP calls, RAG embed/search) and records it into Prometheus-style histograms.
+# - `start_metrics_server()` serves them as text at /metrics (METRICS_PORT env var).
+# - With OTEL_EXPORTER_OTLP_ENDPOINT set and opentelemetry installed, spans are also
+#   exported through OpenTelemetry.
+
+METRICS_PORT = os.getenv("METRICS_PORT")
+OTEL_ENABLED = bool(os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT"))
+
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+SIZE_BUCKETS = (1, 10, 100, 1_000, 10_000, 100_000, 1_000_000)
+
+# Numeric span attributes that are also recorded as histograms
+VALUE_ATTRIBUTES = ("rows", "bytes")
+
+
+class Histogram:
+    """Cumulative-bucket histogram with label sets, rendered in the Prometheus text format."""
+
+    def __init__(self, name: str, help_text: str, buckets: Tuple[float, ...]):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self._series: Dict[Tuple[Tuple[str, str], ...], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # one counter per bucket, then +Inf, sum
+                series = self._series[key] = [0.0] * (len(self.buckets) + 2)
+            series[bisect.bisect_left(self.buckets, value)] += 1
+            series[-1] += value
+
+    def reset(self) -> None:
+        with self._lock:
+            self._series.clear()
+
+    def snapshot(self) -> Dict[Tuple[Tuple[str, str], ...], List[float]]:
+        with self._lock:
+            return {key: list(series) for key, series in self._series.items()}
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for key, series in sorted(self.snapshot().items()):
+            label_text = ",".join(f'{k}="{v}"' for k, v in key)
+            prefix = label_text + "," if label_text else ""
+            cumulative = 0.0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{prefix}le="{bound}"}} {cumulative:g}')
+            cumulative += series[len(self.buckets)]
+            lines.append(f'{self.name}_bucket{{{prefix}le="+Inf"}} {cumulative:g}')
+            label_block = f"{{{label_text}}}" if label_text else ""
+            lines.append(f"{self.name}_sum{label_block} {series[-1]:g}")
+            lines.append(f"{self.name}_count{label_block} {cumulative:g}")
+        return lines
+
+
+class MetricsRegistry:
+    """Holds histograms plus 'collectors' (callables returning a flat dict of gauges)."""
+
+    def __init__(self):
+        self._histograms: Dict[str, Histogram] = {}
+        self._collectors: Dict[str, Callable[[], Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, name: str, help_text: str, buckets: Tuple[float, ...] = LATENCY_BUCKETS) -> Histogram:
+        with self._lock:
+            if name not in self._histograms:
+                self._histograms[name] = Histogram(name, help_text, buckets)
+            return self._histograms[name]
+
+    def register_collector(self, prefix: str, collect: Callable[[], Dict[str, Any]]) -> None:
+        """Exposes numeric values from `collect()` as gauges named `<prefix>_<key>`."""
+        self._collectors[prefix] = collect
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for histogram in list(self._histograms.values()):
+            lines.extend(histogram.render())
+        for prefix, collect in list(self._collectors.items()):
+            try:
+                values = collect()
+            except Exception as e:
+                logger.warning(f"Metrics collector {prefix} failed: {str(e)}")
+                continue
+            for key, value in values.items():
+                if isinstance(value, bool):
+                    value = int(value)
+                if isinstance(value, (int, float)):
+                    lines.append(f"# TYPE {prefix}_{key} gauge")
+                    lines.append(f"{prefix}_{key} {value:g}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+
+SPAN_DURATION = metrics.histogram("agent_span_duration_seconds", "Duration of instrumented agent operations")
+SPAN_VALUES = {
+    attribute: metrics.histogram(f"agent_span_{attribute}", f"'{attribute}' attribute of instrumented operations", SIZE_BUCKETS)
+    for attribute in VALUE_ATTRIBUTES
+}
+
+_tracer = None
+if OTEL_ENABLED:
+    try:
+        from opentelemetry import trace
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+
+        _provider = TracerProvider()
+        _provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+        trace.set_tracer_provider(_provider)
+        _tracer = trace.get_tracer("dhurba_furniture_agent")
+    except ImportError:
+        logger.warning("OTEL_EXPORTER_OTLP_ENDPOINT is set but opentelemetry-sdk/exporter is not installed")
+
+
+class Span:
+    """A timed operation; attributes can be added while it runs (rows, bytes, status, cache_hit...)."""
+
+    def __init__(self, name: str, attributes: Dict[str, Any]):
+        self.name = name
+        self.attributes = dict(attributes)
+        self.status = "ok"
+        self.duration = 0.0
+        self._otel_span = None
+
+    def set(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+        if self._otel_span is not None and isinstance(value, (str, bool, int, float)):
+            self._otel_span.set_attribute(key, value)
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Span]:
+    """
+    Times the enclosed block and records it under `agent_span_duration_seconds{span=name}`.
+
+    Usage:
+        with span("query_db.fetch") as s:
+            rows = result.fetchall()
+            s.set("rows", len(rows))
+    """
+    current = Span(name, attributes)
+    otel_context = _tracer.start_as_current_span(name) if _tracer is not None else None
+    if otel_context is not None:
+        current._otel_span = otel_context.__enter__()
+        for key, value in attributes.items():
+            current.set(key, value)
+    started = time.perf_counter()
+    exc_info: Tuple[Any, Any, Any] = (None, None, None)
+    try:
+        yield current
+    except BaseException:
+        current.status = "error"
+        exc_info = sys.exc_info()
+        raise
+    finally:
+        current.duration = time.perf_counter() - started
+        SPAN_DURATION.observe(current.duration, span=name, status=current.status)
+        for attribute, histogram in SPAN_VALUES.items():
+            value = current.attributes.get(attribute)
+            if isinstance(value, (int, float)):
+                histogram.observe(value, span=name)
+        if otel_context is not None:
+            # Passing the exception lets OpenTelemetry record it and set the span status to ERROR
+            otel_context.__exit__(*exc_info)
+        logger.debug(f"span {name} {current.duration * 1000:.1f}ms {current.status} {current.attributes}")
+
+
+def observe(metric: str, value: float, help_text: str = "", buckets: Tuple[float, ...] = LATENCY_BUCKETS, **labels: str) -> None:
+    """Records a single value into a named histogram (e.g. time to first token)."""
+    metrics.histogram(metric, help_text or metric, buckets).observe(value, **labels)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    routes: Dict[str, Callable[[], Tuple[str, str]]] = {}
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def do_GET(self) -> None:
+        route = self.routes.get(self.path.split("?", 1)[0])
+        if route is None:
+            self.send_response(404)
+            self.end_headers()
+            return
+        content_type, body = route()
+        payload = body.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+_MetricsHandler.routes["/metrics"] = lambda: ("text/plain; version=0.0.4", metrics.render())
+
+_server: Optional[ThreadingHTTPServer] = None
+
+
+def add_debug_route(path: str, render: Callable[[], Tuple[str, str]]) -> None:
+    """Serves `render()` -> (content_type, body) at `path` on the metrics server."""
+    _MetricsHandler.routes[path] = render
+
+
+def start_metrics_server(port: Optional[str] = METRICS_PORT) -> None:
+    """Starts the /metrics HTTP server in a daemon thread (no-op if no port is configured)."""
+    global _server
+    if not port or _server is not None:
+        return
+    try:
+        _server = ThreadingHTTPServer(("0.0.0.0", int(port)), _MetricsHandler)
+    except OSError as e:
+        # Another worker in this container already serves the port
+        logger.warning(f"Metrics server not started on port {port}: {str(e)}")
+        return
+    threading.Thread(target=_server.serve_forever, name="metrics-server", daemon=True).start()
+    logger.info(f"Metrics available at http://0.0.0.0:{port}/metrics")
@@ -0,0 +1,172 @@
+import os
+import json
+import time
+import logging
+import threading
+from collections import defaultdict, deque
+from typing import Any, Dict, List, Optional
+from langchain_core.messages import BaseMessage, ToolMessage
+from agent.utils.history import estimate_tokens, message_tokens
+
+logger = logging.getLogger(__name__)
+
+# Per-request token accounting for llm_call, tool_node and the history summarizer.
+# Each Gemini request is recorded with the provider-reported usage plus estimated tokens
+# for each part of the prompt (system prompt, summary, tool schemas, history, and every
+# ToolMessage by tool name), so optimizations can target the largest sources. Requests other
+# than the agent's own (kind "summarizer") count in the provider totals and under their own
+# "<kind>_prompt" / "<kind>_output" components. Response cache hits send nothing to the
+# provider: they are only counted (by_kind["cache_hit"]), not added to any token totals.
+TOKEN_ACCOUNTING_LOG = os.getenv("TOKEN_ACCOUNTING_LOG")  # optional JSONL file, one line per request
+TOKEN_ACCOUNTING_RECENT = int(os.getenv("TOKEN_ACCOUNTING_RECENT", "200"))
+
+
+class TokenLedger:
+    """Aggregates token usage per request, per prompt component and per tool name."""
+
+    def __init__(self, recent: int = TOKEN_ACCOUNTING_RECENT, log_path: Optional[str] = TOKEN_ACCOUNTING_LOG):
+        self.log_path = log_path
+        self._recent: deque = deque(maxlen=recent)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.provider = defaultdict(int)      # input/output/total tokens reported by the provider
+        self.components = defaultdict(int)    # estimated prompt tokens by component
+        self.by_tool = defaultdict(lambda: {"calls": 0, "output_tokens": 0, "prompt_tokens": 0})
+        self.by_kind = defaultdict(int)       # requests by kind ("agent", "summarizer"), plus "cache_hit"
+
+    def record_tool_output(self, tool_name: str, content: str) -> int:
+        """Records a freshly produced ToolMessage; returns its estimated tokens."""
+        tokens = estimate_tokens(content)
+        with self._lock:
+            entry = self.by_tool[tool_name]
+            entry["calls"] += 1
+            entry["output_tokens"] += tokens
+        return tokens
+
+    def _add_totals(self, kind: str, entry: Dict[str, Any], tool_tokens: Dict[str, int]) -> None:
+        """Adds a request that reached the provider to the totals (caller holds the lock)."""
+        self.requests += 1
+        self.by_kind[kind] += 1
+        for key, value in entry["provider"].items():
+            self.provider[key] += value
+        estimated = entry["estimated"]
+        if kind == "agent":
+            for key in ("system_prompt", "summary", "tool_schemas", "history", "output"):
+                self.components[key] += estimated[key]
+            for name, tokens in tool_tokens.items():
+                self.components["tool_messages"] += tokens
+                self.by_tool[name]["prompt_tokens"] += tokens
+        else:
+            self.components[f"{kind}_prompt"] += (
+                estimated["system_prompt"] + estimated["summary"] + estimated["history"] + sum(tool_tokens.values())
+            )
+            self.components[f"{kind}_output"] += estimated["output"]
+
+    def record_llm_call(
+        self,
+        system_prompt: str,
+        summary: str,
+        tool_schema_tokens: int,
+        window: List[BaseMessage],
+        response: BaseMessage,
+        thread_id: Optional[str] = None,
+        intents: Optional[List[str]] = None,
+        cache_hit: bool = False,
+        kind: str = "agent",
+    ) -> Dict[str, Any]:
+        """
+        Records one LLM request.
+
+        Args:
+            system_prompt: The system prompt sent (without the summary)
+            summary: The rolling history summary appended to it
+            tool_schema_tokens: Estimated tokens of the bound tool schemas
+            window: The history messages sent
+            response: The AIMessage returned (usage_metadata is read from it)
+            thread_id: LangGraph thread id, if any
+            intents: Intents used to pick the tool set
+            cache_hit: Whether the response came from the response cache (counted, not added to the totals)
+            kind: "agent" for llm_call, "summarizer" for the history summarizer
+
+        Returns:
+            Dict: The recorded entry
+        """
+        tool_tokens: Dict[str, int] = defaultdict(int)
+        history_tokens = 0
+        for message in window:
+            if isinstance(message, ToolMessage):
+                tool_tokens[message.name or "unknown"] += message_tokens(message)
+            else:
+                history_tokens += message_tokens(message)
+
+        # A cached response carries the usage of the call that produced it, not of this request
+        usage = {} if cache_hit else getattr(response, "usage_metadata", None) or {}
+        entry = {
+            "timestamp": time.time(),
+            "kind": kind,
+            "thread_id": thread_id,
+            "intents": intents or [],
+            "cache_hit": cache_hit,
+            "provider": {
+                "input_tokens": usage.get("input_tokens", 0),
+                "output_tokens": usage.get("output_tokens", 0),
+                "total_tokens": usage.get("total_tokens", 0),
+            },
+            "estimated": {
+                "system_prompt": estimate_tokens(system_prompt),
+                "summary": estimate_tokens(summary),
+                "tool_schemas": tool_schema_tokens,
+                "history": history_tokens,
+                "tool_messages": dict(tool_tokens),
+                "output": message_tokens(response),
+            },
+        }
+
+        with self._lock:
+            self._recent.append(entry)
+            if cache_hit:
+                self.by_kind["cache_hit"] += 1
+            else:
+                self._add_totals(kind, entry, tool_tokens)
+
+        if self.log_path:
+            try:
+                with open(self.log_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(entry) + "\n")
+            except OSError as e:
+                logger.warning(f"Could not write token accounting log: {str(e)}")
+        return entry
+
+    def report(self) -> Dict[str, Any]:
+        """Aggregated view, largest token sources first."""
+        with self._lock:
+            components = dict(sorted(self.components.items(), key=lambda item: item[1], reverse=True))
+            by_tool = dict(sorted(
+                ((name, dict(values)) for name, values in self.by_tool.items()),
+                key=lambda item: item[1]["prompt_tokens"] + item[1]["output_tokens"],
+                reverse=True,
+            ))
+            return {
+                "requests": self.requests,
+                "requests_by_kind": dict(self.by_kind),
+                "provider": dict(self.provider),
+                "estimated_components": components,
+                "by_tool": by_tool,
+                "recent": list(self._recent),
+            }
+
+    def stats(self) -> Dict[str, Any]:
+        """Flat numeric view for the metrics endpoint."""
+        with self._lock:
+            values: Dict[str, Any] = {"requests": self.requests}
+            values.update({f"{kind}_requests": count for kind, count in self.by_kind.items()})
+            values.update({f"provider_{key}": value for key, value in self.provider.items()})
+            values.update({f"estimated_{key}": value for key, value in self.components.items()})
+            for name, entry in self.by_tool.items():
+                values[f"tool_{name}_output_tokens"] = entry["output_tokens"]
+                values[f"tool_{name}_prompt_tokens"] = entry["prompt_tokens"]
+            return values
+
+
+# Process-wide ledger used by llm_call, tool_node and summarize_history
+token_ledger = TokenLedger()
@@ -1,14 +1,12 @@
-import requests
 import logging
 from typing import Dict, Any
 import os
-from dotenv import load_dotenv
 from langchain_core.tools import tool
+from agent.utils.prefetch import prefetch_registry
+from agent.utils.backend import backend_request
 
-load_dotenv()
 
 # Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Base URL for the backend API
@@ -30,6 +28,13 @@ def validate_user_authentication(user_id: str) -> Dict[str, Any]:
     Returns:
         Dict containing authentication status and user information
     """
+    prefetched = prefetch_registry.claim("auth", user_id)
+    if prefetched is not None:
+        return prefetched
+    return _validate_user_authentication(user_id)
+
+def _validate_user_authentication(user_id: str) -> Dict[str, Any]:
+    """Calls the backend auth validation endpoint (also used by the prefetch node)."""
     try:
         if not user_id or user_id == "null" or user_id == "undefined":
             logger.info("No user ID provided for authentication validation")
@@ -43,7 +48,7 @@ def validate_user_authentication(user_id: str) -> Dict[str, Any]:
         logger.info(f"Validating authentication for user: {user_id}")
         # Call backend auth validation endpoint
         url = f"{BACKEND_BASE_URL}/api/auth/validate-user/{user_id}"
-        response = requests.get(url, timeout=30)
+        response = backend_request("GET", url, endpoint="auth.validate", timeout=30)
         
         if response.status_code == 200:
             auth_data = response.json()
@@ -101,6 +106,13 @@ def get_user_profile_data(user_id: str) -> Dict[str, Any]:
     Returns:
         Dict containing profile data and success status
     """
+    prefetched = prefetch_registry.claim("profile", user_id)
+    if prefetched is not None:
+        return prefetched
+    return _get_user_profile_data(user_id)
+
+def _get_user_profile_data(user_id: str) -> Dict[str, Any]:
+    """Calls the backend profile endpoint (also used by the prefetch node)."""
     try:
         if not user_id or user_id == "null" or user_id == "undefined":
             logger.info("No user ID provided for profile data fetch")
@@ -115,7 +127,7 @@ def get_user_profile_data(user_id: str) -> Dict[str, Any]:
         # Call backend profile endpoint
         # Increased timeout to handle circular request pattern (backend -> MCP -> backend)
         url = f"{BACKEND_BASE_URL}/api/profile/user/{user_id}"
-        response = requests.get(url, timeout=60)  # Increased from 10 to 60 seconds
+        response = backend_request("GET", url, endpoint="profile.get", timeout=60)  # Increased from 10 to 60 seconds
         
         if response.status_code == 200:
             profile_data = response.json()
@@ -206,6 +218,8 @@ def update_user_profile(user_id: str, first_name: str = None, last_name: str = N
     Returns:
         Dict containing update status and result
     """
+    # The data is about to change, so never serve an older prefetch of it
+    prefetch_registry.invalidate("profile", user_id)
     try:
         if not user_id or user_id == "null" or user_id == "undefined":
             logger.info("No user ID provided for profile update")
@@ -240,7 +254,7 @@ def update_user_profile(user_id: str, first_name: str = None, last_name: str = N
             "Content-Type": "application/json"
         }
         
-        response = requests.patch(url, json=updates_to_make, headers=headers, timeout=60)
+        response = backend_request("PATCH", url, endpoint="profile.update", json=updates_to_make, headers=headers, timeout=60)
         
         if response.status_code == 200:
             updated_data = response.json()
@@ -0,0 +1,135 @@
+"""
+Regression report comparing two cassette runs (agent/utils/cassette.py).
+
+Record a baseline and a candidate run of the same conversations, e.g. before and after a
+prompt or tool change:
+
+    AGENT_CASSETTE_MODE=record AGENT_CASSETTE=cassettes/base.jsonl python -m benchmarks.load_test --live ...
+    AGENT_CASSETTE_MODE=record AGENT_CASSETTE=cassettes/new.jsonl  python -m benchmarks.load_test --live ...
+
+then compare them per conversation: LLM round trips, tool calls (total and per tool),
+input/output tokens (provider usage when recorded, estimates otherwise) and time spent in
+the LLM and tools. Conversations are matched across runs by their first user message.
+
+Usage:
+    python -m benchmarks.cassette_report cassettes/base.jsonl cassettes/new.jsonl [--threshold 5] [--fail-on-regression]
+"""
+import argparse
+import json
+import statistics
+import sys
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Any, Dict, List
+
+METRICS = ("llm_round_trips", "tool_calls", "input_tokens", "output_tokens", "llm_seconds", "tool_seconds")
+
+
+def load(path: Path) -> List[Dict[str, Any]]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def conversations(entries: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+    """Per-conversation metrics, grouped by conversation label (several threads may share one)."""
+    threads: Dict[str, Dict[str, Any]] = defaultdict(lambda: {"label": None, **{m: 0 for m in METRICS}, "by_tool": Counter()})
+    for entry in entries:
+        thread = threads[entry.get("thread_id") or "unknown"]
+        if entry["kind"] == "llm":
+            if thread["label"] is None:
+                thread["label"] = entry.get("conversation")
+            usage = entry.get("usage") or {}
+            thread["llm_round_trips"] += 1
+            thread["input_tokens"] += usage.get("input_tokens") or entry.get("estimated_input_tokens", 0)
+            thread["output_tokens"] += usage.get("output_tokens") or entry.get("estimated_output_tokens", 0)
+            thread["llm_seconds"] += entry["duration"]
+        else:
+            thread["tool_calls"] += 1
+            thread["by_tool"][entry["name"]] += 1
+            thread["tool_seconds"] += entry["duration"]
+
+    grouped: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    for thread_id, thread in threads.items():
+        grouped[thread["label"] or thread_id].append(thread)
+    return grouped
+
+
+def run_summary(entries: List[Dict[str, Any]]) -> Dict[str, Any]:
+    grouped = conversations(entries)
+    threads = [thread for group in grouped.values() for thread in group]
+    ends = [entry["started"] + entry["duration"] for entry in entries]
+    by_tool: Counter = Counter()
+    for thread in threads:
+        by_tool.update(thread["by_tool"])
+    return {
+        "conversations": len(threads),
+        "mean": {m: statistics.fmean(t[m] for t in threads) if threads else 0.0 for m in METRICS},
+        "by_tool": {name: count / len(threads) for name, count in by_tool.items()} if threads else {},
+        "by_label": {
+            label: {m: statistics.fmean(t[m] for t in group) for m in METRICS}
+            for label, group in grouped.items()
+        },
+        "wall_seconds": max(ends) - min(entry["started"] for entry in entries) if entries else 0.0,
+        "estimated_tokens": not any(entry.get("usage") for entry in entries if entry["kind"] == "llm"),
+    }
+
+
+def change(before: float, after: float) -> float:
+    if not before:
+        return 0.0 if not after else float("inf")
+    return (after - before) / before * 100
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline", type=Path)
+    parser.add_argument("candidate", type=Path)
+    parser.add_argument("--threshold", type=float, default=5.0, help="percent increase reported as a regression")
+    parser.add_argument("--fail-on-regression", action="store_true", help="exit with status 1 if anything regressed")
+    args = parser.parse_args()
+
+    base, new = run_summary(load(args.baseline)), run_summary(load(args.candidate))
+    if base["estimated_tokens"] or new["estimated_tokens"]:
+        print("note: at least one run has no provider usage; token counts are estimates (chars/4)")
+    print(f"conversations: {base['conversations']} -> {new['conversations']}")
+    print(f"wall time: {base['wall_seconds']:.1f}s -> {new['wall_seconds']:.1f}s")
+
+    regressions = []
+    print(f"\n{'per conversation':<22} {'baseline':>10} {'candidate':>10} {'change':>9}")
+    for metric in METRICS:
+        before, after = base["mean"][metric], new["mean"][metric]
+        delta = change(before, after)
+        flag = ""
+        if delta > args.threshold:
+            flag = "  REGRESSION"
+            regressions.append(metric)
+        print(f"{metric:<22} {before:>10.2f} {after:>10.2f} {delta:>8.1f}%{flag}")
+
+    print(f"\n{'tool calls / conv':<32} {'baseline':>9} {'candidate':>10}")
+    for name in sorted(set(base["by_tool"]) | set(new["by_tool"])):
+        print(f"{name:<32} {base['by_tool'].get(name, 0):>9.2f} {new['by_tool'].get(name, 0):>10.2f}")
+
+    changed = []
+    for label in sorted(set(base["by_label"]) & set(new["by_label"])):
+        before, after = base["by_label"][label], new["by_label"][label]
+        if (before["llm_round_trips"], before["tool_calls"]) != (after["llm_round_trips"], after["tool_calls"]):
+            changed.append((label, before, after))
+    if changed:
+        print(f"\n{'conversation':<50} {'round trips':>14} {'tool calls':>12}")
+        for label, before, after in changed:
+            print(
+                f"{label[:50]:<50} {before['llm_round_trips']:>6.1f} -> {after['llm_round_trips']:<5.1f} "
+                f"{before['tool_calls']:>5.1f} -> {after['tool_calls']:<5.1f}"
+            )
+    unmatched = set(base["by_label"]) ^ set(new["by_label"])
+    if unmatched:
+        print(f"\n{len(unmatched)} conversations appear in only one run")
+
+    if regressions:
+        print(f"\nregressed (> {args.threshold:g}%): {', '.join(regressions)}")
+        if args.fail_on_regression:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
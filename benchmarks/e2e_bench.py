@@ -0,0 +1,235 @@
+"""
+Offline end-to-end benchmark of the agent graph.
+
+Compiles the real `agent_builder` graph with a scripted chat model (benchmarks/harness.py),
+a local stub of BACKEND_BASE_URL, a SQLite catalog for query_db and an in-memory vector
+store for rag_tool, then replays the standard scenario set (benchmarks/data/scenarios.json)
+and reports:
+- p50/p95/p99 turn latency, overall and per scenario
+- throughput (turns/s) at the given concurrency
+- memory (peak RSS, and the peak traced Python allocations with --trace-memory)
+- time spent per span (llm_call, tool.*, backend.*, query_db.*, rag.*)
+- the query_db fingerprints with the most execution time (agent/utils/query_stats.py)
+
+With the default zero LLM latency the numbers are the graph's own overhead; use
+--llm-first-token-ms / --llm-token-ms to simulate Gemini streaming.
+
+Usage:
+    python -m benchmarks.e2e_bench [--iterations 20] [--concurrency 4] [--backend-latency-ms 20]
+                                   [--database-url postgresql://...] [--output run.json]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import resource
+import time
+import tracemalloc
+import uuid
+from collections import defaultdict
+from pathlib import Path
+
+from langchain_core.messages import HumanMessage, ToolMessage
+
+from benchmarks.harness import (
+    DEFAULT_SCENARIOS,
+    ScriptedChatModel,
+    fixtures_from_scenarios,
+    load_offline_agent,
+    load_scenarios,
+    percentile,
+    setup_offline_environment,
+)
+
+
+async def run_conversation(graph, scenario: dict, run_label: str, semaphore: asyncio.Semaphore, results: list) -> None:
+    """
+    Plays one scenario on a fresh thread and appends one result per turn.
+    User and thread ids are derived from the scenario and run label, so repeated runs send
+    identical inputs (required to replay cassettes, see agent/utils/cassette.py).
+    """
+    user_id = str(uuid.uuid5(uuid.NAMESPACE_URL, f"{scenario['name']}/{run_label}/user"))
+    config = {"configurable": {"thread_id": str(uuid.uuid5(uuid.NAMESPACE_URL, f"{scenario['name']}/{run_label}/thread"))}}
+    async with semaphore:
+        seen = 0
+        for index, turn in enumerate(scenario["turns"]):
+            text = turn["user"].replace("{user_id}", user_id)
+            started = time.perf_counter()
+            error = None
+            tool_errors = 0
+            try:
+                state = await graph.ainvoke({"messages": [HumanMessage(content=text)]}, config)
+                new_messages = state["messages"][seen:]
+                seen = len(state["messages"])
+                tool_errors = sum(
+                    isinstance(m, ToolMessage) and str(m.content).lower().startswith(("error", "i encountered"))
+                    for m in new_messages
+                )
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+            results.append({
+                "scenario": scenario["name"],
+                "turn": index,
+                "latency": time.perf_counter() - started,
+                "error": error,
+                "tool_errors": tool_errors,
+            })
+            if error:
+                return
+
+
+def latency_summary(latencies: list) -> dict:
+    return {
+        "turns": len(latencies),
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "max_ms": max(latencies, default=0.0) * 1000,
+    }
+
+
+def span_summary() -> dict:
+    """Count and total time per span name from the telemetry histograms."""
+    from agent.utils.telemetry import SPAN_DURATION
+
+    spans = defaultdict(lambda: {"count": 0, "total_ms": 0.0})
+    for labels, series in SPAN_DURATION.snapshot().items():
+        name = dict(labels)["span"]
+        spans[name]["count"] += int(sum(series[:-1]))
+        spans[name]["total_ms"] += series[-1] * 1000
+    return dict(sorted(spans.items(), key=lambda item: item[1]["total_ms"], reverse=True))
+
+
+def print_report(report: dict) -> None:
+    config = report["config"]
+    print(
+        f"\n{config['conversations']} conversations, concurrency {config['concurrency']}, "
+        f"backend latency {config['backend_latency_ms']}ms, LLM first token {config['llm_first_token_ms']}ms"
+    )
+    print(f"\n{'scenario':<22} {'turns':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    rows = list(report["scenarios"].items()) + [("ALL", report["overall"])]
+    for name, stats in rows:
+        print(
+            f"{name:<22} {stats['turns']:>6} {stats['p50_ms']:>8.1f} {stats['p95_ms']:>8.1f} "
+            f"{stats['p99_ms']:>8.1f} {stats['max_ms']:>8.1f}"
+        )
+
+    throughput = report["throughput"]
+    print(f"\nwall time {throughput['wall_seconds']:.2f}s, {throughput['turns_per_second']:.1f} turns/s")
+    print(
+        f"errors {report['errors']}, tool errors {report['tool_errors']}, "
+        f"LLM calls {report['llm']['calls']} (unscripted {report['llm']['unscripted']}), "
+        f"backend requests {report['backend_requests']}"
+    )
+    memory = report["memory"]
+    traced = f", traced peak {memory['traced_peak_mb']:.1f} MB" if memory.get("traced_peak_mb") is not None else ""
+    print(f"peak RSS {memory['peak_rss_mb']:.1f} MB{traced}")
+
+    print(f"\n{'span':<32} {'count':>7} {'total ms':>10} {'mean ms':>9}")
+    for name, stats in report["spans"].items():
+        mean = stats["total_ms"] / stats["count"] if stats["count"] else 0.0
+        print(f"{name:<32} {stats['count']:>7} {stats['total_ms']:>10.1f} {mean:>9.2f}")
+    if report["queries"]:
+        print(f"\n{'query fingerprint':<60} {'calls':>6} {'p50 ms':>7} {'p95 ms':>7} {'rows':>6}")
+        for query in report["queries"]:
+            print(f"{query['fingerprint'][:60]:<60} {query['calls']:>6} {query['p50_ms']:>7.1f} {query['p95_ms']:>7.1f} {query['mean_rows']:>6.1f}")
+    for error in report["sample_errors"]:
+        print(f"error: {error}")
+
+
+async def run(args) -> dict:
+    scenarios = load_scenarios(args.scenarios)
+    if args.only:
+        wanted = set(args.only.split(","))
+        scenarios = [s for s in scenarios if s["name"] in wanted]
+
+    environment = setup_offline_environment(args.backend_latency_ms, args.database_url)
+    model = ScriptedChatModel(
+        fixtures=fixtures_from_scenarios(scenarios),
+        first_token_ms=args.llm_first_token_ms,
+        token_delay_ms=args.llm_token_ms,
+    )
+    graph = load_offline_agent(model)
+    logging.getLogger().setLevel(args.log_level)
+
+    # Warm-up pass: imports, pool connections and lazily bound models are not measured
+    warmup: list = []
+    await asyncio.gather(*(run_conversation(graph, s, "warmup", asyncio.Semaphore(1), warmup) for s in scenarios))
+    model.calls = model.unscripted = 0
+    environment["backend"].handler.requests_served = 0
+    from agent.utils.telemetry import SPAN_DURATION
+    from agent.utils.query_stats import query_stats
+    SPAN_DURATION.reset()
+    query_stats.reset()
+
+    if args.trace_memory:
+        tracemalloc.start()
+    semaphore = asyncio.Semaphore(args.concurrency)
+    results: list = []
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        run_conversation(graph, scenario, str(iteration), semaphore, results)
+        for iteration in range(args.iterations)
+        for scenario in scenarios
+    ))
+    wall = time.perf_counter() - started
+    traced_peak = tracemalloc.get_traced_memory()[1] if args.trace_memory else None
+    if args.trace_memory:
+        tracemalloc.stop()
+
+    by_scenario = defaultdict(list)
+    for result in results:
+        by_scenario[result["scenario"]].append(result["latency"])
+    errors = [result["error"] for result in results if result["error"]]
+    return {
+        "config": {
+            "conversations": args.iterations * len(scenarios),
+            "iterations": args.iterations,
+            "concurrency": args.concurrency,
+            "backend_latency_ms": args.backend_latency_ms,
+            "llm_first_token_ms": args.llm_first_token_ms,
+            "llm_token_ms": args.llm_token_ms,
+            "database": environment["database_url"].split(":", 1)[0],
+        },
+        "overall": latency_summary([result["latency"] for result in results]),
+        "scenarios": {name: latency_summary(values) for name, values in by_scenario.items()},
+        "throughput": {"wall_seconds": wall, "turns_per_second": len(results) / wall if wall else 0.0},
+        "errors": len(errors),
+        "sample_errors": sorted(set(errors))[:5],
+        "tool_errors": sum(result["tool_errors"] for result in results),
+        "llm": {"calls": model.calls, "unscripted": model.unscripted},
+        "backend_requests": environment["backend"].requests_served,
+        # ru_maxrss is in KiB on Linux
+        "memory": {
+            "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+            "traced_peak_mb": traced_peak / 2**20 if traced_peak is not None else None,
+        },
+        "spans": span_summary(),
+        "queries": query_stats.report()[:10],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", type=Path, default=DEFAULT_SCENARIOS)
+    parser.add_argument("--only", help="comma-separated scenario names to run")
+    parser.add_argument("--iterations", type=int, default=20, help="times each scenario is played")
+    parser.add_argument("--concurrency", type=int, default=4, help="conversations in flight at once")
+    parser.add_argument("--backend-latency-ms", type=float, default=20.0)
+    parser.add_argument("--llm-first-token-ms", type=float, default=0.0)
+    parser.add_argument("--llm-token-ms", type=float, default=0.0)
+    parser.add_argument("--database-url", help="catalog database (default: a temporary SQLite copy of benchmarks/data/catalog.json)")
+    parser.add_argument("--trace-memory", action="store_true", help="also report peak traced Python allocations (slower)")
+    parser.add_argument("--log-level", default="WARNING")
+    parser.add_argument("--output", type=Path, help="write the report as JSON")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    print_report(report)
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2))
+        print(f"\nreport written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
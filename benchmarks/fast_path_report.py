@@ -0,0 +1,89 @@
+"""
+Precision/latency report for the deterministic fast path (agent/utils/fast_path.py).
+
+Runs match_fast_path over a labeled utterance set and reports:
+- precision: of the turns the fast path answered, how many it answered correctly
+- coverage:  of the turns labeled as fast-pathable, how many it answered
+- per-utterance match latency (the LLM round trip it replaces is typically 0.5-2s)
+
+Labels are "greeting", "route:<route_keyword>" or "llm" (must go to the LLM).
+
+Usage:
+    python -m benchmarks.fast_path_report [--data benchmarks/data/fast_path_utterances.jsonl] [--repeat 2000]
+"""
+import argparse
+import json
+import statistics
+import time
+from pathlib import Path
+
+from agent.utils.fast_path import match_fast_path
+
+DEFAULT_DATA = Path(__file__).parent / "data" / "fast_path_utterances.jsonl"
+
+
+def predict(text: str) -> str:
+    match = match_fast_path(text)
+    if match is None:
+        return "llm"
+    if match["kind"] == "greeting":
+        return "greeting"
+    return f"route:{match['route_keyword']}"
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data", default=str(DEFAULT_DATA))
+    parser.add_argument("--repeat", type=int, default=2000, help="timing iterations per utterance")
+    args = parser.parse_args()
+
+    samples = [json.loads(line) for line in Path(args.data).read_text().splitlines() if line.strip()]
+
+    answered = correct = fast_pathable = covered = 0
+    mistakes = []
+    latencies_us = []
+    for sample in samples:
+        label, text = sample["label"], sample["text"]
+        predicted = predict(text)
+
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            match_fast_path(text)
+        latencies_us.append((time.perf_counter() - start) / args.repeat * 1e6)
+
+        if label != "llm":
+            fast_pathable += 1
+        if predicted != "llm":
+            answered += 1
+            if predicted == label:
+                correct += 1
+                covered += 1
+            else:
+                mistakes.append((text, label, predicted))
+        elif label != "llm":
+            mistakes.append((text, label, predicted))
+
+    precision = correct / answered if answered else 0.0
+    coverage = covered / fast_pathable if fast_pathable else 0.0
+    print(f"utterances:        {len(samples)}")
+    print(f"fast-path answers: {answered} ({answered / len(samples):.0%} of turns skip the LLM)")
+    print(f"precision:         {precision:.3f}  ({correct}/{answered})")
+    print(f"coverage:          {coverage:.3f}  ({covered}/{fast_pathable} fast-pathable turns)")
+    print(
+        f"match latency:     mean {statistics.mean(latencies_us):.1f}us  "
+        f"p50 {percentile(latencies_us, 50):.1f}us  p99 {percentile(latencies_us, 99):.1f}us"
+    )
+    if mistakes:
+        print("\nmisses (text | label | predicted):")
+        for text, label, predicted in mistakes:
+            print(f"  {text!r} | {label} | {predicted}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,384 @@
+"""
+Offline stand-ins for the agent's external services, used by the end-to-end benchmarks.
+
+- ScriptedChatModel: a chat model that replays fixture responses (text and tool calls)
+  keyed on the last user message, streamed word by word like Gemini.
+- StubBackend: a local HTTP server implementing the auth/profile/cart endpoints behind
+  BACKEND_BASE_URL, with in-memory carts and a configurable latency.
+- build_catalog: a SQLite copy of the products/featured_products tables for query_db.
+- install_knowledge_base: an in-memory vector store for rag_tool.
+
+`setup_offline_environment()` must run before `agent.agent` is imported, because the tool
+modules read BACKEND_BASE_URL at import time; `load_offline_agent()` then compiles the
+real `agent_builder` graph against these stand-ins.
+"""
+import asyncio
+import json
+import os
+import re
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+# Safe to import before setup_offline_environment(): it does not load the tool modules
+from agent.utils.cassette import message_chunks
+
+DATA_DIR = Path(__file__).parent / "data"
+DEFAULT_SCENARIOS = DATA_DIR / "scenarios.json"
+DEFAULT_CATALOG = DATA_DIR / "catalog.json"
+DEFAULT_KNOWLEDGE_BASE = DATA_DIR / "knowledge_base.jsonl"
+
+# Same normalization as agent.utils.intent.strip_user_context; duplicated so this module
+# can be imported before the agent package (see setup_offline_environment)
+_USER_ID_PATTERN = re.compile(r"\[\s*User ID:\s*([^\]]*)\]", re.IGNORECASE)
+
+
+def normalize_user_text(text: str) -> str:
+    return " ".join(_USER_ID_PATTERN.sub(" ", text or "").lower().split())
+
+
+def _user_id(text: str) -> Optional[str]:
+    match = _USER_ID_PATTERN.search(text or "")
+    return match.group(1).strip() if match else None
+
+
+def _fill(value: Any, user_id: Optional[str]) -> Any:
+    """Replaces the '{user_id}' placeholder anywhere inside fixture arguments."""
+    if isinstance(value, str):
+        return value.replace("{user_id}", user_id or "")
+    if isinstance(value, dict):
+        return {key: _fill(item, user_id) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_fill(item, user_id) for item in value]
+    return value
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def load_scenarios(path: Path = DEFAULT_SCENARIOS) -> List[Dict[str, Any]]:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)["scenarios"]
+
+
+def load_conversations(path: Path = DEFAULT_SCENARIOS) -> List[Dict[str, Any]]:
+    """
+    Loads a conversation corpus: either a scenarios.json file or a JSONL file with one
+    conversation per line in the same shape ({"name", "turns": [{"user", "responses"?}]}).
+    """
+    path = Path(path)
+    if path.suffix != ".jsonl":
+        return load_scenarios(path)
+    conversations = []
+    with open(path, encoding="utf-8") as f:
+        for number, line in enumerate(f, 1):
+            if line.strip():
+                conversation = json.loads(line)
+                conversation.setdefault("name", f"{path.stem}:{number}")
+                conversations.append(conversation)
+    return conversations
+
+
+def fixtures_from_scenarios(scenarios: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+    """Maps each normalized user message to its scripted responses."""
+    fixtures: Dict[str, List[Dict[str, Any]]] = {}
+    for scenario in scenarios:
+        for turn in scenario["turns"]:
+            key = normalize_user_text(turn["user"])
+            responses = turn.get("responses", [])
+            if key in fixtures and fixtures[key] != responses:
+                raise ValueError(f"Conflicting fixtures for user message {turn['user']!r} ({scenario['name']})")
+            fixtures[key] = responses
+    return fixtures
+
+
+class ScriptedChatModel(BaseChatModel):
+    """
+    Replays scripted responses instead of calling Gemini.
+
+    The response is picked from `fixtures[last user message][n]`, where n is the number of
+    AI messages already produced in the current turn, so concurrent conversations replay
+    independently. Unscripted requests (including history summarization) get `default_reply`
+    and are counted in `unscripted`.
+    """
+
+    fixtures: Dict[str, List[Dict[str, Any]]]
+    first_token_ms: float = 0.0   # simulated time to first token
+    token_delay_ms: float = 0.0   # simulated delay between streamed words
+    default_reply: str = "Okay."
+    calls: int = 0
+    unscripted: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def bind_tools(self, tools: Any, **kwargs: Any) -> "ScriptedChatModel":
+        return self
+
+    def _respond(self, messages: List[BaseMessage]) -> AIMessage:
+        self.calls += 1
+        turn_start = max((i for i, m in enumerate(messages) if isinstance(m, HumanMessage)), default=None)
+        if turn_start is None:
+            self.unscripted += 1
+            return AIMessage(content=self.default_reply)
+        text = str(messages[turn_start].content)
+        step = sum(isinstance(m, AIMessage) for m in messages[turn_start + 1:])
+        responses = self.fixtures.get(normalize_user_text(text), [])
+        if step >= len(responses):
+            self.unscripted += 1
+            return AIMessage(content=self.default_reply)
+        response = _fill(responses[step], _user_id(text))
+        tool_calls = [
+            {"name": call["name"], "args": call.get("args", {}), "id": f"call_{uuid.uuid4().hex}"}
+            for call in response.get("tool_calls", [])
+        ]
+        return AIMessage(content=response.get("content", ""), tool_calls=tool_calls)
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        time.sleep(self.first_token_ms / 1000)
+        return ChatResult(generations=[ChatGeneration(message=self._respond(messages))])
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        time.sleep(self.first_token_ms / 1000)
+        for index, chunk in enumerate(message_chunks(self._respond(messages))):
+            if index:
+                time.sleep(self.token_delay_ms / 1000)
+            yield ChatGenerationChunk(message=chunk)
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        await asyncio.sleep(self.first_token_ms / 1000)
+        for index, chunk in enumerate(message_chunks(self._respond(messages))):
+            if index:
+                await asyncio.sleep(self.token_delay_ms / 1000)
+            yield ChatGenerationChunk(message=chunk)
+
+
+class _BackendHandler(BaseHTTPRequestHandler):
+    """auth/profile/cart endpoints of the Dhurba backend, with in-memory carts per user."""
+
+    latency_seconds = 0.0
+    products: Dict[str, Dict[str, Any]] = {}
+    carts: Dict[str, List[Dict[str, Any]]] = {}
+    lock = threading.Lock()
+    requests_served = 0
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def _send(self, payload: Any, status: int = 200) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _body(self) -> Dict[str, Any]:
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}") if length else {}
+
+    def _cart(self, user_id: str) -> Dict[str, Any]:
+        items = self.carts.setdefault(user_id, self._default_cart())
+        return {"user_id": user_id, "items": items}
+
+    def _default_cart(self) -> List[Dict[str, Any]]:
+        product = next((p for p in self.products.values() if p["name"] == "Round Coffee Table"), None)
+        if product is None:
+            return []
+        return [{"id": uuid.uuid4().hex, "quantity": 1, "product": {"name": product["name"], "price": product["price"]}}]
+
+    def _handle(self, method: str) -> None:
+        time.sleep(self.latency_seconds)
+        parts = [part for part in self.path.split("?", 1)[0].split("/") if part]
+        type(self).requests_served += 1
+        with self.lock:
+            # /api/auth/validate-user/{user_id}
+            if method == "GET" and parts[:3] == ["api", "auth", "validate-user"] and len(parts) == 4:
+                return self._send({"valid": True, "user_id": parts[3]})
+            # /api/profile/user/{user_id}[/update]
+            if parts[:3] == ["api", "profile", "user"] and len(parts) >= 4:
+                profile = {"id": parts[3], "first_name": "Bench", "last_name": "User",
+                           "email": "bench.user@example.com", "phone": "9800000000", "address": "Kathmandu"}
+                if method == "PATCH":
+                    profile.update(self._body())
+                return self._send(profile)
+            # /api/cart/user/{user_id}[/items[/{cart_item_id}]]
+            if parts[:3] == ["api", "cart", "user"] and len(parts) >= 4:
+                user_id = parts[3]
+                items = self._cart(user_id)["items"]
+                if parts[4:] == ["items", "bulk"] and method in ("POST", "PATCH"):
+                    # Bulk endpoints for CART_BULK_ADD_ENDPOINT / CART_BULK_UPDATE_ENDPOINT
+                    for entry in self._body().get("items", []):
+                        if method == "POST" and entry.get("product_id") in self.products:
+                            product = self.products[entry["product_id"]]
+                            items.append({"id": uuid.uuid4().hex, "quantity": int(entry.get("quantity", 1)),
+                                          "product": {"name": product["name"], "price": product["price"]}})
+                        elif method == "PATCH":
+                            item = next((i for i in items if i["id"] == entry.get("cart_item_id")), None)
+                            if item is not None and entry.get("to_be_deleted"):
+                                items.remove(item)
+                            elif item is not None:
+                                item["quantity"] = int(entry.get("quantity", item["quantity"]))
+                elif method == "POST" and parts[4:] == ["items"]:
+                    data = self._body()
+                    product = self.products.get(data.get("product_id"))
+                    if product is None:
+                        return self._send({"detail": "Product not found"}, 404)
+                    items.append({"id": uuid.uuid4().hex, "quantity": int(data.get("quantity", 1)),
+                                  "product": {"name": product["name"], "price": product["price"]}})
+                elif method in ("PUT", "DELETE") and len(parts) == 6:
+                    item = next((i for i in items if i["id"] == parts[5]), None)
+                    if item is None:
+                        return self._send({"detail": "Cart item not found"}, 404)
+                    if method == "DELETE":
+                        items.remove(item)
+                    else:
+                        item["quantity"] = int(self._body().get("quantity", item["quantity"]))
+                elif method != "GET":
+                    return self._send({"detail": "Not found"}, 404)
+                return self._send(self._cart(user_id))
+        self._send({"detail": "Not found"}, 404)
+
+    def do_GET(self) -> None:
+        self._handle("GET")
+
+    def do_POST(self) -> None:
+        self._handle("POST")
+
+    def do_PUT(self) -> None:
+        self._handle("PUT")
+
+    def do_PATCH(self) -> None:
+        self._handle("PATCH")
+
+    def do_DELETE(self) -> None:
+        self._handle("DELETE")
+
+
+class StubBackend:
+    """Runs the stub backend on 127.0.0.1 in a daemon thread (port 0 picks a free port)."""
+
+    def __init__(self, latency_ms: float = 20.0, catalog_path: Path = DEFAULT_CATALOG, port: int = 0):
+        with open(catalog_path, encoding="utf-8") as f:
+            products = json.load(f)["products"]
+        handler = type("BackendHandler", (_BackendHandler,), {
+            "latency_seconds": latency_ms / 1000,
+            "products": {product["product_id"]: product for product in products},
+            "carts": {},
+            "lock": threading.Lock(),
+        })
+        self.handler = handler
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def start(self) -> "StubBackend":
+        threading.Thread(target=self.server.serve_forever, name="stub-backend", daemon=True).start()
+        return self
+
+    @property
+    def requests_served(self) -> int:
+        return self.handler.requests_served
+
+    def stop(self) -> None:
+        self.server.shutdown()
+
+
+def build_catalog(path: Optional[str] = None, catalog_path: Path = DEFAULT_CATALOG) -> str:
+    """Creates a SQLite products/featured_products catalog and returns its SQLAlchemy URL."""
+    if path is None:
+        path = os.path.join(tempfile.mkdtemp(prefix="dhurba-bench-"), "catalog.db")
+    with open(catalog_path, encoding="utf-8") as f:
+        catalog = json.load(f)
+    products = catalog["products"]
+    connection = sqlite3.connect(path)
+    try:
+        connection.executescript("""
+            DROP TABLE IF EXISTS products;
+            DROP TABLE IF EXISTS featured_products;
+            CREATE TABLE products (
+                product_id TEXT PRIMARY KEY, name TEXT NOT NULL, slug TEXT UNIQUE, description TEXT,
+                price INTEGER, category TEXT, room TEXT, image_url TEXT
+            );
+            CREATE TABLE featured_products (
+                product_id TEXT PRIMARY KEY, name TEXT NOT NULL, description TEXT, price INTEGER, image_url TEXT
+            );
+        """)
+        connection.executemany(
+            "INSERT INTO products VALUES (:product_id, :name, :slug, :description, :price, :category, :room, :image_url)",
+            products,
+        )
+        by_id = {product["product_id"]: product for product in products}
+        connection.executemany(
+            "INSERT INTO featured_products VALUES (:product_id, :name, :description, :price, :image_url)",
+            [by_id[product_id] for product_id in catalog.get("featured_products", [])],
+        )
+        connection.commit()
+    finally:
+        connection.close()
+    return f"sqlite:///{path}"
+
+
+def install_knowledge_base(path: Path = DEFAULT_KNOWLEDGE_BASE, embedding_size: int = 384) -> int:
+    """
+    Points rag_tool at an in-memory vector store with deterministic fake embeddings
+    (same dimension as all-MiniLM-L6-v2). Search results are not semantically ranked;
+    the store only stands in for the cost of embedding + top-k search.
+    """
+    from langchain_core.embeddings import DeterministicFakeEmbedding
+    from langchain_core.vectorstores import InMemoryVectorStore
+
+    with open(path, encoding="utf-8") as f:
+        texts = [json.loads(line)["text"] for line in f if line.strip()]
+    embeddings = DeterministicFakeEmbedding(size=embedding_size)
+    vectorstore = InMemoryVectorStore(embedding=embeddings)
+    vectorstore.add_texts(texts)
+
+    rag_module = sys.modules["agent.utils.rag_tool"]
+    rag_module._embeddings = embeddings
+    rag_module._vectorstore = vectorstore
+    rag_module._initialization_failed = False
+    return len(texts)
+
+
+def setup_offline_environment(backend_latency_ms: float = 20.0, database_url: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Starts the stub backend and catalog and points the agent's environment at them.
+    Must be called before `agent.agent` (or any agent.utils tool module) is imported.
+    """
+    if "agent.utils.tools" in sys.modules:
+        raise RuntimeError("setup_offline_environment() must run before the agent modules are imported")
+    backend = StubBackend(latency_ms=backend_latency_ms).start()
+    database_url = database_url or build_catalog()
+    os.environ["BACKEND_BASE_URL"] = backend.url
+    os.environ["SUPABASE_URL"] = database_url
+    os.environ.setdefault("GOOGLE_API_KEY", "offline-benchmark")
+    return {"backend": backend, "database_url": database_url}
+
+
+def load_offline_agent(model: ScriptedChatModel):
+    """Compiles the real agent graph with the scripted model, local RAG and a memory checkpointer."""
+    from langgraph.checkpoint.memory import InMemorySaver
+    import importlib
+
+    agent_module = importlib.import_module("agent.agent")
+
+    agent_module.set_llm(model)
+    install_knowledge_base()
+    return agent_module.agent_builder.compile(checkpointer=InMemorySaver())
@@ -0,0 +1,118 @@
+"""
+Startup (import-time) budget for the agent module.
+
+Imports `agent.agent` in fresh interpreters, the way a langgraph-api worker loads the graph,
+and reports:
+- the median wall time of the import over --runs processes
+- a `-X importtime` breakdown: the slowest modules and the total per top-level package
+- heavy dependencies that must only be imported on first use of a tool or the LLM
+
+Exits with status 1 when the median import time exceeds the budget or a deferred dependency
+is imported eagerly, so it can run as a CI gate.
+
+Usage:
+    python -m benchmarks.import_time [--budget-ms 1500] [--runs 5] [--top 15]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+TARGET = "agent.agent"
+DEFAULT_BUDGET_MS = float(os.getenv("IMPORT_TIME_BUDGET_MS", "1500"))
+
+# Imported lazily by get_llm(), query_db, backend_request and rag_tool respectively.
+# (requests is not listed: langchain_core itself imports it.)
+DEFERRED_MODULES = (
+    "langchain_google_genai",
+    "google.genai",
+    "pandas",
+    "sqlalchemy",
+    "langchain_pinecone",
+    "langchain_huggingface",
+    "sentence_transformers",
+    "torch",
+)
+
+TIMED_IMPORT = (
+    "import time; started = time.perf_counter(); "
+    f"import {TARGET}; "
+    "print((time.perf_counter() - started) * 1000)"
+)
+
+
+def child_env() -> Dict[str, str]:
+    env = dict(os.environ)
+    env.setdefault("GOOGLE_API_KEY", "import-time-benchmark")
+    env.pop("METRICS_PORT", None)  # do not bind the metrics port from every child
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(ROOT), env.get("PYTHONPATH")]))
+    return env
+
+
+def timed_import_ms() -> float:
+    output = subprocess.run(
+        [sys.executable, "-c", TIMED_IMPORT], cwd=ROOT, env=child_env(), capture_output=True, text=True, check=True
+    )
+    return float(output.stdout.strip().splitlines()[-1])
+
+
+def importtime_profile() -> List[Tuple[str, int, int]]:
+    """(module, self us, cumulative us) for every module imported by the target."""
+    output = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {TARGET}"],
+        cwd=ROOT, env=child_env(), capture_output=True, text=True, check=True,
+    )
+    rows = []
+    for line in output.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, module = line[len("import time:"):].split("|")
+        rows.append((module.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS, help="max median import time (env IMPORT_TIME_BUDGET_MS)")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    timed_import_ms()  # first run writes the .pyc files; not counted
+    samples = [timed_import_ms() for _ in range(args.runs)]
+    median_ms = statistics.median(samples)
+
+    profile = importtime_profile()
+    by_package: Dict[str, int] = defaultdict(int)
+    for module, self_us, _ in profile:
+        by_package[module.split(".")[0]] += self_us
+
+    print(f"import {TARGET}: median {median_ms:.0f} ms over {args.runs} runs (min {min(samples):.0f}, max {max(samples):.0f})")
+    print(f"\n{'slowest modules (-X importtime)':<52} {'self ms':>8} {'cumul ms':>9}")
+    for module, self_us, cumulative_us in sorted(profile, key=lambda row: row[1], reverse=True)[:args.top]:
+        print(f"{module:<52} {self_us / 1000:>8.1f} {cumulative_us / 1000:>9.1f}")
+    print(f"\n{'top-level package':<52} {'self ms':>8}")
+    for package, self_us in sorted(by_package.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"{package:<52} {self_us / 1000:>8.1f}")
+
+    imported = {module for module, _, _ in profile}
+    eager = [name for name in DEFERRED_MODULES if name in imported]
+    failures = []
+    if eager:
+        failures.append(f"imported eagerly (should load on first use): {', '.join(eager)}")
+    if median_ms > args.budget_ms:
+        failures.append(f"median import time {median_ms:.0f} ms exceeds the budget of {args.budget_ms:.0f} ms")
+    if failures:
+        for failure in failures:
+            print(f"\nFAIL: {failure}")
+        sys.exit(1)
+    print(f"\nOK: within the {args.budget_ms:.0f} ms budget, no deferred dependency imported at startup")
+
+
+if __name__ == "__main__":
+    main()
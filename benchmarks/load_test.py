@@ -0,0 +1,389 @@
+"""
+Load generator: replays multi-turn conversations against the agent at increasing load.
+
+Targets:
+- graph (default): the compiled graph in-process. With the default stubbed dependencies
+  (benchmarks/harness.py) only the container's own limits are measured; with --live the
+  real Gemini/backend/database from the environment are used.
+- api: a running LangGraph API server (--api-url), through /threads and /runs/wait.
+
+Load is either closed-loop (--concurrency 1,4,16: that many shoppers each replaying
+conversations back to back) or open-loop (--rates 1,5,10: new conversations per second
+with exponential inter-arrival times, capped at --max-in-flight). Each step runs for
+--duration seconds and reports throughput, p50/p95/p99 turn latency, error/timeout rates
+and ServerSession pool wait (the `query_db.checkout` span), which together give the
+saturation curve.
+
+Corpus: benchmarks/data/scenarios.json or a JSONL file with one conversation per line,
+{"name": ..., "turns": [{"user": "... [User ID: {user_id}]", "responses": [...]}, ...]};
+"responses" are only needed for the stubbed LLM.
+
+Usage:
+    python -m benchmarks.load_test [--corpus conversations.jsonl] [--concurrency 1,2,4,8,16,32]
+                                   [--rates 2,5,10] [--duration 30] [--live]
+    python -m benchmarks.load_test --target api --api-url http://localhost:8123 --metrics-url http://localhost:9464/metrics
+"""
+import argparse
+import asyncio
+import json
+import logging
+import random
+import re
+import time
+import uuid
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from benchmarks.harness import (
+    DEFAULT_SCENARIOS,
+    ScriptedChatModel,
+    fixtures_from_scenarios,
+    load_conversations,
+    load_offline_agent,
+    percentile,
+    setup_offline_environment,
+)
+
+POOL_WAIT_SPAN = "query_db.checkout"
+TOOL_ERROR_PREFIXES = ("error", "i encountered")
+
+
+class TurnError(Exception):
+    """A turn that completed but reported a failure (HTTP error status, failed run)."""
+
+
+class GraphTarget:
+    """Runs conversations on the compiled graph in this process."""
+
+    name = "graph"
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    async def new_thread(self) -> Dict[str, Any]:
+        return {"configurable": {"thread_id": str(uuid.uuid4())}, "seen": 0}
+
+    async def send(self, thread: Dict[str, Any], text: str) -> int:
+        """Sends one user message; returns the number of tool errors in the turn."""
+        from langchain_core.messages import HumanMessage, ToolMessage
+
+        state = await self.graph.ainvoke({"messages": [HumanMessage(content=text)]}, {"configurable": thread["configurable"]})
+        new_messages = state["messages"][thread["seen"]:]
+        thread["seen"] = len(state["messages"])
+        return sum(
+            isinstance(m, ToolMessage) and str(m.content).lower().startswith(TOOL_ERROR_PREFIXES)
+            for m in new_messages
+        )
+
+    def span_snapshot(self) -> Dict[str, Tuple[List[float], float]]:
+        from agent.utils.telemetry import SPAN_DURATION
+
+        snapshot: Dict[str, Tuple[List[float], float]] = {}
+        for labels, series in SPAN_DURATION.snapshot().items():
+            name = dict(labels)["span"]
+            counts, total = snapshot.get(name, ([0.0] * (len(series) - 1), 0.0))
+            snapshot[name] = ([a + b for a, b in zip(counts, series[:-1])], total + series[-1])
+        return snapshot
+
+    @property
+    def buckets(self) -> Tuple[float, ...]:
+        from agent.utils.telemetry import SPAN_DURATION
+
+        return SPAN_DURATION.buckets
+
+
+class ApiTarget:
+    """Runs conversations through a LangGraph API server (one thread per conversation)."""
+
+    name = "api"
+    _BUCKET_LINE = re.compile(
+        r'^agent_span_duration_seconds_bucket\{(?P<labels>[^}]*)\}\s+(?P<value>\S+)$'
+    )
+    _SUM_LINE = re.compile(r'^agent_span_duration_seconds_sum\{(?P<labels>[^}]*)\}\s+(?P<value>\S+)$')
+    _LABEL = re.compile(r'(\w+)="([^"]*)"')
+
+    def __init__(self, api_url: str, assistant_id: str, metrics_url: Optional[str], timeout: float):
+        import requests
+
+        self.session = requests.Session()
+        self.api_url = api_url.rstrip("/")
+        self.assistant_id = assistant_id
+        self.metrics_url = metrics_url
+        self.timeout = timeout
+        self.buckets: Tuple[float, ...] = ()
+
+    def _post(self, path: str, payload: Dict[str, Any]) -> Any:
+        response = self.session.post(f"{self.api_url}{path}", json=payload, timeout=self.timeout)
+        if response.status_code >= 400:
+            raise TurnError(f"HTTP {response.status_code} on {path.split('/')[-1]}")
+        return response.json()
+
+    async def new_thread(self) -> Dict[str, Any]:
+        thread = await asyncio.to_thread(self._post, "/threads", {})
+        return {"thread_id": thread["thread_id"], "seen": 0}
+
+    async def send(self, thread: Dict[str, Any], text: str) -> int:
+        payload = {
+            "assistant_id": self.assistant_id,
+            "input": {"messages": [{"role": "user", "content": text}]},
+        }
+        state = await asyncio.to_thread(self._post, f"/threads/{thread['thread_id']}/runs/wait", payload)
+        if isinstance(state, dict) and state.get("__error__"):
+            raise TurnError(str(state["__error__"].get("error", "run failed")))
+        messages = state.get("messages", []) if isinstance(state, dict) else []
+        new_messages = messages[thread["seen"]:]
+        thread["seen"] = len(messages)
+        return sum(
+            m.get("type") == "tool" and str(m.get("content", "")).lower().startswith(TOOL_ERROR_PREFIXES)
+            for m in new_messages
+        )
+
+    def span_snapshot(self) -> Dict[str, Tuple[List[float], float]]:
+        """Reads the span histograms from the server's /metrics endpoint (if configured)."""
+        if not self.metrics_url:
+            return {}
+        try:
+            text = self.session.get(self.metrics_url, timeout=10).text
+        except Exception as e:
+            logging.warning(f"Could not scrape {self.metrics_url}: {str(e)}")
+            return {}
+        cumulative: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+        sums: Dict[str, float] = defaultdict(float)
+        for line in text.splitlines():
+            match = self._BUCKET_LINE.match(line)
+            if match:
+                labels = dict(self._LABEL.findall(match.group("labels")))
+                cumulative[labels["span"]][labels["le"]] += float(match.group("value"))
+                continue
+            match = self._SUM_LINE.match(line)
+            if match:
+                labels = dict(self._LABEL.findall(match.group("labels")))
+                sums[labels["span"]] += float(match.group("value"))
+
+        snapshot: Dict[str, Tuple[List[float], float]] = {}
+        for name, by_bound in cumulative.items():
+            finite = sorted((float(le), value) for le, value in by_bound.items() if le != "+Inf")
+            self.buckets = tuple(bound for bound, _ in finite)
+            ordered = [value for _, value in finite] + [by_bound["+Inf"]]
+            counts = [ordered[0]] + [b - a for a, b in zip(ordered, ordered[1:])]
+            snapshot[name] = (counts, sums[name])
+        return snapshot
+
+
+def span_delta(before: Dict[str, Tuple[List[float], float]], after: Dict[str, Tuple[List[float], float]]) -> Dict[str, Tuple[List[float], float]]:
+    delta = {}
+    for name, (counts, total) in after.items():
+        previous_counts, previous_total = before.get(name, ([0.0] * len(counts), 0.0))
+        delta[name] = ([a - b for a, b in zip(counts, previous_counts)], total - previous_total)
+    return delta
+
+
+def bucket_quantile(buckets: Tuple[float, ...], counts: List[float], q: float) -> Optional[float]:
+    """Upper bound of the histogram bucket holding the q-quantile (None without observations)."""
+    total = sum(counts)
+    if not total:
+        return None
+    running = 0.0
+    for bound, count in zip(list(buckets) + [float("inf")], counts):
+        running += count
+        if running >= q * total:
+            return bound if bound != float("inf") else buckets[-1]
+    return buckets[-1]
+
+
+def pool_wait(target, delta: Dict[str, Tuple[List[float], float]]) -> Dict[str, Any]:
+    counts, total = delta.get(POOL_WAIT_SPAN, ([], 0.0))
+    checkouts = sum(counts)
+    if not checkouts:
+        return {"checkouts": 0, "mean_ms": None, "p95_le_ms": None}
+    p95 = bucket_quantile(target.buckets, counts, 0.95)
+    return {
+        "checkouts": int(checkouts),
+        "mean_ms": total / checkouts * 1000,
+        "p95_le_ms": p95 * 1000 if p95 is not None else None,
+    }
+
+
+async def play_conversation(target, conversation: Dict[str, Any], turn_timeout: float, results: List[Dict[str, Any]]) -> None:
+    user_id = str(uuid.uuid4())
+    try:
+        thread = await target.new_thread()
+    except Exception as e:
+        results.append({"latency": 0.0, "error": f"thread: {type(e).__name__}", "tool_errors": 0})
+        return
+    for turn in conversation["turns"]:
+        text = turn["user"].replace("{user_id}", user_id)
+        started = time.perf_counter()
+        error = None
+        tool_errors = 0
+        try:
+            tool_errors = await asyncio.wait_for(target.send(thread, text), timeout=turn_timeout)
+        except asyncio.TimeoutError:
+            error = "timeout"
+        except Exception as e:
+            error = f"{type(e).__name__}: {str(e)[:120]}"
+        results.append({"latency": time.perf_counter() - started, "error": error, "tool_errors": tool_errors})
+        if error:
+            return
+
+
+async def closed_loop(target, corpus: List[Dict[str, Any]], concurrency: int, duration: float, turn_timeout: float, results: list) -> Dict[str, Any]:
+    """`concurrency` shoppers each replay conversations back to back until the deadline."""
+    deadline = time.perf_counter() + duration
+    counter = iter(range(10**9))
+
+    async def shopper():
+        while time.perf_counter() < deadline:
+            await play_conversation(target, corpus[next(counter) % len(corpus)], turn_timeout, results)
+
+    await asyncio.gather(*(shopper() for _ in range(concurrency)))
+    return {"rejected": 0}
+
+
+async def open_loop(target, corpus: List[Dict[str, Any]], rate: float, duration: float, turn_timeout: float, max_in_flight: int, results: list, rng: random.Random) -> Dict[str, Any]:
+    """Starts conversations at `rate` per second (Poisson arrivals); arrivals over the cap are rejected."""
+    deadline = time.perf_counter() + duration
+    in_flight: set = set()
+    rejected = 0
+    index = 0
+    while time.perf_counter() < deadline:
+        await asyncio.sleep(rng.expovariate(rate))
+        if len(in_flight) >= max_in_flight:
+            rejected += 1
+            continue
+        task = asyncio.ensure_future(play_conversation(target, corpus[index % len(corpus)], turn_timeout, results))
+        in_flight.add(task)
+        task.add_done_callback(in_flight.discard)
+        index += 1
+    if in_flight:
+        await asyncio.gather(*in_flight)
+    return {"rejected": rejected}
+
+
+def summarize_step(load: str, results: List[Dict[str, Any]], wall: float, extra: Dict[str, Any], pool: Dict[str, Any]) -> Dict[str, Any]:
+    latencies = [r["latency"] for r in results if not r["error"]]
+    errors = Counter(r["error"].split(":", 1)[0] for r in results if r["error"])
+    turns = len(results)
+    return {
+        "load": load,
+        "turns": turns,
+        "ok_turns": len(latencies),
+        "turns_per_second": len(latencies) / wall if wall else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "error_rate": (turns - len(latencies)) / turns if turns else 0.0,
+        "timeouts": errors.get("timeout", 0),
+        "errors": dict(errors),
+        "tool_error_rate": sum(r["tool_errors"] for r in results) / turns if turns else 0.0,
+        "rejected": extra.get("rejected", 0),
+        "pool_wait": pool,
+    }
+
+
+def print_table(steps: List[Dict[str, Any]]) -> None:
+    print(
+        f"\n{'load':>10} {'turns':>6} {'turns/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+        f"{'err %':>6} {'tmo':>4} {'tool err %':>10} {'rej':>4} {'pool mean ms':>12} {'pool p95<= ms':>13}"
+    )
+    for step in steps:
+        pool = step["pool_wait"]
+        mean = f"{pool['mean_ms']:.2f}" if pool["mean_ms"] is not None else "-"
+        p95 = f"{pool['p95_le_ms']:g}" if pool["p95_le_ms"] is not None else "-"
+        print(
+            f"{step['load']:>10} {step['turns']:>6} {step['turns_per_second']:>8.1f} {step['p50_ms']:>8.0f} "
+            f"{step['p95_ms']:>8.0f} {step['p99_ms']:>8.0f} {step['error_rate'] * 100:>6.1f} {step['timeouts']:>4} "
+            f"{step['tool_error_rate'] * 100:>10.1f} {step['rejected']:>4} {mean:>12} {p95:>13}"
+        )
+    for step in steps:
+        if step["errors"]:
+            print(f"errors at {step['load']}: {step['errors']}")
+
+    # Saturation: the first step where throughput stops growing (<10%) while p95 latency keeps rising
+    for previous, current in zip(steps, steps[1:]):
+        if current["turns_per_second"] < previous["turns_per_second"] * 1.1 and current["p95_ms"] > previous["p95_ms"] * 1.2:
+            print(f"\nsaturation: throughput flattens at {previous['load']} ({previous['turns_per_second']:.1f} turns/s)")
+            break
+
+
+def build_target(args, corpus: List[Dict[str, Any]]):
+    if args.target == "api":
+        return ApiTarget(args.api_url, args.assistant_id, args.metrics_url, args.turn_timeout)
+
+    if args.live:
+        import importlib
+        from langgraph.checkpoint.memory import InMemorySaver
+
+        graph = importlib.import_module("agent.agent").agent_builder.compile(checkpointer=InMemorySaver())
+    else:
+        setup_offline_environment(args.backend_latency_ms, args.database_url)
+        model = ScriptedChatModel(
+            fixtures=fixtures_from_scenarios(corpus),
+            first_token_ms=args.llm_first_token_ms,
+            token_delay_ms=args.llm_token_ms,
+        )
+        graph = load_offline_agent(model)
+    return GraphTarget(graph)
+
+
+async def run(args) -> List[Dict[str, Any]]:
+    corpus = load_conversations(args.corpus)
+    target = build_target(args, corpus)
+    logging.getLogger().setLevel(args.log_level)
+    rng = random.Random(args.seed)
+
+    if args.rates:
+        loads = [("rate", float(value)) for value in args.rates.split(",")]
+    else:
+        loads = [("concurrency", int(value)) for value in args.concurrency.split(",")]
+
+    steps = []
+    for kind, value in loads:
+        results: List[Dict[str, Any]] = []
+        before = target.span_snapshot()
+        started = time.perf_counter()
+        if kind == "rate":
+            extra = await open_loop(target, corpus, value, args.duration, args.turn_timeout, args.max_in_flight, results, rng)
+            label = f"{value:g}/s"
+        else:
+            extra = await closed_loop(target, corpus, value, args.duration, args.turn_timeout, results)
+            label = f"c={value}"
+        wall = time.perf_counter() - started
+        pool = pool_wait(target, span_delta(before, target.span_snapshot()))
+        steps.append(summarize_step(label, results, wall, extra, pool))
+        print(f"{label}: {len(results)} turns in {wall:.1f}s", flush=True)
+    return steps
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", type=Path, default=DEFAULT_SCENARIOS)
+    parser.add_argument("--target", choices=["graph", "api"], default="graph")
+    parser.add_argument("--live", action="store_true", help="graph target: use the real LLM, backend and database from the environment")
+    parser.add_argument("--api-url", default="http://localhost:8123")
+    parser.add_argument("--assistant-id", default="dhurba_furniture_agent")
+    parser.add_argument("--metrics-url", help="api target: the agent's /metrics URL, for pool wait times")
+    parser.add_argument("--concurrency", default="1,2,4,8,16,32", help="closed-loop steps (concurrent shoppers)")
+    parser.add_argument("--rates", help="open-loop steps in new conversations per second (overrides --concurrency)")
+    parser.add_argument("--max-in-flight", type=int, default=256, help="open loop: conversations in flight before arrivals are rejected")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds per step")
+    parser.add_argument("--turn-timeout", type=float, default=120.0)
+    parser.add_argument("--backend-latency-ms", type=float, default=20.0)
+    parser.add_argument("--llm-first-token-ms", type=float, default=300.0)
+    parser.add_argument("--llm-token-ms", type=float, default=5.0)
+    parser.add_argument("--database-url")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--log-level", default="WARNING")
+    parser.add_argument("--output", type=Path, help="write the steps as JSON")
+    args = parser.parse_args()
+
+    steps = asyncio.run(run(args))
+    print_table(steps)
+    if args.output:
+        args.output.write_text(json.dumps(steps, indent=2))
+        print(f"\nreport written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Per-query cost of route keyword matching as the keyword tables grow.
+
+Compares the compiled KeywordMatcher (one trie-factored regex, built once) with the
+previous approach of looping over every route and keyword with `in` substring checks.
+The real ROUTE_DEFINITIONS tables are padded with synthetic keywords to N total.
+
+Usage:
+    python -m benchmarks.route_matcher_bench [--sizes 100,1000,10000] [--repeat 500]
+"""
+import argparse
+import random
+import string
+import time
+
+from agent.utils.routing_tools import ROUTE_DEFINITIONS, build_route_matcher
+
+QUERIES = [
+    "take me to my cart [User ID: 3f2c1a9e-5b7d-4c1e-9a2b-8d6e4f1c0a7b]",
+    "can you show me some modern sofas for the living room under 50000",
+    "I would like to see more details about the king size bed please",
+    "what is your return policy for damaged furniture deliveries",
+    "hello",
+]
+
+
+def synthetic_table(total_keywords: int, seed: int = 7) -> dict:
+    rng = random.Random(seed)
+    table = {route: list(info["keywords"]) for route, info in ROUTE_DEFINITIONS.items()}
+    routes = list(table)
+    existing = sum(len(v) for v in table.values())
+    for i in range(max(0, total_keywords - existing)):
+        words = ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 9))) for _ in range(rng.randint(1, 3))]
+        table[routes[i % len(routes)]].append(" ".join(words))
+    return table
+
+
+def naive_match(table: dict, query: str) -> str:
+    query_lower = query.lower().strip()
+    for route_keyword, keywords in table.items():
+        for keyword in keywords:
+            if keyword.lower() in query_lower:
+                return route_keyword
+    return "shop"
+
+
+def time_per_query_us(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for query in QUERIES:
+            fn(query)
+    return (time.perf_counter() - start) / (repeat * len(QUERIES)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="100,1000,10000")
+    parser.add_argument("--repeat", type=int, default=500)
+    args = parser.parse_args()
+
+    print(f"{'keywords':>9} {'compile ms':>11} {'compiled us/q':>14} {'naive us/q':>11}")
+    for size in [int(s) for s in args.sizes.split(",")]:
+        table = synthetic_table(size)
+        start = time.perf_counter()
+        matcher = build_route_matcher(table)
+        compile_ms = (time.perf_counter() - start) * 1e3
+        compiled_us = time_per_query_us(matcher.best, args.repeat)
+        naive_us = time_per_query_us(lambda q: naive_match(table, q), args.repeat)
+        print(f"{len(matcher):>9} {compile_ms:>11.1f} {compiled_us:>14.2f} {naive_us:>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+-- Catalog change notifications for the agent's in-process caches (agent/utils/catalog_events.py).
+-- Every committed INSERT / UPDATE / DELETE on products or featured_products sends one
+-- NOTIFY on channel catalog_changes (rename it here and in CATALOG_NOTIFY_CHANNEL together)
+-- with the row's product_id; TRUNCATE sends one payload without product_id, which makes the
+-- caches reload fully.
+-- NOTIFY is delivered on commit, and identical payloads within a transaction are sent once.
+--
+-- Run once against the primary (idempotent):
+--     psql "$SUPABASE_URL" -f sql/catalog_notify.sql
+
+CREATE OR REPLACE FUNCTION notify_catalog_change() RETURNS trigger
+LANGUAGE plpgsql AS $$
+DECLARE
+    payload json;
+BEGIN
+    IF TG_OP = 'TRUNCATE' THEN
+        payload := json_build_object('table', TG_TABLE_NAME, 'op', TG_OP);
+    ELSIF TG_OP = 'DELETE' THEN
+        payload := json_build_object('table', TG_TABLE_NAME, 'op', TG_OP, 'product_id', OLD.product_id);
+    ELSIF TG_OP = 'UPDATE' THEN
+        payload := json_build_object('table', TG_TABLE_NAME, 'op', TG_OP, 'product_id', NEW.product_id, 'old_product_id', OLD.product_id);
+    ELSE
+        payload := json_build_object('table', TG_TABLE_NAME, 'op', TG_OP, 'product_id', NEW.product_id);
+    END IF;
+    PERFORM pg_notify('catalog_changes', payload::text);
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS products_catalog_notify ON products;
+CREATE TRIGGER products_catalog_notify
+    AFTER INSERT OR UPDATE OR DELETE ON products
+    FOR EACH ROW EXECUTE FUNCTION notify_catalog_change();
+
+DROP TRIGGER IF EXISTS products_catalog_notify_truncate ON products;
+CREATE TRIGGER products_catalog_notify_truncate
+    AFTER TRUNCATE ON products
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_catalog_change();
+
+DROP TRIGGER IF EXISTS featured_products_catalog_notify ON featured_products;
+CREATE TRIGGER featured_products_catalog_notify
+    AFTER INSERT OR UPDATE OR DELETE ON featured_products
+    FOR EACH ROW EXECUTE FUNCTION notify_catalog_change();
+
+DROP TRIGGER IF EXISTS featured_products_catalog_notify_truncate ON featured_products;
+CREATE TRIGGER featured_products_catalog_notify_truncate
+    AFTER TRUNCATE ON featured_products
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_catalog_change();